@@ -1,7 +1,14 @@
 import streamlit as st
+import json
 import time
+import uuid
 from datetime import datetime
-from backend import PDFProcessor, OpenRouterAPI, AdaptiveTestEngine
+from backend import (PDFProcessor, OpenRouterAPI, APIHealthMonitor, BackgroundGeneration, create_test_engine,
+                     get_request_scheduler, load_environment)
+from question_cache import QuestionCache
+from question_store import SQLiteQuestionStore
+from session_store import SQLiteSessionStore, StaleSessionError
+from tracing import tracer
 
 # Configure Streamlit page
 st.set_page_config(
@@ -51,12 +58,110 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_question_cache():
+    """Process-wide cache of extracted text and generated questions"""
+    return QuestionCache()
+
+@st.cache_resource
+def get_question_store():
+    """Process-wide handle on the persistent cross-document question bank"""
+    return SQLiteQuestionStore()
+
+@st.cache_resource
+def get_api_client():
+    """Process-wide OpenRouter client (not cached while the API key is missing)"""
+    return OpenRouterAPI(question_store=get_question_store())
+
+@st.cache_resource
+def get_api_health():
+    """Process-wide API health check, refreshed in the background"""
+    return APIHealthMonitor(get_api_client())
+
+@st.cache_resource
+def get_session_store():
+    """Process-wide handle on the session store shared by all app workers"""
+    return SQLiteSessionStore()
+
+# Session state written to the shared store (the engine is stored as a snapshot)
+PERSISTED_KEYS = ('page', 'test_completed', 'show_feedback', 'last_result',
+                  'question_start_time', 'current_question_id', 'pdf_document_id')
+
+def get_session_id():
+    """Session id carried in the URL so any worker behind the load balancer can serve it"""
+    session_id = st.query_params.get("sid")
+    if not session_id:
+        session_id = uuid.uuid4().hex
+        st.query_params["sid"] = session_id
+    return session_id
+
+def restore_session():
+    """Load session state from the shared store when this worker's copy is missing or stale"""
+    store = get_session_store()
+    record = store.load(get_session_id())
+    if record is None or record.version == st.session_state.get('session_version'):
+        return
+
+    state = record.state
+    for key in PERSISTED_KEYS:
+        st.session_state[key] = state.get(key)
+
+    engine = None
+    pool = store.get_pool(state['pool_hash']) if state.get('pool_hash') else None
+    if pool is not None and record.engine_snapshot:
+        main_questions, buffer_questions = pool
+        engine = create_test_engine(main_questions, buffer_questions)
+        try:
+            engine.restore_bytes(record.engine_snapshot)
+            engine.attach_question_store(get_question_store(), state.get('pdf_document_id'))
+        except ValueError:
+            engine = None
+
+    st.session_state.test_engine = engine
+    st.session_state.main_questions = engine.main_questions if engine else None
+    st.session_state.buffer_questions = engine.buffer_questions if engine else None
+    question_id = state.get('current_question_id')
+    st.session_state.current_question = engine.all_questions[question_id] if engine and question_id is not None else None
+    if engine is None:
+        st.session_state.page = 'upload'
+
+    st.session_state.session_version = record.version
+    st.session_state.session_fingerprint = None
+
+def persist_session():
+    """Save session state to the shared store if it changed during this run"""
+    store = get_session_store()
+    engine = st.session_state.test_engine
+    state = {key: st.session_state.get(key) for key in PERSISTED_KEYS}
+
+    engine_snapshot = None
+    # The pool is stored once generation has finished, not at every intermediate size; until
+    # then another worker picking up the session starts over from the upload page
+    if engine is not None and not engine.generation_pending:
+        pool_hash, main_questions, buffer_questions, engine_snapshot = engine.snapshot_with_pool()
+        state['pool_hash'] = pool_hash.hex()
+        store.put_pool(state['pool_hash'], main_questions, buffer_questions)
+
+    fingerprint = (json.dumps(state, sort_keys=True), engine_snapshot)
+    if fingerprint == st.session_state.get('session_fingerprint'):
+        return
+
+    try:
+        st.session_state.session_version = store.save(
+            get_session_id(), state, engine_snapshot, st.session_state.get('session_version') or 0)
+        st.session_state.session_fingerprint = fingerprint
+    except StaleSessionError:
+        # Another worker saved first; the next run reloads its state
+        st.session_state.session_version = None
+
 def initialize_session_state():
     """Initialize all session state variables"""
     if 'page' not in st.session_state:
         st.session_state.page = 'upload'
     if 'pdf_text' not in st.session_state:
         st.session_state.pdf_text = None
+    if 'pdf_document_id' not in st.session_state:
+        st.session_state.pdf_document_id = None
     if 'main_questions' not in st.session_state:
         st.session_state.main_questions = None
     if 'buffer_questions' not in st.session_state:
@@ -65,6 +170,8 @@ def initialize_session_state():
         st.session_state.test_engine = None
     if 'current_question' not in st.session_state:
         st.session_state.current_question = None
+    if 'current_question_id' not in st.session_state:
+        st.session_state.current_question_id = None
     if 'question_start_time' not in st.session_state:
         st.session_state.question_start_time = None
     if 'test_completed' not in st.session_state:
@@ -102,40 +209,71 @@ def render_upload_page():
 
             if st.button("🚀 Process PDF & Generate Questions", type="primary"):
                 with st.spinner("Processing PDF and generating adaptive questions..."):
-                    # Extract text from PDF
-                    processor = PDFProcessor()
-                    extracted_text, error = processor.extract_text_from_pdf(uploaded_file)
-
-                    if error:
-                        st.markdown(f'<div class="error-container"><strong>❌ {error}</strong></div>', 
-                                  unsafe_allow_html=True)
-                        return
+                    cache = get_question_cache()
+                    pdf_hash = cache.hash_bytes(uploaded_file.getvalue())
 
-                    st.session_state.pdf_text = extracted_text
-                    st.success(f"✅ Successfully extracted {len(extracted_text)} characters from PDF")
+                    # Extract text from PDF (skipped when this document was seen before)
+                    extracted_text = cache.get_text(pdf_hash)
+                    if extracted_text is None:
+                        processor = PDFProcessor()
+                        extracted_text, error = processor.extract_text_from_pdf(uploaded_file)
 
-                    # Generate questions using OpenRouter API
-                    try:
-                        api_client = OpenRouterAPI()
-                        all_questions, api_error = api_client.generate_questions(extracted_text)
-
-                        if api_error:
-                            st.markdown(f'<div class="error-container"><strong>❌ {api_error}</strong></div>', 
+                        if error:
+                            st.markdown(f'<div class="error-container"><strong>❌ {error}</strong></div>', 
                                       unsafe_allow_html=True)
                             return
 
-                        # Split into main (first 10) and buffer (last 10)
-                        st.session_state.main_questions = all_questions[:10]
-                        st.session_state.buffer_questions = all_questions[10:]
-
-                        st.success(f"✅ Generated {len(st.session_state.main_questions)} main questions + {len(st.session_state.buffer_questions)} buffer questions")
+                        cache.put_text(pdf_hash, extracted_text)
 
-                        # Initialize test engine with both sets
-                        st.session_state.test_engine = AdaptiveTestEngine(
-                            st.session_state.main_questions,
-                            st.session_state.buffer_questions
-                        )
+                    st.session_state.pdf_text = extracted_text
+                    st.session_state.pdf_document_id = SQLiteQuestionStore.document_key(extracted_text)
+                    st.success(f"✅ Successfully extracted {len(extracted_text)} characters from PDF")
 
+                    # Generate questions using OpenRouter API
+                    try:
+                        api_client = get_api_client()
+                        generation_params = api_client.generation_params()
+                        cached_questions = cache.get_questions(pdf_hash, generation_params)
+
+                        if cached_questions is not None:
+                            # Main and buffer sets exactly as they were generated
+                            st.session_state.main_questions, st.session_state.buffer_questions = cached_questions
+
+                            st.success(f"✅ Loaded {len(st.session_state.main_questions)} main questions + {len(st.session_state.buffer_questions)} buffer questions from cache")
+
+                            # Initialize test engine with both sets
+                            st.session_state.test_engine = create_test_engine(
+                                st.session_state.main_questions,
+                                st.session_state.buffer_questions
+                            )
+                        else:
+                            # Stream questions into the engine; the test starts once the main set is in and the buffer keeps arriving
+                            engine = create_test_engine([], [])
+
+                            def cache_generated(main_questions, buffer_questions, error):
+                                # Only a full main set is worth reusing; a short buffer is kept as is
+                                if not error and len(main_questions) >= api_client.main_count:
+                                    cache.put_questions(pdf_hash, generation_params, main_questions, buffer_questions)
+
+                            generation = BackgroundGeneration(api_client, extracted_text, engine, on_complete=cache_generated,
+                                                              session_key=get_session_id())
+                            generation.start()
+
+                            if not generation.wait_until_ready():
+                                api_error = generation.error or "Error: No valid questions were generated"
+                                st.markdown(f'<div class="error-container"><strong>❌ {api_error}</strong></div>', 
+                                          unsafe_allow_html=True)
+                                return
+
+                            st.session_state.main_questions = engine.main_questions
+                            st.session_state.buffer_questions = engine.buffer_questions
+                            st.session_state.test_engine = engine
+
+                            st.success(f"✅ Generated {len(engine.all_questions)} questions so far, the rest are arriving in the background")
+
+                        # Top up from the persistent question bank if the pool runs out near the user's level
+                        st.session_state.test_engine.attach_question_store(get_question_store(),
+                                                                           st.session_state.pdf_document_id)
                         st.session_state.page = 'test'
                         st.rerun()
 
@@ -199,6 +337,7 @@ def render_test_page():
             return
 
         st.session_state.current_question = next_q
+        st.session_state.current_question_id = engine.pending_question_id
         st.session_state.question_start_time = time.time()
         st.session_state.show_feedback = False
 
@@ -262,6 +401,7 @@ def render_test_page():
 
         if st.button("Continue to Next Question →", type="primary"):
             st.session_state.current_question = None
+            st.session_state.current_question_id = None
             st.session_state.show_feedback = False
             st.session_state.last_result = None
             st.rerun()
@@ -291,6 +431,9 @@ def render_test_page():
             st.session_state.last_result = result
             st.rerun()
 
+        # Pick the next question for both outcomes while the user reads this one
+        engine.precompute_lookahead()
+
     st.markdown('</div>', unsafe_allow_html=True)
 
 def render_results_page():
@@ -368,6 +511,7 @@ def render_results_page():
         if st.button("🔄 Restart Test", type="primary"):
             st.session_state.test_engine.reset()
             st.session_state.current_question = None
+            st.session_state.current_question_id = None
             st.session_state.test_completed = False
             st.session_state.show_feedback = False
             st.session_state.last_result = None
@@ -386,8 +530,18 @@ def render_results_page():
 
 def main():
     """Main application logic"""
+    load_environment()
     initialize_session_state()
+    restore_session()
+
+    try:
+        render_app()
+    finally:
+        # Runs on st.rerun() too, so every state change reaches the shared store
+        persist_session()
 
+def render_app():
+    """Render the sidebar and the current page"""
     # Sidebar navigation
     with st.sidebar:
         st.markdown("### 🧠 Navigation")
@@ -404,8 +558,13 @@ def main():
         st.markdown("**API Status:**")
 
         try:
-            api_client = OpenRouterAPI()
-            st.success("✅ OpenRouter API Connected")
+            health = get_api_health().status()
+            if health is None:
+                st.info("⏳ Checking OpenRouter API...")
+            elif health['ok']:
+                st.success(f"✅ OpenRouter API Connected ({health['latency'] * 1000:.0f} ms)")
+            else:
+                st.warning(f"⚠️ {health['error']}")
         except Exception as e:
             st.error(f"❌ API Error: {str(e)}")
             st.markdown("""
@@ -415,6 +574,21 @@ def main():
             3. Restart the application
             """)
 
+        cache_stats = get_question_cache().stats()
+        st.caption(f"Question cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+        store_stats = get_question_store().stats()
+        st.caption(f"Question bank: {store_stats['questions']} questions from {store_stats['documents']} documents")
+        scheduler_stats = get_request_scheduler().stats()
+        st.caption(f"LLM queue: {sum(scheduler_stats['queued'].values())} waiting, "
+                   f"{scheduler_stats['in_flight']}/{scheduler_stats['max_concurrency']} in flight")
+
+        if tracer.enabled:
+            with st.expander("📈 Pipeline metrics"):
+                for stage, summary in tracer.stage_summary().items():
+                    st.caption(f"{stage}: {summary['count']} × {summary['mean_s'] * 1000:.1f} ms")
+                st.download_button("Download Prometheus metrics", tracer.prometheus_text(),
+                                   file_name="metrics.prom", mime="text/plain")
+
         st.markdown("---")
         st.markdown("### 📚 About")
         st.markdown("""
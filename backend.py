@@ -1,37 +1,228 @@
-import fitz  # PyMuPDF
-import requests
 import json
 import os
 import re
 import time
-from dotenv import load_dotenv
-from typing import Dict, List, Any, Optional, Tuple
+import random
+import struct
+import hashlib
+import threading
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Callable
+from dedup import NearDuplicateIndex
+from json_stream import QuestionStreamParser, salvage_questions
+from llm_scheduler import PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND, RequestScheduler, scheduler_from_env
+from question_bank import QuestionBank
+from question_index import DifficultyIndex
+from tracing import tracer, tracing_requested
+
+# PyMuPDF, requests, python-dotenv and the process pool are imported on first use
+# rather than here, so new workers can draw the upload page without paying for them
+if TYPE_CHECKING:
+    import requests
+
+_environment_loaded = False
+
+# Process-wide pooled HTTP session, shared by every OpenRouterAPI instance so that
+# concurrent user sessions and Streamlit reruns reuse warm keep-alive connections
+_http_session = None
+_http_session_lock = threading.Lock()
+
+# Process-wide LLM request scheduler: every session's calls share one key's rate limits
+_request_scheduler = None
+_request_scheduler_lock = threading.Lock()
+
+# Process-wide PDF extraction pool, started on first use and reused so spawn start-up is paid once
+_extraction_pool = None
+_extraction_pool_warmup = []  # One start-up task per worker; the pool is used once they have all run
+_extraction_pool_lock = threading.Lock()
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Versioned binary layout for AdaptiveTestEngine snapshots
+SNAPSHOT_MAGIC = b"ATES"
+SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct("<4sHddiiiiiIIII16s")
+_SNAPSHOT_HISTORY_ENTRY = struct.Struct("<i?ddidd")
+
+REQUIRED_QUESTION_FIELDS = ["question", "options", "correct_answer", "difficulty", "explanation", "topic"]
+
+# Rough characters-per-token ratio used to size document chunks for prompts
+CHARS_PER_TOKEN = 4
+
+
+def load_environment():
+    """Load variables from .env once per process"""
+    global _environment_loaded
+    if not _environment_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _environment_loaded = True
+        if tracing_requested():
+            tracer.enable()  # The tracer was created at import time, before .env was read
+
+
+def get_http_session(pool_size: int = 10) -> "requests.Session":
+    """Return the shared keep-alive session, creating it on first use
+
+    The pool size is fixed by the first caller; later callers share that pool.
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            import requests
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            if os.getenv("LLM_STANDIN"):
+                from llm_standin import install_standin, standin_from_env
+                install_standin(session, standin_from_env())  # Offline stand-in for testing and benchmarks
+            _http_session = session
+        return _http_session
+
+
+def get_request_scheduler() -> RequestScheduler:
+    """Return the shared request scheduler, configured from the environment on first use"""
+    global _request_scheduler
+    with _request_scheduler_lock:
+        if _request_scheduler is None:
+            load_environment()
+            _request_scheduler = scheduler_from_env()
+        return _request_scheduler
+
+
+def _start_extraction_worker():
+    """Warm-up task: import PyMuPDF so a worker's first extraction does not pay for it"""
+    import fitz  # noqa: F401
+
+
+def get_extraction_pool(max_workers: int):
+    """Return the shared PDF extraction process pool once its workers are up, or None while they start
+
+    Workers are spawned rather than forked, since the server's threads may
+    hold locks at fork time. Spawning costs a few hundred milliseconds per
+    worker, more than serial extraction of a typical upload, so the first
+    call only starts the pool in the background and the pool is kept for
+    the life of the process. The worker count is fixed by the first caller.
+    """
+    global _extraction_pool, _extraction_pool_warmup
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            _extraction_pool = ProcessPoolExecutor(max_workers=max_workers,
+                                                   mp_context=multiprocessing.get_context("spawn"))
+            _extraction_pool_warmup = [_extraction_pool.submit(_start_extraction_worker) for _ in range(max_workers)]
+        if not all(future.done() for future in _extraction_pool_warmup):
+            return None
+        return _extraction_pool
+
+
+def _discard_extraction_pool(pool):
+    """Drop a broken pool so the next extraction starts a fresh one"""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is pool:
+            _extraction_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
 
-# Load environment variables
-load_dotenv()
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> List[str]:
+    """Open the document in this worker and extract text for pages [start, stop)"""
+    import fitz  # PyMuPDF
+    pdf_document = fitz.open(pdf_path)
+    try:
+        return [pdf_document.load_page(page_num).get_text() for page_num in range(start, stop)]
+    finally:
+        pdf_document.close()
 
 
 class PDFProcessor:
     """Handle PDF text extraction using PyMuPDF"""
 
+    # Documents with fewer pages than this are extracted serially
+    PARALLEL_PAGE_THRESHOLD = 64
+    # Minimum number of pages handed to a worker in one task
+    MIN_PAGES_PER_TASK = 16
+
+    @staticmethod
+    def _extract_pages_serial(pdf_document) -> List[str]:
+        """Extract page texts in order on the calling thread"""
+        return [pdf_document.load_page(page_num).get_text() for page_num in range(pdf_document.page_count)]
+
+    @staticmethod
+    def _extract_pages_parallel(pool, pdf_bytes: bytes, page_count: int, max_workers: int) -> List[str]:
+        """Extract page texts across the shared process pool, returning them in page order
+
+        The document is handed to workers as a temporary file, so each task
+        sends only a path and its page range.
+        """
+        pages_per_task = max(PDFProcessor.MIN_PAGES_PER_TASK, -(-page_count // (max_workers * 4)))
+        ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+
+        import tempfile
+        from concurrent.futures.process import BrokenProcessPool
+
+        fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(pdf_bytes)
+            futures = [pool.submit(_extract_page_range, pdf_path, start, stop) for start, stop in ranges]
+            page_texts = []
+            for future in futures:
+                page_texts.extend(future.result())
+            return page_texts
+        except BrokenProcessPool:
+            _discard_extraction_pool(pool)
+            raise
+        finally:
+            os.remove(pdf_path)
+
     @staticmethod
-    def extract_text_from_pdf(pdf_file) -> Tuple[str, str]:
-        """Extract text from uploaded PDF file"""
+    def extract_text_from_pdf(pdf_file, parallel: bool = True, max_workers: Optional[int] = None) -> Tuple[str, str]:
+        """Extract text from uploaded PDF file
+
+        Large documents are split into page ranges extracted in a process pool
+        when parallel is set; small ones are always extracted serially, and so
+        is every document until the shared pool has finished starting.
+        """
         try:
             pdf_bytes = pdf_file.read()
             if len(pdf_bytes) == 0:
                 return "", "Error: The uploaded file is empty."
 
-            pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+            with tracer.span("pdf.open", bytes=len(pdf_bytes)) as span:
+                import fitz  # PyMuPDF
+                pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+                span.set(pages=pdf_document.page_count)
             if pdf_document.page_count == 0:
                 return "", "Error: The PDF file appears to be corrupted or has no pages."
 
-            extracted_text = ""
-            for page_num in range(pdf_document.page_count):
-                page = pdf_document.load_page(page_num)
-                extracted_text += page.get_text() + "\n"
+            max_workers = max_workers or os.cpu_count() or 1
+
+            with tracer.span("pdf.pages", pages=pdf_document.page_count, parallel=False) as span:
+                page_texts = None
+                if parallel and max_workers > 1 and pdf_document.page_count >= PDFProcessor.PARALLEL_PAGE_THRESHOLD:
+                    from concurrent.futures.process import BrokenProcessPool
+                    try:
+                        pool = get_extraction_pool(max_workers)
+                        if pool is not None:
+                            page_texts = PDFProcessor._extract_pages_parallel(pool, pdf_bytes, pdf_document.page_count,
+                                                                              max_workers)
+                            span.set(parallel=True, workers=max_workers)
+                    except (OSError, BrokenProcessPool):
+                        page_texts = None  # Process pool unavailable, fall back to serial
 
-            pdf_document.close()
+                if page_texts is None:
+                    page_texts = PDFProcessor._extract_pages_serial(pdf_document)
+
+                pdf_document.close()
+
+                # Join once instead of concatenating page by page
+                extracted_text = "\n".join(page_texts)
+                span.set(chars=len(extracted_text))
 
             if not extracted_text.strip():
                 return "", "Error: No text could be extracted. The file might be image-based."
@@ -42,43 +233,432 @@ class PDFProcessor:
             return "", f"Error processing PDF: {str(e)}"
 
 
+class GenerationBudget:
+    """Limits on API calls, tokens and wall time for one upload's generation run"""
+
+    def __init__(self, max_calls: int, max_tokens: int, max_seconds: float):
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.deadline = time.monotonic() + max_seconds
+        self.calls = 0
+        self.tokens = 0
+        self.exhausted = ""  # Which limit stopped further calls: "calls", "tokens" or "time"
+
+    def remaining_seconds(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def take_call(self) -> bool:
+        """Reserve one more call if every limit allows it"""
+        if self.calls >= self.max_calls:
+            self.exhausted = self.exhausted or "calls"
+        elif self.tokens >= self.max_tokens:
+            self.exhausted = self.exhausted or "tokens"
+        elif self.remaining_seconds() <= 0:
+            self.exhausted = self.exhausted or "time"
+        else:
+            self.calls += 1
+            return True
+        return False
+
+
+class GenerationRun:
+    """One upload's concurrent generation: batch jobs, their calls, hedges, top-ups and budget
+
+    Every job is a (set, count, band) batch sent one document chunk. run()
+    owns the state and drives it from the calling thread; only accept() is
+    also called from worker threads, as streamed questions arrive, and what
+    it touches is guarded by _lock.
+    """
+
+    def __init__(self, api: "OpenRouterAPI", text_content: str,
+                 on_question: Optional[Callable[[str, Dict], None]] = None,
+                 on_set_complete: Optional[Callable[[str], None]] = None, session_key: str = ""):
+        self.api = api
+        self.on_question = on_question
+        self.on_set_complete = on_set_complete
+        self.session_key = session_key
+        self.chunks, self.jobs = api._plan_batches(text_content)
+
+        # Fill each batch from the question store first; only the gaps go to the model
+        store = api.question_store
+        self.document = store.document_key(text_content) if store is not None else None
+        self.accepted = api._stored_batches(self.jobs, self.document)
+        self.from_store = sum(len(questions) for questions in self.accepted.values())
+        for i in range(len(self.jobs)):
+            self.accepted.setdefault(i, [])
+
+        # Near-duplicates of anything already in this run or stored for this document are dropped as they arrive
+        self.seen = NearDuplicateIndex(api.dedup_threshold)
+        self.duplicates = {"main": 0, "buffer": 0}
+        self.closed = set()  # Finished jobs; late results from abandoned calls are ignored
+        self._lock = threading.Lock()
+
+        self.budget = GenerationBudget(api.max_calls_per_upload, api.max_tokens_per_upload, api.max_generation_seconds)
+        self.outstanding = {"main": 0, "buffer": 0}  # Jobs per set not yet finalized
+        self.attempts = {}
+        self.top_ups = self.hedges = self.hedge_wins = 0
+        self.succeeded = False  # Whether any call in this run has worked; until then failures are not retried
+        self.errors = {}
+        self.salvage = {"salvaged_batches": 0, "salvaged_questions": 0, "dropped_questions": 0}
+        self.queue_wait = 0.0
+        self.calls = {}  # future -> (job index, batch report, is hedge); the report holds the admission time
+        self.hedge_checked = set()  # Calls already hedged (or refused a hedge by the budget)
+        self.abandoned = {}  # future -> batch report of calls dropped after a sibling won; charged once finished
+        self.executor = None
+
+    def accept(self, i: int, q: Dict, batch_report: Optional[Dict] = None):
+        """Add a question to job i unless the job is full or closed, its call abandoned, or it is a near-duplicate"""
+        with self._lock:
+            if i in self.closed or len(self.accepted[i]) >= self.jobs[i][1]:
+                return
+            if batch_report is not None and batch_report.get("abandoned"):
+                return  # A sibling call already won; its job may be topping up
+            if not self.seen.add_if_new(len(self.seen), q) or (
+                    self.document is not None and self.api.question_store.has_near_duplicate(q, self.document)):
+                self.duplicates[self.jobs[i][0]] += 1
+                return
+            self.accepted[i].append(q)
+        if self.on_question:
+            self.on_question(self.jobs[i][0], q)
+
+    def run(self) -> Tuple[List[Dict], List[Dict], str]:
+        """Generate every job's missing questions; returns (main, buffer, error)"""
+        for i, questions in self.accepted.items():
+            for q in questions:
+                self.seen.add(len(self.seen), q)
+                if self.on_question:
+                    self.on_question(self.jobs[i][0], q)
+
+        to_generate = [i for i in range(len(self.jobs)) if len(self.accepted[i]) < self.jobs[i][1]]
+        for i in to_generate:
+            self.outstanding[self.jobs[i][0]] += 1
+        if self.on_set_complete:
+            for pool in ("main", "buffer"):
+                if self.outstanding[pool] == 0:
+                    self.on_set_complete(pool)
+
+        self.executor = ThreadPoolExecutor(max_workers=max(1, min(self.api.max_concurrency, 2 * len(to_generate))))
+        try:
+            # Submit main batches first so they are not queued behind buffer batches
+            for i in sorted(to_generate, key=lambda i: self.jobs[i][0] != "main"):
+                if not self._submit(i):
+                    self._finalize(i)
+
+            while self.calls and self._step():
+                pass
+
+            # Out of time: keep what arrived and give up on calls still running
+            for i in sorted({call[0] for call in self.calls.values()}):
+                self._finalize(i)
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self._charge_abandoned()  # Calls still running are not waited for; their tokens go uncounted
+        return self._result()
+
+    def report(self) -> Dict:
+        """Store reuse, duplicate, top-up, salvage, budget, hedging and queueing counters"""
+        return {"from_store": self.from_store, "duplicates_removed": sum(self.duplicates.values()),
+                "duplicates_by_set": self.duplicates, "top_up_requests": self.top_ups, **self.salvage,
+                "api_calls": self.budget.calls, "tokens_used": self.budget.tokens, "hedged_requests": self.hedges,
+                "hedge_wins": self.hedge_wins, "budget_exhausted": self.budget.exhausted,
+                "queue_wait_s": self.queue_wait}
+
+    def _submit(self, i: int, hedge: bool = False) -> bool:
+        """Request the questions job i is still missing, if the budget allows another call"""
+        if not self.budget.take_call():
+            return False
+        pool, count, band = self.jobs[i]
+        if not hedge:
+            self.attempts[i] = self.attempts.get(i, 0) + 1
+        batch_report = {}
+        # A hedge duplicates a call someone may be waiting on, so it keeps the job's priority
+        priority = PRIORITY_INTERACTIVE if pool == "main" else PRIORITY_BACKGROUND
+        chunk = self.chunks[i % len(self.chunks)]
+        missing = count - len(self.accepted[i])
+        if self.on_question:
+            future = self.executor.submit(self.api.stream_questions_batch, chunk, missing, band,
+                                          lambda q: self.accept(i, q, batch_report), batch_report, priority,
+                                          self.session_key)
+        else:
+            future = self.executor.submit(self.api.generate_questions_batch, chunk, missing, band,
+                                          batch_report, priority, self.session_key)
+        self.calls[future] = (i, batch_report, hedge)
+        return True
+
+    def _finalize(self, i: int):
+        """Store job i's questions and report its set complete once no job of the set is left"""
+        with self._lock:
+            self.closed.add(i)
+        if self.document is not None:
+            self.api.question_store.add_questions(self.accepted[i], self.document)
+        pool = self.jobs[i][0]
+        self.outstanding[pool] -= 1
+        if self.on_set_complete and self.outstanding[pool] == 0:
+            self.on_set_complete(pool)
+
+    def _charge_abandoned(self):
+        """Add the tokens of abandoned calls that have since finished to the budget"""
+        for future in [future for future in self.abandoned if future.done()]:
+            self.budget.tokens += self.abandoned.pop(future).get("tokens", 0)
+
+    def _step(self) -> bool:
+        """Wait for the next finished call or hedge deadline and handle it; False once out of time"""
+        self._charge_abandoned()
+        hedge_delay = self.api._hedge_delay()
+        hedgeable = [(future, call) for future, call in self.calls.items()
+                     if not call[2] and future not in self.hedge_checked]
+        timeout = self.budget.remaining_seconds()
+        if hedge_delay is not None:
+            now = time.monotonic()
+            for _, (_, batch_report, _) in hedgeable:
+                # Calls still queued are checked again after hedge_delay
+                started = batch_report.get("admitted", now)
+                timeout = min(timeout, max(0.0, started + hedge_delay - now))
+
+        done, _ = wait(list(self.calls), timeout=timeout, return_when=FIRST_COMPLETED)
+        if done:
+            for future in done:
+                if future in self.calls:  # Not abandoned after its sibling won
+                    self._collect(future)
+            return True
+
+        if self.budget.remaining_seconds() <= 0:
+            self.budget.exhausted = self.budget.exhausted or "time"
+            return False
+        # A call running past the usual latency is sent again; the first copy to finish is used
+        if hedge_delay is not None:
+            now = time.monotonic()
+            for future, (i, batch_report, _) in hedgeable:
+                if "admitted" in batch_report and now - batch_report["admitted"] >= hedge_delay:
+                    self.hedge_checked.add(future)
+                    self.hedges += self._submit(i, hedge=True)
+        return True
+
+    def _collect(self, future):
+        """Take a finished call's questions, drop its siblings and top up or finalize its job"""
+        i, batch_report, hedge = self.calls.pop(future)
+        questions, error = future.result()
+        self.budget.tokens += batch_report.get("tokens", 0)
+        self.queue_wait += batch_report.get("queue_wait", 0.0)
+        siblings = [other for other, call in self.calls.items() if call[0] == i]
+        if error:
+            self.errors.setdefault(self.jobs[i][0], error)
+            if siblings and not questions:
+                return  # The other copy of this call may still succeed
+        else:
+            self.succeeded = True
+            with self.api._latency_lock:
+                self.api._latencies.append(time.monotonic() - batch_report["admitted"])
+        self.hedge_wins += hedge
+        for other in siblings:
+            other.cancel()
+            with self._lock:
+                self.calls[other][1]["abandoned"] = True
+            self.abandoned[other] = self.calls.pop(other)[1]
+
+        if not self.on_question:
+            for q in questions:
+                self.accept(i, q)
+
+        if questions and (error or batch_report.get("dropped") or batch_report.get("truncated")):
+            self.salvage["salvaged_batches"] += 1
+            self.salvage["salvaged_questions"] += len(questions)
+        self.salvage["dropped_questions"] += batch_report.get("dropped", 0)
+
+        # Ask again, within the budget, for just the shortfall left by failures, duplicates,
+        # invalid or dropped questions; the job keeps its difficulty band. A failure is only
+        # retried once another call has worked, so an API that is down fails the run after
+        # one round instead of exhausting the budget
+        retry = self.succeeded or (questions and not error)
+        if (retry and len(self.accepted[i]) < self.jobs[i][1] and self.attempts[i] <= self.api.max_top_ups
+                and self._submit(i)):
+            self.top_ups += 1
+            return
+        self._finalize(i)
+
+    def _result(self) -> Tuple[List[Dict], List[Dict], str]:
+        if not any(self.accepted.values()) and self.errors:
+            pool, error = next(iter(self.errors.items()))
+            return [], [], f"Error generating {pool} questions: {error}"
+
+        # Order batches by difficulty band within each set, then interleave
+        pools = {"main": [], "buffer": []}
+        for i in sorted(range(len(self.jobs)), key=lambda i: self.jobs[i][2]):
+            pools[self.jobs[i][0]].append(self.accepted[i])
+        return (self.api._interleave(pools["main"])[:self.api.main_count],
+                self.api._interleave(pools["buffer"])[:self.api.buffer_count], "")
+
+
 class OpenRouterAPI:
     """Handle OpenRouter API calls for question generation with robust error handling"""
 
-    def __init__(self):
-        self.api_key = os.getenv('OR_API_KEY')
+    def __init__(self, max_concurrency: int = 8, batch_size: int = 5, max_retries: int = 3,
+                 pool_size: int = 10, connect_timeout: float = 10, read_timeout: float = 90,
+                 backoff_base: float = 1.0, backoff_max: float = 30.0,
+                 chunk_tokens: int = 750, max_input_tokens: int = 6000, question_store=None,
+                 scheduler: Optional[RequestScheduler] = None):
+        load_environment()
+        self.api_key = os.getenv('OR_API_KEY') or ("stand-in" if os.getenv("LLM_STANDIN") else None)
         self.base_url = "https://openrouter.ai/api/v1/chat/completions"
+        self.key_url = "https://openrouter.ai/api/v1/key"
+        self.model = "openai/gpt-oss-20b:free"
+
+        # Question set sizes and difficulty ranges
+        self.main_count = 10
+        self.main_range = (0.3, 0.7)
+        self.buffer_count = 10
+        self.buffer_range = (0.1, 0.9)
+
+        # Concurrent generation settings
+        self.max_concurrency = max(1, max_concurrency)
+        self.batch_size = max(1, batch_size)
+
+        # Document chunking: size of each chunk and cap on document tokens sent per run
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.max_input_tokens = max(self.chunk_tokens, max_input_tokens)
+
+        # Optional persistent bank (SQLiteQuestionStore) reused across documents and sessions
+        self.question_store = question_store
+
+        # Near-duplicate filtering: similarity threshold and follow-up requests per short batch
+        self.dedup_threshold = 0.8
+        self.max_top_ups = 3
+
+        # Per-upload generation budget
+        self.max_calls_per_upload = 30
+        self.max_tokens_per_upload = 150_000
+        self.max_generation_seconds = 180.0
+
+        # Hedging: a call still running past this percentile of recent call latencies is sent again
+        self.hedge_percentile = 0.9
+        self.hedge_min_samples = 5
+        self.hedge_min_delay = 1.0  # Never hedge calls faster than this, in seconds
+        self._latencies = deque(maxlen=100)
+        self._latency_lock = threading.Lock()
+
+        # Admission control shared with every other client in the process, and the
+        # completion size assumed per question when charging the token bucket up front
+        self.scheduler = scheduler or get_request_scheduler()
+        self.completion_tokens_per_question = 150
+
+        # HTTP settings
+        self.session = get_http_session(pool_size)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
 
         if not self.api_key:
             raise ValueError("OR_API_KEY not found in environment variables. Please add it to your .env file.")
 
-    def clean_json_response(self, content: str) -> str:
-        """Clean and repair JSON response from API"""
-        # Remove markdown code blocks
-        content = re.sub(r'^```[a-zA-Z]*\n', '', content, flags=re.MULTILINE)
-        content = re.sub(r'\n```$', '', content, flags=re.MULTILINE)
-        content = content.strip()
+    def generation_params(self) -> Dict:
+        """Parameters that determine the generated question set (used as a cache key)"""
+        return {
+            "model": self.model,
+            "main_count": self.main_count,
+            "main_range": list(self.main_range),
+            "buffer_count": self.buffer_count,
+            "buffer_range": list(self.buffer_range),
+            "chunk_tokens": self.chunk_tokens,
+            "max_input_tokens": self.max_input_tokens,
+            "dedup_threshold": self.dedup_threshold
+        }
 
-        # Remove any text before the first {
-        first_brace = content.find('{')
-        if first_brace > 0:
-            content = content[first_brace:]
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential back-off with jitter for the given retry attempt"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
 
-        # Remove any text after the last }
-        last_brace = content.rfind('}')
-        if last_brace > 0:
-            content = content[:last_brace + 1]
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        """Parse a Retry-After header given either in seconds or as an HTTP date"""
+        retry_after = response.headers.get("Retry-After")
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        from email.utils import parsedate_to_datetime
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
 
-        return content
+    def _post_completion(self, headers: Dict, data: Dict, stream: bool = False):
+        """POST a chat completion, retrying on rate limits, server errors and failed connects
+
+        Callers hold a scheduler slot; retries wait for the scheduler's request
+        bucket and any 429 back-off, which holds back every call in the process.
+        """
+        import requests
+        with tracer.span("llm.request", stream=stream) as span:
+            if tracer.enabled:
+                tracer.count("llm_payload_bytes_total", len(json.dumps(data)), direction="sent")
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    self.scheduler.throttle()
+                try:
+                    response = self.session.post(self.base_url, headers=headers, json=data, stream=stream,
+                                                 timeout=(self.connect_timeout, self.read_timeout))
+                except requests.ConnectionError:
+                    # Covers connect timeouts; read timeouts are not retried since the model may still be working
+                    if attempt == self.max_retries:
+                        raise
+                    tracer.count("llm_retries_total", status="connection_error")
+                    time.sleep(self._backoff_delay(attempt))
+                    continue
+
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    break
+                response.close()
+                tracer.count("llm_retries_total", status=str(response.status_code))
+
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff_delay(attempt)
+                if response.status_code == 429:
+                    self.scheduler.pause(delay)
+                else:
+                    time.sleep(delay)
+
+            span.set(status=response.status_code, retries=attempt)
+
+        response.raise_for_status()
+        return response
+
+    def _headers(self) -> Dict:
+        """Request headers for the OpenRouter API"""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
 
-    def generate_questions_batch(self, text_content: str, count: int, difficulty_range: tuple) -> Tuple[List[Dict], str]:
-        """Generate a batch of questions with specific count and difficulty range"""
+    def check_health(self, timeout: float = 10) -> Tuple[bool, str]:
+        """Check that the API is reachable and accepts the key; returns (ok, error)"""
+        import requests
         try:
-            min_diff, max_diff = difficulty_range
-
+            response = self.session.get(self.key_url, headers=self._headers(),
+                                        timeout=(self.connect_timeout, timeout))
+        except requests.RequestException as e:
+            return False, f"OpenRouter unreachable: {str(e)}"
+
+        with response:
+            if response.status_code in (401, 403):
+                return False, "OpenRouter rejected the API key"
+            if response.status_code != 200:
+                return False, f"OpenRouter returned HTTP {response.status_code}"
+        return True, ""
+
+    def _build_prompt(self, text_content: str, count: int, difficulty_range: tuple) -> str:
+        """Prompt asking for count questions within difficulty_range from text_content"""
+        min_diff, max_diff = difficulty_range
+
+        with tracer.span("prompt.build", count=count) as span:
             prompt = f"""Generate exactly {count} multiple-choice questions from this text in JSON format.
 
-Text: {text_content[:3000]}
+Text: {text_content[:self.chunk_tokens * CHARS_PER_TOKEN]}
 
 Requirements:
 - Exactly {count} questions
@@ -103,95 +683,356 @@ JSON Schema:
         }}
     ]
 }}"""
+            span.set(chars=len(prompt))
+        return prompt
 
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
+    @staticmethod
+    def _usage_tokens(usage: Optional[Dict], data: Dict, response_chars: int) -> int:
+        """Tokens used by a call: the API's usage block, or an estimate from prompt and response size"""
+        if isinstance(usage, dict):
+            total = usage.get("total_tokens") or (usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0))
+            if total:
+                return int(total)
+        prompt_chars = sum(len(message["content"]) for message in data["messages"])
+        return (prompt_chars + response_chars) // CHARS_PER_TOKEN
+
+    def _estimate_tokens(self, data: Dict, count: int) -> int:
+        """Tokens a call for count questions is expected to use, charged before it is sent"""
+        prompt_chars = sum(len(message["content"]) for message in data["messages"])
+        return prompt_chars // CHARS_PER_TOKEN + count * self.completion_tokens_per_question
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds after which a running call is hedged, or None until enough latencies are known"""
+        with self._latency_lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return max(self.hedge_min_delay, ordered[min(len(ordered) - 1, int(self.hedge_percentile * len(ordered)))])
 
+    @staticmethod
+    def validate_question(q) -> bool:
+        """Check a generated question has every required field and a valid answer key"""
+        return (isinstance(q, Mapping) and all(field in q for field in REQUIRED_QUESTION_FIELDS)
+                and isinstance(q["options"], Mapping) and q["correct_answer"] in q["options"])
+
+    def generate_questions_batch(self, text_content: str, count: int, difficulty_range: tuple,
+                                 report: Optional[Dict] = None, priority: int = PRIORITY_INTERACTIVE,
+                                 session_key: str = "") -> Tuple[List[Dict], str]:
+        """Generate a batch of questions with specific count and difficulty range
+
+        Every well-formed question is kept even when the response is truncated
+        or partly corrupt; report, if given, receives the salvage counts. The
+        call waits for a scheduler slot in its priority class and session.
+        """
+        try:
             data = {
-                "model": "openai/gpt-oss-20b:free",
-                "messages": [{"role": "user", "content": prompt}],
+                "model": self.model,
+                "messages": [{"role": "user", "content": self._build_prompt(text_content, count, difficulty_range)}],
                 "temperature": 0.7
             }
 
-            response = requests.post(self.base_url, headers=headers, json=data, timeout=90)
-            response.raise_for_status()
+            with self.scheduler.slot(priority, session_key, self._estimate_tokens(data, count)) as slot:
+                if report is not None:
+                    report.update(admitted=time.monotonic(), queue_wait=slot.waited)
+                response = self._post_completion(self._headers(), data)
+                resp_data = response.json()
+                slot.used = self._usage_tokens(resp_data.get("usage"), data, len(response.content))
 
-            resp_data = response.json()
+            if tracer.enabled:
+                tracer.count("llm_payload_bytes_total", len(response.content), direction="received")
+                tracer.record_usage(resp_data.get("usage"))
+            if report is not None:
+                report["tokens"] = slot.used
 
             if "choices" in resp_data and isinstance(resp_data["choices"], list) and len(resp_data["choices"]) > 0:
                 content = resp_data["choices"][0]["message"]["content"]
             else:
                 raise ValueError(f"Invalid API response: {resp_data}")
 
-            # Clean the JSON response
-            cleaned_content = self.clean_json_response(content)
-
-            # Parse JSON
-            try:
-                questions_data = json.loads(cleaned_content)
-            except json.JSONDecodeError as e:
-                # Try to fix common JSON issues
-                cleaned_content = re.sub(r',\s*}', '}', cleaned_content)  # Remove trailing commas
-                cleaned_content = re.sub(r',\s*]', ']', cleaned_content)  # Remove trailing commas in arrays
-                questions_data = json.loads(cleaned_content)
+            with tracer.span("json.salvage", bytes=len(content)) as span:
+                questions, salvage = salvage_questions(content)
+                span.set(**salvage)
+            tracer.count("questions_total", salvage["dropped"], outcome="dropped")
+            if report is not None:
+                report.update(salvage)
 
-            if "questions" not in questions_data:
+            if not salvage["found_array"]:
                 return [], "Error: Invalid API response format"
 
-            questions = questions_data["questions"]
-
             # Validate each question
-            valid_questions = []
-            for i, q in enumerate(questions):
-                required_fields = ["question", "options", "correct_answer", "difficulty", "explanation", "topic"]
-                if all(field in q for field in required_fields):
-                    if q["correct_answer"] in q["options"]:
-                        valid_questions.append(q)
+            with tracer.span("questions.validate", received=len(questions)) as span:
+                valid_questions = [q for q in questions if self.validate_question(q)]
+                span.set(valid=len(valid_questions))
+            tracer.count("questions_total", len(valid_questions), outcome="valid")
+            tracer.count("questions_total", len(questions) - len(valid_questions), outcome="invalid")
 
             return valid_questions, ""
 
         except Exception as e:
             return [], f"Error in batch generation: {str(e)}"
 
-    def generate_questions(self, text_content: str) -> Tuple[List[Dict], str]:
-        """Generate 20 questions total: 10 main + 10 buffer with retry logic"""
+    def stream_questions_batch(self, text_content: str, count: int, difficulty_range: tuple,
+                               on_question: Optional[Callable[[Dict], None]] = None,
+                               report: Optional[Dict] = None, priority: int = PRIORITY_INTERACTIVE,
+                               session_key: str = "") -> Tuple[List[Dict], str]:
+        """Generate a batch over a streamed (SSE) response, emitting each question as soon as it is complete
+
+        Questions validated before an error are still returned (and were
+        already passed to on_question); report, if given, receives the salvage
+        counts as for generate_questions_batch. The scheduler slot is held
+        until the stream ends.
+        """
+        valid_questions = []
+        parser = QuestionStreamParser()
+        received = invalid = 0
+        usage = None
         try:
-            all_questions = []
-
-            # Generate main set (difficulty 0.3-0.7)
-            main_questions, error1 = self.generate_questions_batch(text_content, 10, (0.3, 0.7))
-            if error1:
-                return [], f"Error generating main questions: {error1}"
+            data = {
+                "model": self.model,
+                "messages": [{"role": "user", "content": self._build_prompt(text_content, count, difficulty_range)}],
+                "temperature": 0.7,
+                "stream": True,
+                "usage": {"include": True}  # Token counts arrive in the final event
+            }
 
-            all_questions.extend(main_questions)
+            with self.scheduler.slot(priority, session_key, self._estimate_tokens(data, count)) as slot:
+                if report is not None:
+                    report.update(admitted=time.monotonic(), queue_wait=slot.waited)
+                with self._post_completion(self._headers(), data, stream=True) as response, \
+                        tracer.span("llm.stream") as span:
+                    response.encoding = "utf-8"
+                    for line in response.iter_lines(decode_unicode=True):
+                        received += len(line) + 1
+                        # Skip keep-alive comments and non-data fields
+                        if not line or not line.startswith("data:"):
+                            continue
+                        payload = line[5:].strip()
+                        if payload == "[DONE]":
+                            break
+
+                        event = json.loads(payload)
+                        if "error" in event:
+                            raise ValueError(f"Stream error: {event['error']}")
+                        if event.get("usage"):
+                            usage = event["usage"]
+                            tracer.record_usage(usage)
+                        choices = event.get("choices") or []
+                        if not choices:
+                            continue
+
+                        content = (choices[0].get("delta") or {}).get("content") or ""
+                        for q in parser.feed(content):
+                            if self.validate_question(q):
+                                valid_questions.append(q)
+                                if on_question:
+                                    on_question(q)
+                            else:
+                                invalid += 1
+
+                        # When tracing, read on to the usage event that follows the content
+                        if parser.array_closed and not tracer.enabled:
+                            break
+                    span.set(bytes=received, valid=len(valid_questions))
+                slot.used = self._usage_tokens(usage, data, received)
+            tracer.count("llm_payload_bytes_total", received, direction="received")
+            tracer.count("questions_total", len(valid_questions), outcome="valid")
+            tracer.count("questions_total", invalid, outcome="invalid")
+
+            if not parser.found_array:
+                return valid_questions, "Error: Invalid API response format"
 
-            # Wait a bit to avoid rate limiting
-            time.sleep(1)
+            return valid_questions, ""
 
-            # Generate buffer set (difficulty 0.1-0.9) 
-            buffer_questions, error2 = self.generate_questions_batch(text_content, 10, (0.1, 0.9))
-            if error2:
-                return [], f"Error generating buffer questions: {error2}"
+        except Exception as e:
+            return valid_questions, f"Error in batch generation: {str(e)}"
+
+        finally:
+            parser.close()
+            tracer.count("questions_total", parser.dropped, outcome="dropped")
+            if report is not None:
+                report.update({"salvaged": parser.parsed, "dropped": parser.dropped,
+                               "truncated": parser.truncated, "found_array": parser.found_array})
+                if received:
+                    report["tokens"] = self._usage_tokens(usage, data, received)
+
+    def chunk_text(self, text_content: str) -> List[str]:
+        """Split text into chunks of at most chunk_tokens, breaking on paragraphs where possible"""
+        max_chars = self.chunk_tokens * CHARS_PER_TOKEN
+        chunks = []
+        current = []
+        current_len = 0
+
+        for paragraph in re.split(r'\n\s*\n', text_content):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+
+            # Hard-split paragraphs that exceed a chunk on their own, at whitespace when possible
+            while len(paragraph) > max_chars:
+                cut = paragraph.rfind(' ', 0, max_chars)
+                if cut <= 0:
+                    cut = max_chars
+                pieces = [paragraph[:cut].strip(), paragraph[cut:].strip()]
+                if current:
+                    chunks.append("\n\n".join(current))
+                    current, current_len = [], 0
+                chunks.append(pieces[0])
+                paragraph = pieces[1]
+
+            if current and current_len + len(paragraph) + 2 > max_chars:
+                chunks.append("\n\n".join(current))
+                current, current_len = [], 0
+            current.append(paragraph)
+            current_len += len(paragraph) + 2
+
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
+
+    def _select_chunks(self, chunks: List[str], max_chunks: int) -> List[str]:
+        """Pick up to max_chunks chunks spread evenly over the document"""
+        if len(chunks) <= max_chunks:
+            return chunks
+        return [chunks[(i * len(chunks)) // max_chunks] for i in range(max_chunks)]
+
+    def _build_batch_plan(self, count: int, difficulty_range: tuple, num_batches: Optional[int] = None) -> List[Tuple[int, tuple]]:
+        """Split a question set into smaller batches over adjacent difficulty bands"""
+        min_diff, max_diff = difficulty_range
+        num_batches = min(count, num_batches or max(1, -(-count // self.batch_size)))
+        band_width = (max_diff - min_diff) / num_batches
+
+        plan = []
+        remaining = count
+        for i in range(num_batches):
+            batch_count = remaining // (num_batches - i)
+            remaining -= batch_count
+            band = (round(min_diff + i * band_width, 2), round(min_diff + (i + 1) * band_width, 2))
+            plan.append((batch_count, band))
+        return plan
 
-            all_questions.extend(buffer_questions)
+    @staticmethod
+    def _interleave(batches: List[List[Dict]]) -> List[Dict]:
+        """Round-robin merge so truncating the result keeps every batch represented"""
+        merged = []
+        for i in range(max((len(batch) for batch in batches), default=0)):
+            merged.extend(batch[i] for batch in batches if i < len(batch))
+        return merged
+
+    def _plan_batches(self, text_content: str) -> Tuple[List[str], List[Tuple[str, int, tuple]]]:
+        """Chunks spread over the document and (set, count, band) batch jobs; job i is sent chunk i % len(chunks)"""
+        total_count = self.main_count + self.buffer_count
+        max_chunks = min(total_count, max(1, self.max_input_tokens // self.chunk_tokens))
+        chunks = self._select_chunks(self.chunk_text(text_content) or [text_content], max_chunks)
+
+        # Use at least one batch per chunk so every selected chunk is sent
+        main_batches = max(-(-self.main_count // self.batch_size),
+                           round(len(chunks) * self.main_count / total_count))
+        buffer_batches = max(-(-self.buffer_count // self.batch_size), len(chunks) - main_batches)
+        main_jobs = [("main", count, band) for count, band in self._build_batch_plan(self.main_count, self.main_range, main_batches)]
+        buffer_jobs = [("buffer", count, band) for count, band in self._build_batch_plan(self.buffer_count, self.buffer_range, buffer_batches)]
+
+        # Alternate main and buffer batches before assigning chunks so both sets span the document
+        jobs = [job for pair in zip(main_jobs, buffer_jobs) for job in pair]
+        jobs += main_jobs[len(buffer_jobs):] + buffer_jobs[len(main_jobs):]
+        return chunks, jobs
+
+    def _stored_batches(self, jobs: List[Tuple[str, int, tuple]], document: Optional[str]) -> Dict[int, List[Dict]]:
+        """Questions from the store for each job's difficulty band, never the same question twice"""
+        if document is None:
+            return {}
 
-            if len(all_questions) < 15:  # Minimum acceptable
-                return [], f"Only generated {len(all_questions)} valid questions, need at least 15"
+        from question_store import question_fingerprint
+
+        stored = {}
+        taken = set()
+        for i, (_, count, band) in enumerate(jobs):
+            questions = [q for q in self.question_store.range_query(band[0], band[1], document=document,
+                                                                    exclude=taken, limit=count)
+                         if self.validate_question(q)]
+            taken.update(question_fingerprint(q) for q in questions)
+            if questions:
+                stored[i] = questions
+        return stored
+
+    def generate_questions_concurrent(self, text_content: str,
+                                      on_question: Optional[Callable[[str, Dict], None]] = None,
+                                      on_set_complete: Optional[Callable[[str], None]] = None,
+                                      report: Optional[Dict] = None,
+                                      session_key: str = "") -> Tuple[List[Dict], List[Dict], str]:
+        """Generate main and buffer sets as concurrent batches over document chunks
+
+        With on_question, batches are streamed and on_question(set_name, question)
+        is called for each question as it is accepted; on_set_complete(set_name)
+        is called once a set is finished. report, if given, receives the
+        counters of GenerationRun.report().
+        """
+        run = GenerationRun(self, text_content, on_question, on_set_complete, session_key)
+        main_questions, buffer_questions, error = run.run()
+        if report is not None:
+            report.update(run.report())
+        return main_questions, buffer_questions, error
+
+    def _generate_unique_batch(self, text_content: str, count: int, difficulty_range: tuple,
+                               seen: NearDuplicateIndex) -> Tuple[List[Dict], str]:
+        """Generate a batch without near-duplicates of seen, re-requesting only the missing count
+
+        Failed attempts are retried like short ones; an error is only returned if nothing was generated.
+        """
+        unique = []
+        error = ""
+        for attempt in range(self.max_top_ups + 1):
+            questions, error = self.generate_questions_batch(text_content, count - len(unique), difficulty_range)
+            unique.extend(q for q in questions if seen.add_if_new(len(seen), q))
+            if len(unique) >= count:
+                break
+        return unique[:count], "" if unique else error
+
+    def _store_questions(self, questions: List[Dict], text_content: str):
+        """Add validated questions to the question store, if one is configured"""
+        if self.question_store is not None:
+            self.question_store.add_questions(questions, self.question_store.document_key(text_content))
+
+    def generate_questions(self, text_content: str, concurrent: bool = True) -> Tuple[List[Dict], str]:
+        """Generate up to 20 questions: 10 main + 10 buffer, keeping whatever is valid
+
+        Fails only when fewer than main_count questions (one full test) could
+        be generated; a short pool is returned as is, never padded.
+        """
+        try:
+            all_questions = []
 
-            # Pad with easy questions if needed
-            while len(all_questions) < 20:
-                all_questions.append({
-                    "question": f"Review question {len(all_questions) + 1}",
-                    "options": {"A": "Option A", "B": "Option B", "C": "Option C", "D": "Option D"},
-                    "correct_answer": "A",
-                    "difficulty": 0.3,
-                    "explanation": "This is a review question.",
-                    "topic": "General"
-                })
+            if concurrent:
+                main_questions, buffer_questions, error = self.generate_questions_concurrent(text_content)
+                if error:
+                    return [], error
 
-            return all_questions[:20], ""  # Return exactly 20
+                all_questions.extend(main_questions)
+                all_questions.extend(buffer_questions)
+            else:
+                # One batch at a time over the same chunks and bands as the concurrent path
+                chunks, jobs = self._plan_batches(text_content)
+                seen = NearDuplicateIndex(self.dedup_threshold)
+                pools = {"main": [], "buffer": []}
+                errors = {}
+                for i in sorted(range(len(jobs)), key=lambda i: (jobs[i][0] != "main", jobs[i][2])):
+                    pool, count, band = jobs[i]
+                    questions, error = self._generate_unique_batch(chunks[i % len(chunks)], count, band, seen)
+                    if error:
+                        errors.setdefault(pool, error)
+                    self._store_questions(questions, text_content)
+                    pools[pool].append(questions)
+
+                all_questions.extend(self._interleave(pools["main"])[:self.main_count])
+                all_questions.extend(self._interleave(pools["buffer"])[:self.buffer_count])
+
+                if not all_questions and errors:
+                    pool, error = next(iter(errors.items()))
+                    return [], f"Error generating {pool} questions: {error}"
+
+            if len(all_questions) < self.main_count:  # Not enough for one full test
+                return [], f"Only generated {len(all_questions)} valid questions, need at least {self.main_count}"
+
+            return all_questions, ""
 
         except Exception as e:
             return [], f"Error generating questions: {str(e)}"
@@ -201,9 +1042,18 @@ class AdaptiveTestEngine:
     """Enhanced adaptive test engine with buffer support"""
 
     def __init__(self, main_questions: List[Dict], buffer_questions: List[Dict] = None):
-        self.main_questions = main_questions
-        self.buffer_questions = buffer_questions or []
-        self.all_questions = main_questions + self.buffer_questions
+        self.all_questions = QuestionBank()  # Compact storage; questions are read back as dict-like views
+        # Positions in all_questions; stable as questions are appended
+        self._main_indices = []
+        self._buffer_indices = []
+        # Difficulty indexes over unused main/buffer questions for O(log n) selection
+        self._main_index = DifficultyIndex()
+        self._buffer_index = DifficultyIndex()
+
+        # Questions may be appended from a generation thread while the test runs
+        self._condition = threading.Condition()
+        self._pending_sets = set()  # Question sets ("main", "buffer") still being generated
+        self.arrival_timeout = 90  # Seconds to wait for a pending question before giving up
 
         self.user_ability = 0.5
         self.current_difficulty = 0.5
@@ -213,53 +1063,301 @@ class AdaptiveTestEngine:
         self.question_history = []
         self.used_questions = set()
         self.max_questions = 10  # Only show 10 questions to user
+        self._last_selected = None  # Position of the question awaiting an answer
+
+        # Next question precomputed for each answer outcome while a question is shown
+        self._lookahead = None       # (state token, {True: position, False: position})
+        self._lookahead_next = None  # (pool size, pending sets, position) committed by the answer
+        self.lookahead_hits = 0      # Cumulative across reset(), for measuring the hit rate
+        self.lookahead_misses = 0
+        self.on_lookahead = None     # Optional callback(hit: bool) per committed speculation
+
+        # Running aggregates, updated per answer so results never rescan history
+        self.overall_stats = self._new_aggregate()
+        self.topic_stats = {}
+
+        # Optional persistent store to draw from when the pool has nothing near the target
+        self.question_store = None
+        self.store_document = None
+        self.store_draw_size = 3
+        self._store_fingerprints = set()  # Fingerprints and topics of pool questions, kept incrementally
+        self._store_topics = set()
+        self._store_seen_count = 0
+
+        # Incremental hash of the question pool, referenced by snapshots
+        self._in_buffer = bytearray()  # Set-membership flag per position in all_questions
+        self._bank_hash = hashlib.blake2b(digest_size=16)
+        self._bank_hashed_count = 0
+
+        self.add_questions(main_questions)
+        self.add_questions(buffer_questions or [], buffer=True)
+
+    @property
+    def pending_question_id(self) -> Optional[int]:
+        """Position in all_questions of the question served but not yet answered"""
+        return self._last_selected
+
+    def add_questions(self, questions: List[Dict], buffer: bool = False):
+        """Append questions to the main or buffer set (thread-safe)"""
+        with self._condition:
+            for q in questions:
+                idx = self.all_questions.append(q)
+                self._in_buffer.append(1 if buffer else 0)
+                if buffer:
+                    self._buffer_indices.append(idx)
+                    self._buffer_index.add(self.all_questions.difficulty(idx), idx)
+                else:
+                    self._main_indices.append(idx)
+                    self._main_index.add(self.all_questions.difficulty(idx), idx)
+            self._condition.notify_all()
+
+    @property
+    def main_questions(self) -> List[Mapping]:
+        """Questions of the main set, in the order added"""
+        with self._condition:
+            return [self.all_questions[i] for i in self._main_indices]
+
+    @property
+    def buffer_questions(self) -> List[Mapping]:
+        """Questions of the buffer set, in the order added"""
+        with self._condition:
+            return [self.all_questions[i] for i in self._buffer_indices]
+
+    @property
+    def generation_pending(self) -> bool:
+        """Whether any question set is still being generated"""
+        return bool(self._pending_sets)
+
+    def begin_generation(self, sets: Tuple[str, ...] = ("main", "buffer")):
+        """Mark that more questions are still being generated for the given sets"""
+        with self._condition:
+            self._pending_sets.update(sets)
+
+    def finish_generation(self, set_name: Optional[str] = None):
+        """Mark one set (or every set) as finished and wake anyone waiting for questions"""
+        with self._condition:
+            if set_name is None:
+                self._pending_sets.clear()
+            else:
+                self._pending_sets.discard(set_name)
+            self._condition.notify_all()
+
+    def count_questions_near(self, target_difficulty: float, tolerance: float) -> int:
+        """Number of unused questions within tolerance of target_difficulty"""
+        with self._condition:
+            return sum(1 for i, difficulty in enumerate(self.all_questions.difficulties)
+                       if i not in self.used_questions and abs(difficulty - target_difficulty) <= tolerance)
+
+    def wait_for_questions(self, target_difficulty: float = 0.5, tolerance: float = 0.2,
+                           min_count: int = 3, timeout: Optional[float] = None) -> bool:
+        """Block until the main set is complete or min_count unused questions are near target_difficulty
+
+        Returns whether any unused question is available to start with.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: ("main" not in self._pending_sets
+                         or self.count_questions_near(target_difficulty, tolerance) >= min_count),
+                timeout
+            )
+            return len(self.used_questions) < len(self.all_questions)
 
     def get_next_question(self) -> Optional[Dict]:
-        """Get next question from main set first, then buffer if needed"""
+        """Get next question from main set first, then buffer if needed
+
+        Waits only for questions that have not arrived yet: while the buffer is
+        still generating and no main question is close enough, it waits for a
+        suitable buffer question instead of falling back to a poor match, and
+        while anything is generating it waits if every question has been used.
+        """
         if self.questions_attempted >= self.max_questions:
             return None  # Completed test
 
+        with self._condition:
+            # Fill a gap from the store first: the pool then grows and a stale lookahead misses
+            self._draw_from_store(self.current_difficulty)
+            question = self._take_lookahead()
+            if question is not None:
+                return question
+
+            deadline = time.monotonic() + self.arrival_timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                buffer_pending = "buffer" in self._pending_sets and remaining > 0
+                question = self._select_question(fallback=not buffer_pending)
+                if question is not None or not self.generation_pending or remaining <= 0:
+                    return question
+                self._condition.wait(remaining)
+
+    def _rebuild_indexes(self):
+        """Rebuild the difficulty indexes from every question not in used_questions"""
+        self._main_index = DifficultyIndex((self.all_questions.difficulty(i), i)
+                                           for i in self._main_indices if i not in self.used_questions)
+        self._buffer_index = DifficultyIndex((self.all_questions.difficulty(i), i)
+                                             for i in self._buffer_indices if i not in self.used_questions)
+
+    def _select_question(self, fallback: bool = True) -> Optional[Dict]:
+        """Pick and mark the best unused question for the current difficulty"""
+        idx = self._find_question(self.current_difficulty, fallback)
+        return None if idx is None else self._take_question(idx)
+
+    def _find_question(self, target_difficulty: float, fallback: bool = True) -> Optional[int]:
+        """Position of the best unused question for target_difficulty, without selecting it
+
+        Prefers the closest main question within 0.2, then the closest buffer
+        question within 0.3, then (if fallback) the closest unused question of
+        either set; ties go to the earliest-added question.
+        """
         if len(self.used_questions) >= len(self.all_questions):
             return None  # All questions used
 
-        target_difficulty = self.current_difficulty
-        tolerance = 0.2
-
-        # Try main questions first
-        candidates = []
-        for i, q in enumerate(self.main_questions):
-            if i not in self.used_questions:
-                diff = abs(q["difficulty"] - target_difficulty)
-                if diff <= tolerance:
-                    candidates.append((i, q, diff))
-
-        # If no good match in main, try buffer
-        if not candidates:
-            tolerance = 0.3
-            offset = len(self.main_questions)
-            for i, q in enumerate(self.buffer_questions):
-                idx = offset + i
-                if idx not in self.used_questions:
-                    diff = abs(q["difficulty"] - target_difficulty)
-                    if diff <= tolerance:
-                        candidates.append((idx, q, diff))
+        # Try main questions first, then buffer if no good match
+        match = self._main_index.nearest(target_difficulty, 0.2)
+        if match is None:
+            match = self._buffer_index.nearest(target_difficulty, 0.3)
 
         # If still no match, take any unused
-        if not candidates:
-            for i, q in enumerate(self.all_questions):
-                if i not in self.used_questions:
-                    candidates.append((i, q, abs(q["difficulty"] - target_difficulty)))
-
-        if not candidates:
+        if match is None:
+            if not fallback:
+                return None
+            options = [found for found in (self._main_index.nearest(target_difficulty),
+                                           self._buffer_index.nearest(target_difficulty))
+                       if found is not None]
+            if not options:
+                return None
+            match = min(options)
+
+        return match[1]
+
+    def _has_question_near(self, target_difficulty: float, tolerance: float) -> bool:
+        """Whether an unused question lies within tolerance of target_difficulty"""
+        return (self._main_index.nearest(target_difficulty, tolerance) is not None
+                or self._buffer_index.nearest(target_difficulty, tolerance) is not None)
+
+    def attach_question_store(self, question_store, document: Optional[str] = None, draw_size: int = 3):
+        """Draw from a persistent question store (SQLiteQuestionStore) when the pool runs dry
+
+        When no unused question is within 0.2 of the target difficulty, up to
+        draw_size stored questions in that range are added to the buffer: from
+        the same document if possible, otherwise on topics already in the pool.
+        Answers also update the store's usage counts.
+        """
+        with self._condition:
+            self.question_store = question_store
+            self.store_document = document
+            self.store_draw_size = draw_size
+
+    def _draw_from_store(self, target_difficulty: float, tolerance: float = 0.2):
+        """Range-query the question store around target_difficulty if the pool has a gap there"""
+        if self.question_store is None or self._has_question_near(target_difficulty, tolerance):
+            return
+
+        from question_store import question_fingerprint
+
+        for idx in range(self._store_seen_count, len(self.all_questions)):
+            self._store_fingerprints.add(question_fingerprint(self.all_questions[idx]))
+            self._store_topics.add(self.all_questions.topic(idx))
+        self._store_seen_count = len(self.all_questions)
+
+        low, high = target_difficulty - tolerance, target_difficulty + tolerance
+        questions = []
+        if self.store_document is not None:
+            questions = self.question_store.range_query(low, high, document=self.store_document,
+                                                        exclude=self._store_fingerprints, limit=self.store_draw_size)
+        if not questions and self._store_topics:
+            questions = self.question_store.range_query(low, high, topics=sorted(self._store_topics),
+                                                        exclude=self._store_fingerprints, limit=self.store_draw_size)
+        if questions:
+            self.add_questions(questions, buffer=True)
+
+    def _take_question(self, idx: int) -> Dict:
+        """Mark the question at idx as used and awaiting an answer"""
+        (self._buffer_index if self._in_buffer[idx] else self._main_index).remove(idx)
+        self.used_questions.add(idx)
+        self._last_selected = idx
+        return self.all_questions[idx]
+
+    def _peek_question(self, is_correct: bool, fallback: bool = True) -> Optional[int]:
+        """Position of the question selection would pick after this answer to the pending question"""
+        return self._find_question(self._next_difficulty(is_correct), fallback)
+
+    def _lookahead_token(self) -> Tuple:
+        """State a precomputed lookahead depends on besides the answer outcome"""
+        return self._last_selected, len(self.all_questions), frozenset(self._pending_sets)
+
+    def precompute_lookahead(self):
+        """Speculatively pick the next question for both outcomes of the pending question
+
+        Nothing is marked used: process_answer() keeps the branch matching the
+        answer and drops the other, and the next get_next_question() returns
+        the kept question in O(1) if the pool has not changed in between.
+        """
+        with self._condition:
+            if self._last_selected is None or self.questions_attempted + 1 >= self.max_questions:
+                self._lookahead = None
+                return
+            token = self._lookahead_token()
+            if self._lookahead is not None and self._lookahead[0] == token:
+                return  # Already computed for this question
+
+            fallback = "buffer" not in self._pending_sets
+            self._lookahead = (token, {outcome: self._peek_question(outcome, fallback) for outcome in (True, False)})
+
+    def _commit_lookahead(self, is_correct: bool):
+        """Keep the lookahead branch for this answer, if it was computed for the current state"""
+        with self._condition:
+            lookahead, self._lookahead = self._lookahead, None
+            if lookahead is not None and lookahead[0] == self._lookahead_token():
+                self._lookahead_next = (len(self.all_questions), frozenset(self._pending_sets), lookahead[1][is_correct])
+
+    def _take_lookahead(self) -> Optional[Dict]:
+        """Select the committed lookahead question if it is still valid, recording a hit or miss"""
+        committed, self._lookahead_next = self._lookahead_next, None
+        if committed is None:
             return None
 
-        # Select best match
-        best_idx, best_question, _ = min(candidates, key=lambda x: x[2])
-        self.used_questions.add(best_idx)
-        return best_question
+        pool_size, pending_sets, idx = committed
+        if idx is None:
+            return None  # Nothing was selectable; selection decides whether to wait or end
+        hit = (pool_size == len(self.all_questions)
+               and pending_sets == frozenset(self._pending_sets) and idx not in self.used_questions)
+        if hit:
+            self.lookahead_hits += 1
+        else:
+            self.lookahead_misses += 1
+        if self.on_lookahead:
+            self.on_lookahead(hit)
+        return self._take_question(idx) if hit else None
 
-    def process_answer(self, is_correct: bool, time_taken: float, question_difficulty: float) -> Dict:
-        """Process answer and update metrics"""
+    def lookahead_stats(self) -> Dict:
+        """Hits, misses and hit rate of committed lookahead predictions"""
+        total = self.lookahead_hits + self.lookahead_misses
+        return {"hits": self.lookahead_hits, "misses": self.lookahead_misses,
+                "hit_rate": self.lookahead_hits / total if total else 0.0}
+
+    @staticmethod
+    def _new_aggregate() -> Dict:
+        return {"count": 0, "correct": 0, "time_min": float("inf"), "time_max": 0.0,
+                "time_sum": 0.0, "difficulty_sum": 0.0}
+
+    @staticmethod
+    def _update_aggregate(aggregate: Dict, is_correct: bool, time_taken: float, difficulty: float):
+        aggregate["count"] += 1
+        aggregate["correct"] += int(is_correct)
+        aggregate["time_min"] = min(aggregate["time_min"], time_taken)
+        aggregate["time_max"] = max(aggregate["time_max"], time_taken)
+        aggregate["time_sum"] += time_taken
+        aggregate["difficulty_sum"] += difficulty
+
+    def _add_to_aggregates(self, topic: str, is_correct: bool, time_taken: float, difficulty: float):
+        """Fold one answer into the overall and per-topic aggregates"""
+        self._update_aggregate(self.overall_stats, is_correct, time_taken, difficulty)
+        if topic not in self.topic_stats:
+            self.topic_stats[topic] = self._new_aggregate()
+        self._update_aggregate(self.topic_stats[topic], is_correct, time_taken, difficulty)
+
+    def _score_answer(self, is_correct: bool, question_difficulty: float) -> Tuple[int, float]:
+        """Update attempt, correct and point counters; returns (points_earned, multiplier)"""
         self.questions_attempted += 1
         multiplier = 1 + (question_difficulty - 0.5)
         base_points = 10
@@ -268,21 +1366,26 @@ class AdaptiveTestEngine:
             self.correct_answers += 1
             points_earned = int(base_points * multiplier)
             self.total_points += points_earned
+        else:
+            points_earned = 0
 
-            if time_taken < 10:
-                ability_increase = 0.1
-            else:
-                ability_increase = 0.05
+        return points_earned, multiplier
 
-            self.user_ability = min(0.9, self.user_ability + ability_increase)
-            self.current_difficulty = min(0.9, self.current_difficulty + 0.05)
+    def _record_answer(self, is_correct: bool, time_taken: float, question_difficulty: float,
+                       points_earned: int, multiplier: float) -> Dict:
+        """Append the answer to history against the last selected question and update aggregates"""
+        self._commit_lookahead(is_correct)
+        question_id = self._last_selected
+        self._last_selected = None
+        if question_id is not None:
+            topic = self.all_questions.topic(question_id)
         else:
-            points_earned = 0
-            self.user_ability = max(0.1, self.user_ability - 0.08)
-            self.current_difficulty = max(0.1, self.current_difficulty - 0.1)
+            topic = "Unknown"
 
         result = {
             "question_num": self.questions_attempted,
+            "question_id": question_id,
+            "topic": topic,
             "is_correct": is_correct,
             "time_taken": time_taken,
             "difficulty": question_difficulty,
@@ -293,6 +1396,10 @@ class AdaptiveTestEngine:
 
         self.question_history.append(result)
 
+        self._add_to_aggregates(topic, is_correct, time_taken, question_difficulty)
+        if self.question_store is not None and question_id is not None:
+            self.question_store.record_usage(self.all_questions[question_id], is_correct)
+
         return {
             "is_correct": is_correct,
             "points_earned": points_earned,
@@ -304,27 +1411,44 @@ class AdaptiveTestEngine:
             "total_points": self.total_points
         }
 
+    def _next_difficulty(self, is_correct: bool) -> float:
+        """Target difficulty after answering the pending question"""
+        if is_correct:
+            return min(0.9, self.current_difficulty + 0.05)
+        return max(0.1, self.current_difficulty - 0.1)
+
+    def process_answer(self, is_correct: bool, time_taken: float, question_difficulty: float) -> Dict:
+        """Process answer for the last selected question and update metrics"""
+        points_earned, multiplier = self._score_answer(is_correct, question_difficulty)
+
+        if is_correct:
+            if time_taken < 10:
+                ability_increase = 0.1
+            else:
+                ability_increase = 0.05
+
+            self.user_ability = min(0.9, self.user_ability + ability_increase)
+        else:
+            self.user_ability = max(0.1, self.user_ability - 0.08)
+        self.current_difficulty = self._next_difficulty(is_correct)
+
+        return self._record_answer(is_correct, time_taken, question_difficulty, points_earned, multiplier)
+
     def get_final_results(self) -> Dict:
-        """Calculate final test results"""
+        """Calculate final test results from the running aggregates"""
         if self.questions_attempted == 0:
             return {}
 
+        stats = self.overall_stats
         accuracy = (self.correct_answers / self.questions_attempted) * 100
-        avg_difficulty = sum(q["difficulty"] for q in self.question_history) / len(self.question_history)
-
-        times = [q["time_taken"] for q in self.question_history]
-        fastest_time = min(times) if times else 0
-        slowest_time = max(times) if times else 0
-
-        # Get incorrect topics
-        incorrect_topics = []
-        for result in self.question_history:
-            if not result["is_correct"]:
-                # Find corresponding question topic
-                for q in self.all_questions:
-                    if abs(q["difficulty"] - result["difficulty"]) < 0.01:
-                        incorrect_topics.append(q.get("topic", "Unknown"))
-                        break
+        avg_difficulty = stats["difficulty_sum"] / stats["count"] if stats["count"] else 0
+
+        fastest_time = stats["time_min"] if stats["count"] else 0
+        slowest_time = stats["time_max"] if stats["count"] else 0
+
+        # Topics with at least one incorrect answer, in the order first answered
+        incorrect_topics = [topic for topic, topic_stats in self.topic_stats.items()
+                            if topic_stats["correct"] < topic_stats["count"]]
 
         return {
             "total_points": self.total_points,
@@ -335,10 +1459,127 @@ class AdaptiveTestEngine:
             "fastest_time": fastest_time,
             "slowest_time": slowest_time,
             "final_ability": self.user_ability,
-            "incorrect_topics": list(set(incorrect_topics)),
+            "incorrect_topics": incorrect_topics,
+            "topic_stats": {topic: dict(topic_stats) for topic, topic_stats in self.topic_stats.items()},
             "question_history": self.question_history
         }
 
+    def bank_hash(self) -> bytes:
+        """Digest identifying the question pool (contents and main/buffer membership)
+
+        Hashing is incremental: only questions added since the last call are read.
+        """
+        with self._condition:
+            for idx in range(self._bank_hashed_count, len(self.all_questions)):
+                q = self.all_questions[idx]
+                self._bank_hash.update(b"B" if self._in_buffer[idx] else b"M")
+                self._bank_hash.update(json.dumps(dict(q), sort_keys=True, separators=(",", ":")).encode("utf-8"))
+            self._bank_hashed_count = len(self.all_questions)
+            return self._bank_hash.copy().digest()
+
+    def snapshot_with_pool(self) -> Tuple[bytes, List[Dict], List[Dict], bytes]:
+        """Pool hash, copies of the main and buffer sets and a to_bytes() snapshot, taken under one lock
+
+        Questions may still be streaming in; taking all four together keeps
+        the hash, the stored pool and the snapshot describing the same pool.
+        """
+        with self._condition:
+            return (self.bank_hash(), [dict(q) for q in self.main_questions],
+                    [dict(q) for q in self.buffer_questions], self.to_bytes())
+
+    def to_bytes(self) -> bytes:
+        """Serialise test progress into a compact versioned snapshot
+
+        The snapshot holds ability, difficulty, counters, used question ids and
+        answer history, plus a hash of the question pool instead of the
+        questions themselves. Restore it with from_bytes/restore_bytes against
+        the same pool.
+        """
+        with self._condition:
+            used = sorted(self.used_questions)
+            header = _SNAPSHOT_HEADER.pack(
+                SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.user_ability, self.current_difficulty,
+                self.questions_attempted, self.correct_answers, self.total_points, self.max_questions,
+                -1 if self._last_selected is None else self._last_selected,
+                len(self._main_indices), len(self._buffer_indices), len(used), len(self.question_history),
+                self.bank_hash()
+            )
+
+        parts = [header, struct.pack(f"<{len(used)}I", *used)]
+        for entry in self.question_history:
+            question_id = entry.get("question_id")
+            parts.append(_SNAPSHOT_HISTORY_ENTRY.pack(
+                -1 if question_id is None else question_id, entry["is_correct"], entry["time_taken"],
+                entry["difficulty"], entry["points_earned"], entry["multiplier"], entry["ability_after"]
+            ))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, main_questions: List[Dict], buffer_questions: List[Dict] = None, **kwargs):
+        """Build an engine over the given questions and restore a snapshot into it"""
+        engine = cls(main_questions, buffer_questions, **kwargs)
+        engine.restore_bytes(data)
+        return engine
+
+    def restore_bytes(self, data: bytes):
+        """Restore a snapshot taken from an engine over the same question pool"""
+        (magic, version, user_ability, current_difficulty, questions_attempted, correct_answers, total_points,
+         max_questions, last_selected, main_count, buffer_count, used_count, history_count,
+         bank_hash) = _SNAPSHOT_HEADER.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not an adaptive test engine snapshot")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {version}")
+        if (main_count, buffer_count) != (len(self._main_indices), len(self._buffer_indices)) \
+                or bank_hash != self.bank_hash():
+            raise ValueError("Snapshot was taken against a different question pool")
+
+        offset = _SNAPSHOT_HEADER.size
+        used = set(struct.unpack_from(f"<{used_count}I", data, offset))
+        offset += 4 * used_count
+
+        history = []
+        for entry in _SNAPSHOT_HISTORY_ENTRY.iter_unpack(data[offset:offset + history_count * _SNAPSHOT_HISTORY_ENTRY.size]):
+            question_id, is_correct, time_taken, difficulty, points_earned, multiplier, ability_after = entry
+            question_id = None if question_id < 0 else question_id
+            history.append({
+                "question_num": len(history) + 1,
+                "question_id": question_id,
+                "topic": self.all_questions.topic(question_id) if question_id is not None else "Unknown",
+                "is_correct": is_correct,
+                "time_taken": time_taken,
+                "difficulty": difficulty,
+                "points_earned": points_earned,
+                "multiplier": multiplier,
+                "ability_after": ability_after
+            })
+
+        with self._condition:
+            # Only remove newly used questions from the indexes when the engine has not diverged
+            if self.used_questions <= used:
+                for idx in used - self.used_questions:
+                    self._main_index.remove(idx) or self._buffer_index.remove(idx)
+                self.used_questions = used
+            else:
+                self.used_questions = used
+                self._rebuild_indexes()
+
+        self.user_ability = user_ability
+        self.current_difficulty = current_difficulty
+        self.questions_attempted = questions_attempted
+        self.correct_answers = correct_answers
+        self.total_points = total_points
+        self.max_questions = max_questions
+        self._last_selected = None if last_selected < 0 else last_selected
+        self._lookahead = None
+        self._lookahead_next = None
+        self.question_history = history
+
+        self.overall_stats = self._new_aggregate()
+        self.topic_stats = {}
+        for entry in history:
+            self._add_to_aggregates(entry["topic"], entry["is_correct"], entry["time_taken"], entry["difficulty"])
+
     def reset(self):
         """Reset engine for new test"""
         self.user_ability = 0.5
@@ -347,4 +1588,123 @@ class AdaptiveTestEngine:
         self.correct_answers = 0
         self.total_points = 0
         self.question_history = []
-        self.used_questions = set()
+        self._last_selected = None
+        self._lookahead = None
+        self._lookahead_next = None
+        self.overall_stats = self._new_aggregate()
+        self.topic_stats = {}
+        with self._condition:
+            self.used_questions = set()
+            self._rebuild_indexes()
+
+
+def create_test_engine(main_questions: List[Dict], buffer_questions: List[Dict] = None) -> AdaptiveTestEngine:
+    """Create the adaptive engine selected by the ADAPTIVE_ENGINE setting ("heuristic" or "irt")"""
+    load_environment()
+    engine_name = os.getenv('ADAPTIVE_ENGINE', 'heuristic').lower()
+    if engine_name == 'irt':
+        from irt_engine import IRTTestEngine  # Imported lazily so NumPy is only needed for IRT
+        return IRTTestEngine(main_questions, buffer_questions)
+    if engine_name != 'heuristic':
+        raise ValueError(f"Unknown ADAPTIVE_ENGINE: {engine_name}")
+    return AdaptiveTestEngine(main_questions, buffer_questions)
+
+
+class BackgroundGeneration:
+    """Stream question generation on a worker thread into an AdaptiveTestEngine
+
+    Each validated question is added to the engine the moment it is parsed, so
+    a test can start as soon as the main set is complete (or a few questions
+    near the starting difficulty exist) while the buffer is still arriving.
+    on_complete(main, buffer, error) gets only the generated sets, never
+    questions the engine drew from its question store meanwhile.
+    """
+
+    def __init__(self, api_client: OpenRouterAPI, text_content: str, engine: AdaptiveTestEngine,
+                 on_complete: Optional[Callable[[List[Dict], List[Dict], str], None]] = None, session_key: str = ""):
+        self.api_client = api_client
+        self.text_content = text_content
+        self.engine = engine
+        self.on_complete = on_complete
+        self.session_key = session_key  # Scheduler fairness: calls are queued round-robin per session
+        self.error = ""
+        self.done = False
+        self.report = {}  # Filled by generate_questions_concurrent: store reuse, duplicates, top-ups
+        # Generated questions per set; questions the engine draws from the store are not counted or cached
+        self.generated = {"main": [], "buffer": []}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Begin generating on a daemon thread"""
+        self.engine.begin_generation()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _on_question(self, pool: str, question: Dict):
+        limit = self.api_client.buffer_count if pool == "buffer" else self.api_client.main_count
+        with self._lock:
+            if len(self.generated[pool]) < limit:
+                self.generated[pool].append(question)
+                self.engine.add_questions([question], buffer=pool == "buffer")
+
+    def _run(self):
+        try:
+            with tracer.span("generation.run") as span:
+                _, _, self.error = self.api_client.generate_questions_concurrent(
+                    self.text_content, self._on_question, self.engine.finish_generation, self.report, self.session_key)
+                span.set(questions=len(self.engine.all_questions), **self.report)
+        except Exception as e:
+            self.error = f"Error generating questions: {str(e)}"
+        finally:
+            self.engine.finish_generation()
+            self.done = True
+
+        if self.on_complete:
+            with self._lock:
+                main_questions, buffer_questions = list(self.generated["main"]), list(self.generated["buffer"])
+            self.on_complete(main_questions, buffer_questions, self.error)
+
+    def wait_until_ready(self, target_difficulty: float = 0.5, tolerance: float = 0.2,
+                         min_count: int = 3, timeout: Optional[float] = None) -> bool:
+        """Block until the engine can start a test; False if generation ended with nothing usable"""
+        return self.engine.wait_for_questions(target_difficulty, tolerance, min_count, timeout)
+
+
+class APIHealthMonitor:
+    """Cached API health check refreshed on a background thread
+
+    status() never blocks on the network: it returns the last result and, once
+    that is older than ttl_seconds, starts a refresh so a later call sees it.
+    """
+
+    def __init__(self, api_client: OpenRouterAPI, ttl_seconds: float = 60, timeout: float = 10):
+        self.api_client = api_client
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._status = None
+        self._checked_at = 0.0
+        self._refreshing = False
+
+    def status(self) -> Optional[Dict]:
+        """Last health result ({"ok", "error", "latency", "checked_at"}), or None before the first check"""
+        with self._lock:
+            stale = time.time() - self._checked_at >= self.ttl_seconds
+            if stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh, daemon=True).start()
+            return self._status
+
+    def _refresh(self):
+        start = time.time()
+        try:
+            ok, error = self.api_client.check_health(self.timeout)
+        except Exception as e:
+            ok, error = False, f"Health check failed: {str(e)}"
+        finished = time.time()
+
+        with self._lock:
+            self._status = {"ok": ok, "error": error, "latency": finished - start, "checked_at": finished}
+            self._checked_at = finished
+            self._refreshing = False
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark with a regression budget
+Runs `python -X importtime -c "import <module>"` in fresh interpreters, reports
+the slowest imports per module and fails when a module exceeds its budget or
+pulls in a dependency that must stay lazy.
+Run from the project root: python benchmarks/bench_import_time.py
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import budget per module in milliseconds (warm bytecode cache)
+BUDGETS_MS = {
+    "backend": 60,
+    "question_cache": 30,
+    "session_store": 30,
+    "question_store": 30,
+    "app": 1200,  # Dominated by Streamlit itself
+}
+
+# Heavy dependencies that must only load when a PDF is processed or generation starts
+LAZY_MODULES = ["fitz", "pymupdf", "requests", "dotenv", "numpy"]
+
+
+def import_profile(module: str) -> List[Tuple[str, int, int, int]]:
+    """(name, depth, self µs, cumulative µs) for every import made by `import module`"""
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # Measure with a warm bytecode cache, as deployed
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure(module: str, runs: int) -> Dict:
+    """Median cumulative import time of module over runs, plus its slowest dependencies"""
+    import_profile(module)  # Warm-up run writes the bytecode cache
+    totals = []
+    subtree = []
+    for _ in range(runs):
+        profile = import_profile(module)
+        end = next(i for i, (name, depth, _, _) in enumerate(profile) if name == module and depth == 0)
+        start = end
+        while start > 0 and profile[start - 1][1] > 0:
+            start -= 1  # Entries above the module's line, back to the previous top-level import, are its subtree
+        subtree = profile[start:end]
+        totals.append(profile[end][3])
+
+    imported = {name for name, _, _, _ in subtree}
+    return {
+        "module": module,
+        "median_ms": statistics.median(totals) / 1000,
+        "slowest": sorted(((cumulative, name) for name, depth, _, cumulative in subtree if depth <= 2),
+                          reverse=True)[:5],
+        "lazy_violations": [name for name in LAZY_MODULES if name in imported],
+    }
+
+
+def main():
+    """Measure each module and compare it against its budget"""
+    parser = argparse.ArgumentParser(description="Measure module import times against a budget")
+    parser.add_argument("modules", nargs="*", default=list(BUDGETS_MS))
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"⏱️  Import-time benchmark (median of {args.runs} runs)")
+    print("=" * 60)
+
+    failed = False
+    for module in args.modules:
+        report = measure(module, args.runs)
+        budget = BUDGETS_MS.get(module)
+        over_budget = budget is not None and report["median_ms"] > budget
+        status = "❌" if over_budget or report["lazy_violations"] else "✅"
+        budget_text = f" (budget {budget} ms)" if budget is not None else ""
+        print(f"{status} {module}: {report['median_ms']:.1f} ms{budget_text}")
+        for cumulative, name in report["slowest"]:
+            print(f"      {cumulative / 1000:>8.1f} ms  {name}")
+        if report["lazy_violations"]:
+            print(f"      imports lazy dependencies eagerly: {', '.join(report['lazy_violations'])}")
+        failed = failed or status == "❌"
+
+    print("=" * 60)
+    print("❌ Import-time regression" if failed else "✅ All modules within budget")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
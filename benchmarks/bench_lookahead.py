@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark for next-question lookahead
+Measures get_next_question latency right after an answer (the interaction
+path) with and without precompute_lookahead, for both engines, plus hit rate.
+Run from the project root: python benchmarks/bench_lookahead.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import AdaptiveTestEngine
+from irt_engine import IRTTestEngine
+from simulation import make_question_bank
+
+BANK_SIZES = [20, 1_000, 100_000]
+QUESTIONS = 50
+
+
+def next_question_latency(engine: AdaptiveTestEngine, lookahead: bool, seed: int = 1) -> float:
+    """Mean seconds spent in get_next_question after each answer"""
+    rng = random.Random(seed)
+    engine.max_questions = QUESTIONS + 1
+    question = engine.get_next_question()
+    elapsed = 0.0
+    answered = 0
+    while question is not None and answered < QUESTIONS:
+        if lookahead:
+            engine.precompute_lookahead()  # Runs while the question is on screen
+        engine.process_answer(rng.random() < 0.6, rng.uniform(2, 20), question["difficulty"])
+        answered += 1
+
+        start = time.perf_counter()
+        question = engine.get_next_question()
+        elapsed += time.perf_counter() - start
+    return elapsed / max(1, answered)
+
+
+def main():
+    """Run the benchmark for each engine and bank size"""
+    print(f"🔮 Next-question lookahead benchmark ({QUESTIONS} answers per run)")
+    print("=" * 72)
+    print(f"{'engine':>20} {'bank':>8} {'cold (µs)':>11} {'lookahead (µs)':>15} {'speedup':>9} {'hit rate':>9}")
+
+    for engine_class in (AdaptiveTestEngine, IRTTestEngine):
+        for size in BANK_SIZES:
+            main_questions, buffer_questions = make_question_bank(size)
+            cold = next_question_latency(engine_class(main_questions, buffer_questions), lookahead=False)
+
+            engine = engine_class(main_questions, buffer_questions)
+            warm = next_question_latency(engine, lookahead=True)
+            stats = engine.lookahead_stats()
+
+            print(f"{engine_class.__name__:>20} {size:>8} {cold * 1e6:>11.1f} {warm * 1e6:>15.1f} "
+                  f"{cold / warm:>8.1f}x {stats['hit_rate']:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline benchmark against the offline LLM stand-in
+Times upload → generate → test without network access or an API key: PDF
+extraction, background generation (time until the test can start and until
+all questions arrive) and a simulated 10-question test with its results.
+Responses come from llm_standin, synthetic or replayed from a recording, with
+seeded latency and faults, so runs are reproducible.
+Run from the project root: python benchmarks/bench_pipeline.py [--replay recording.jsonl]
+"""
+
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+import requests
+from backend import PDFProcessor, OpenRouterAPI, BackgroundGeneration, create_test_engine
+from llm_scheduler import RequestScheduler
+from llm_standin import OpenRouterStandin, install_standin
+
+TOPICS = ("photosynthesis chlorophyll glucose respiration mitochondria enzyme substrate catalyst membrane "
+          "diffusion osmosis gradient protein ribosome transcription translation chromosome mutation allele "
+          "genotype phenotype inheritance ecosystem producer consumer decomposer nitrogen carbon cycle nucleus vacuole "
+          "chloroplast lysosome cytoplasm hormone insulin neuron synapse receptor antibody antigen pathogen vaccine "
+          "tissue organ capillary artery hemoglobin oxygen plasma stomata xylem phloem pollen seed embryo").split()
+
+
+def make_study_pdf(page_count: int, seed: int) -> bytes:
+    """Build an in-memory PDF of seeded, varied study sentences"""
+    rng = random.Random(seed)
+    document = fitz.open()
+    for _ in range(page_count):
+        page = document.new_page()
+        for line in range(40):
+            first, second, third = rng.sample(TOPICS, 3)
+            page.insert_text((50, 60 + line * 18), f"The {first} regulates {second} by way of {third} in living cells.")
+    pdf_bytes = document.tobytes()
+    document.close()
+    return pdf_bytes
+
+
+def run_pipeline(pdf_bytes: bytes, standin: OpenRouterStandin, seed: int) -> dict:
+    """Time each stage of one upload → generate → test run"""
+    timings = {}
+    start = time.perf_counter()
+    text, error = PDFProcessor.extract_text_from_pdf(io.BytesIO(pdf_bytes))
+    if error:
+        raise RuntimeError(error)
+    timings["extract"] = time.perf_counter() - start
+
+    # A fresh scheduler without rate limits per run, so runs do not throttle each other
+    api = OpenRouterAPI(backoff_base=0.05, backoff_max=0.5, scheduler=RequestScheduler())
+    api.session = requests.Session()
+    install_standin(api.session, standin)
+
+    start = time.perf_counter()
+    engine = create_test_engine([], [])
+    generation = BackgroundGeneration(api, text, engine)
+    generation.start()
+    if not generation.wait_until_ready():
+        raise RuntimeError(generation.error or "No questions generated")
+    timings["ready"] = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    test_start = time.perf_counter()
+    answered = 0
+    while answered < engine.max_questions:
+        question = engine.get_next_question()
+        if question is None:
+            break
+        engine.process_answer(rng.random() < 0.6, rng.uniform(2, 20), question["difficulty"])
+        answered += 1
+    if not engine.get_final_results():
+        raise RuntimeError("No questions answered")
+    timings["test"] = time.perf_counter() - test_start
+
+    generation._thread.join()
+    timings["generated"] = time.perf_counter() - start
+    timings["questions"] = len(engine.all_questions)
+    timings["answered"] = answered
+    if generation.error:
+        raise RuntimeError(generation.error)
+    return timings
+
+
+def main():
+    """Run the pipeline several times and report median stage timings"""
+    parser = argparse.ArgumentParser(description="Benchmark upload → generate → test with the LLM stand-in")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.4, help="Seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Extra random latency, seconds")
+    parser.add_argument("--chunk-delay", type=float, default=0.005, help="Seconds between streamed chunks")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--replay", help="Serve responses recorded in this JSONL file")
+    args = parser.parse_args()
+
+    pdf_bytes = make_study_pdf(args.pages, args.seed)
+    print(f"🧪 Pipeline benchmark: {args.pages} pages, {args.runs} runs, "
+          f"{'replay ' + args.replay if args.replay else 'synthetic'} responses, "
+          f"latency {args.latency}+{args.jitter}s, 429 rate {args.rate_limit:.0%}")
+    print("=" * 72)
+    print(f"{'run':>4} {'extract (ms)':>13} {'ready (s)':>10} {'all generated (s)':>18} {'test (ms)':>10} {'questions':>10}")
+
+    results = []
+    for run in range(args.runs):
+        standin = OpenRouterStandin(mode="replay" if args.replay else "synthetic", path=args.replay,
+                                    seed=args.seed, latency=args.latency, latency_jitter=args.jitter,
+                                    stream_chunk_delay=args.chunk_delay, rate_limit_rate=args.rate_limit,
+                                    retry_after=0.5)
+        timings = run_pipeline(pdf_bytes, standin, args.seed + run)
+        results.append(timings)
+        print(f"{run + 1:>4} {timings['extract'] * 1000:>13.1f} {timings['ready']:>10.2f} "
+              f"{timings['generated']:>18.2f} {timings['test'] * 1000:>10.2f} {timings['questions']:>10}")
+
+    print("=" * 72)
+    print(f"{'median':>4} {statistics.median(r['extract'] for r in results) * 1000:>13.1f} "
+          f"{statistics.median(r['ready'] for r in results):>10.2f} "
+          f"{statistics.median(r['generated'] for r in results):>18.2f} "
+          f"{statistics.median(r['test'] for r in results) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
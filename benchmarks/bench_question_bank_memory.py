@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: question dicts vs the compact QuestionBank the engines store questions in
+Run from the project root: python benchmarks/bench_question_bank_memory.py
+Exits with status 1 if a 100k-question bank is not at least 5x smaller than the dicts.
+"""
+
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import OpenRouterAPI
+from llm_standin import OpenRouterStandin, _VOCABULARY
+from question_bank import QuestionBank
+
+BANK_SIZE = 100_000
+TARGET_RATIO = 5.0
+
+
+def make_questions(count: int, seed: int = 0):
+    """Question dicts as the app receives them: the LLM stand-in's output, parsed from JSON"""
+    standin, rng = OpenRouterStandin(), random.Random(seed)
+    text = " ".join(_VOCABULARY)
+    payload = {"messages": [{"role": "user", "content": (
+        f"Generate exactly 50 questions between 0.1 and 0.9\n\nText: {text}\n\nRequirements:")}]}
+    questions = []
+    while len(questions) < count:
+        questions += json.loads(standin._synthesize(payload, rng))["questions"]
+    return json.dumps(questions[:count])
+
+
+def lengthen(payload: str, factor: int = 3):
+    """The same questions with every text field repeated factor times (closer to long-form model output)"""
+    questions = json.loads(payload)
+    for q in questions:
+        q["question"] = " ".join([q["question"]] * factor)
+        q["explanation"] = " ".join([q["explanation"]] * factor)
+        q["options"] = {key: " ".join([value] * factor) for key, value in q["options"].items()}
+    return json.dumps(questions)
+
+
+def measure(build):
+    """Bytes still allocated after build() returns, plus build time"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def compare(payload: str):
+    """(dict bytes, bank bytes, bank build seconds, mean µs per text field read)"""
+    questions, dict_bytes, _ = measure(lambda: json.loads(payload))
+    bank, bank_bytes, bank_seconds = measure(lambda: QuestionBank(questions))
+
+    # Views must read back the original questions and pass validation
+    for i in range(0, len(questions), len(questions) // 100):
+        assert bank[i] == questions[i] and OpenRouterAPI.validate_question(bank[i])
+
+    positions = range(0, len(bank), 7)
+    start = time.perf_counter()
+    for i in positions:
+        bank[i]["question"]
+    access_us = (time.perf_counter() - start) / len(positions) * 1e6
+    return dict_bytes, bank_bytes, bank_seconds, access_us
+
+
+def main():
+    """Compare retained memory for a 100k-question bank"""
+    print(f"🧮 Question bank memory benchmark ({BANK_SIZE:,} questions)")
+    print("=" * 60)
+
+    payload = make_questions(BANK_SIZE)
+    ratios = {}
+    for name, case in (("Stand-in questions", payload), ("3x longer text", lengthen(payload))):
+        dict_bytes, bank_bytes, bank_seconds, access_us = compare(case)
+        ratios[name] = dict_bytes / bank_bytes
+        print(f"\n📋 {name}")
+        print(f"   Plain dicts:   {dict_bytes / 1e6:8.1f} MB ({dict_bytes / BANK_SIZE:.0f} B/question)")
+        print(f"   QuestionBank:  {bank_bytes / 1e6:8.1f} MB ({bank_bytes / BANK_SIZE:.0f} B/question, "
+              f"built in {bank_seconds:.2f}s)")
+        print(f"   Reduction:     {ratios[name]:8.1f}x")
+        print(f"   Field read:    {access_us:8.2f} µs")
+
+    # The text itself is stored uncompressed, so the reduction shrinks as questions get longer
+    ratio = ratios["Stand-in questions"]
+    print(f"\n{'✅' if ratio >= TARGET_RATIO else '❌'} {ratio:.1f}x on stand-in questions (target {TARGET_RATIO:.0f}x)")
+    return ratio >= TARGET_RATIO
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for AdaptiveTestEngine.get_next_question over large pools
+Run from the project root: python benchmarks/bench_question_selection.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import AdaptiveTestEngine
+
+POOL_SIZES = [20, 1_000, 10_000, 100_000, 1_000_000]
+SELECTIONS = 200
+# The linear-scan reference becomes impractically slow beyond this size
+LINEAR_MAX_POOL = 100_000
+
+
+def make_pool(size: int, seed: int = 0):
+    """Synthetic questions with random difficulties, split evenly into main and buffer"""
+    rng = random.Random(seed)
+    questions = [{"difficulty": round(rng.uniform(0.1, 0.9), 3), "topic": f"Topic {i % 50}"} for i in range(size)]
+    return questions[:size // 2], questions[size // 2:]
+
+
+def linear_select(engine: AdaptiveTestEngine):
+    """Reference selection: the original three linear scans over main, buffer and all questions"""
+    target = engine.current_difficulty
+    offset = len(engine.main_questions)
+    candidates = [(i, q, abs(q["difficulty"] - target)) for i, q in enumerate(engine.main_questions)
+                  if i not in engine.used_questions and abs(q["difficulty"] - target) <= 0.2]
+    if not candidates:
+        candidates = [(offset + i, q, abs(q["difficulty"] - target)) for i, q in enumerate(engine.buffer_questions)
+                      if offset + i not in engine.used_questions and abs(q["difficulty"] - target) <= 0.3]
+    if not candidates:
+        candidates = [(i, q, abs(q["difficulty"] - target)) for i, q in enumerate(engine.all_questions)
+                      if i not in engine.used_questions]
+    if not candidates:
+        return None
+    best_idx, best_question, _ = min(candidates, key=lambda x: x[2])
+    engine.used_questions.add(best_idx)
+    return best_question
+
+
+def run_selections(engine: AdaptiveTestEngine, select, count: int, seed: int = 1) -> float:
+    """Mean seconds per selection over count select/answer steps"""
+    rng = random.Random(seed)
+    engine.max_questions = engine.questions_attempted + count
+    elapsed = 0.0
+    for _ in range(count):
+        start = time.perf_counter()
+        question = select()
+        elapsed += time.perf_counter() - start
+        if question is None:
+            break
+        engine.process_answer(rng.random() < 0.6, rng.uniform(2, 20), question["difficulty"])
+    return elapsed / count
+
+
+def main():
+    """Run the benchmark for each pool size"""
+    print(f"🎯 Next-question selection benchmark ({SELECTIONS} selections per pool)")
+    print("=" * 72)
+    print(f"{'pool':>10} {'build (ms)':>12} {'indexed (µs)':>14} {'linear (µs)':>13} {'speedup':>9}")
+
+    for size in POOL_SIZES:
+        main_questions, buffer_questions = make_pool(size)
+
+        start = time.perf_counter()
+        engine = AdaptiveTestEngine(main_questions, buffer_questions)
+        first = engine.get_next_question()  # The first lookup performs the one-off index build
+        build_ms = (time.perf_counter() - start) * 1000
+        engine.process_answer(True, 5.0, first["difficulty"])
+
+        indexed = run_selections(engine, engine.get_next_question, min(SELECTIONS, size - 1))
+
+        if size <= LINEAR_MAX_POOL:
+            reference = AdaptiveTestEngine(main_questions, buffer_questions)
+            linear = run_selections(reference, lambda: linear_select(reference), min(SELECTIONS, size - 1))
+            linear_text = f"{linear * 1e6:>13.1f}"
+            speedup_text = f"{linear / indexed:>8.1f}x"
+        else:
+            linear_text = f"{'-':>13}"
+            speedup_text = f"{'-':>9}"
+
+        print(f"{size:>10} {build_ms:>12.1f} {indexed * 1e6:>14.1f} {linear_text} {speedup_text}")
+
+
+if __name__ == "__main__":
+    main()
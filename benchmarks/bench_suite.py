@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the hot paths, with JSON output and regression checks
+Covers PDF extraction across page counts and text densities, JSON salvage on
+large, truncated and malformed responses, engine selection/answer/results across
+pool sizes, tracing overhead, and a full upload-to-results run against the LLM
+stand-in.
+
+Run from the project root:
+    python benchmarks/bench_suite.py --output before.json
+    python benchmarks/bench_suite.py --output after.json --compare before.json
+    python benchmarks/bench_suite.py --compare before.json after.json   # Compare saved runs only
+The comparison exits with status 1 when any case's median slows by more than --threshold.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("LLM_STANDIN", "synthetic")  # Never reach the network
+
+import fitz  # PyMuPDF
+from backend import PDFProcessor, AdaptiveTestEngine
+from bench_pipeline import make_study_pdf, run_pipeline
+from json_stream import salvage_questions
+from llm_standin import OpenRouterStandin
+from simulation import make_question_bank
+from tracing import Tracer
+
+# A case is (name, setup); setup returns the zero-argument callable that is timed
+Case = Tuple[str, Callable[[], Callable[[], object]]]
+
+
+@lru_cache(maxsize=None)
+def make_dense_pdf(page_count: int, lines_per_page: int, words_per_line: int) -> bytes:
+    """In-memory PDF whose text density is set by lines per page and words per line"""
+    rng = random.Random(page_count * 1000 + lines_per_page)
+    words = "cell energy enzyme membrane protein gene osmosis glucose oxygen carbon tissue neuron".split()
+    document = fitz.open()
+    for _ in range(page_count):
+        page = document.new_page()
+        for line in range(lines_per_page):
+            text = " ".join(rng.choice(words) for _ in range(words_per_line))
+            page.insert_text((20, 20 + line * (780 / lines_per_page)), text, fontsize=min(11, 780 / lines_per_page))
+    pdf_bytes = document.tobytes()
+    document.close()
+    return pdf_bytes
+
+
+@lru_cache(maxsize=None)
+def make_response(question_count: int, style: str) -> str:
+    """Model output with question_count questions: clean, fenced in prose, with trailing commas,
+    truncated part-way or with every tenth question corrupted"""
+    main, buffer = make_question_bank(question_count)
+    body = json.dumps({"questions": main + buffer}, indent=2)
+    if style == "fenced":
+        return f"Here are the questions you asked for:\n```json\n{body}\n```\nLet me know if you need more."
+    if style == "trailing_commas":
+        return body.replace('"\n    }', '",\n    }').replace('}\n  ]', '},\n  ]')
+    if style == "truncated":
+        return body[:len(body) * 2 // 3]
+    if style == "corrupted":
+        parts = body.split('"explanation":')
+        return "".join(part + ('"explanation":' if i % 10 else '"explanation"::') for i, part in enumerate(parts[:-1])) + parts[-1]
+    return body
+
+
+def pdf_cases() -> List[Case]:
+    cases = []
+    for pages in (10, 100):
+        for density, (lines, words) in (("sparse", (10, 6)), ("dense", (60, 16))):
+            def setup(pages=pages, lines=lines, words=words):
+                pdf_file = io.BytesIO(make_dense_pdf(pages, lines, words))
+                return lambda: PDFProcessor.extract_text_from_pdf(pdf_file)
+            cases.append((f"pdf.extract/{pages}p-{density}", setup))
+    return cases
+
+
+def json_cases() -> List[Case]:
+    cases = []
+    for count in (20, 500):
+        for style in ("clean", "fenced", "trailing_commas", "truncated", "corrupted"):
+            def setup(count=count, style=style):
+                content = make_response(count, style)
+                return lambda: salvage_questions(content)
+            cases.append((f"json.salvage/{count}q-{style}", setup))
+    return cases
+
+
+def engine_cases() -> List[Case]:
+    cases = []
+    for size in (20, 1_000, 10_000):
+        bank = lru_cache(maxsize=1)(lambda size=size: make_question_bank(size))
+
+        def take_test(engine: AdaptiveTestEngine):
+            rng = random.Random(1)
+            for _ in range(engine.max_questions):
+                question = engine.get_next_question()
+                engine.process_answer(rng.random() < 0.6, rng.uniform(2, 20), question["difficulty"])
+
+        def setup_test(bank=bank):
+            engine = AdaptiveTestEngine(*bank())
+            return lambda: take_test(engine)
+
+        def setup_results(bank=bank):
+            engine = AdaptiveTestEngine(*bank())
+            take_test(engine)
+            return engine.get_final_results
+
+        cases.append((f"engine.test_10/{size}", setup_test))
+        cases.append((f"engine.final_results/{size}", setup_results))
+    return cases
+
+
+def tracing_cases() -> List[Case]:
+    """Cost of one instrumented stage with tracing off (the default) and on"""
+    def make_setup(enabled: bool):
+        def setup():
+            tracer = Tracer(enabled=enabled)
+
+            def spans():
+                for _ in range(1000):
+                    with tracer.span("bench", size=1) as span:
+                        span.set(done=True)
+                    tracer.count("bench_total")
+            return spans
+        return setup
+    return [("tracing.1000_spans/disabled", make_setup(False)), ("tracing.1000_spans/enabled", make_setup(True))]
+
+
+def pipeline_cases() -> List[Case]:
+    pdf_bytes = lru_cache(maxsize=1)(lambda: make_study_pdf(20, seed=0))
+
+    def setup():
+        return lambda: run_pipeline(pdf_bytes(), OpenRouterStandin(seed=0), seed=0)
+    return [("pipeline.upload_to_results/20p", setup)]
+
+
+def run_case(setup: Callable[[], Callable[[], object]], repeats: int, min_time: float,
+             max_calls: int = 200) -> Dict:
+    """Median and best seconds per call over repeats
+
+    Every call gets fresh state from setup (untimed); fast cases are called
+    until min_time has been measured, up to max_calls, and averaged.
+    """
+    samples = []
+    calls = []
+    for _ in range(repeats):
+        elapsed = 0.0
+        done = 0
+        while done == 0 or (elapsed < min_time and done < max_calls):
+            fn = setup()
+            start = time.perf_counter()
+            fn()
+            elapsed += time.perf_counter() - start
+            done += 1
+        samples.append(elapsed / done)
+        calls.append(done)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "repeats": repeats,
+            "calls_per_repeat": max(calls)}
+
+
+def environment() -> Dict:
+    """Where the results were measured, stored so comparisons across machines are recognisable"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "commit": commit, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> bool:
+    """Print per-case changes; returns whether any case regressed beyond threshold"""
+    print(f"📊 Comparison: {baseline['environment'].get('commit') or 'baseline'} → "
+          f"{current['environment'].get('commit') or 'current'} (threshold {threshold:.0%})")
+    print("=" * 72)
+    regressed = False
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"🆕 {name:<40} {result['median_s'] * 1000:>10.3f} ms")
+            continue
+        change = result["median_s"] / before["median_s"] - 1
+        status = "❌" if change > threshold else ("🚀" if change < -threshold else "✅")
+        regressed = regressed or change > threshold
+        print(f"{status} {name:<40} {before['median_s'] * 1000:>10.3f} → {result['median_s'] * 1000:>10.3f} ms "
+              f"({change:+.1%})")
+    print("=" * 72)
+    print("❌ Performance regression" if regressed else "✅ No regressions")
+    return regressed
+
+
+def main():
+    """Run the selected cases, write JSON and optionally compare against a baseline"""
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", nargs="+", metavar="JSON",
+                        help="Baseline to compare this run against, or two saved runs to compare without running")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Median slowdown treated as a regression")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this text")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="Seconds of calls per repeat for fast cases")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0]) as f, open(args.compare[1]) as g:
+            sys.exit(1 if compare(json.load(f), json.load(g), args.threshold) else 0)
+
+    cases = [case for group in (pdf_cases, json_cases, engine_cases, tracing_cases, pipeline_cases) for case in group()
+             if args.filter in case[0]]
+    print(f"🏁 Benchmark suite: {len(cases)} cases, {args.repeats} repeats")
+    print("=" * 72)
+    results = {}
+    for name, setup in cases:
+        results[name] = run_case(setup, args.repeats, args.min_time)
+        print(f"   {name:<40} {results[name]['median_s'] * 1000:>10.3f} ms")
+
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            sys.exit(1 if compare(json.load(f), report, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import random
+import re
+import struct
+import zlib
+from typing import Dict, Hashable, List, Optional, Tuple
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how in is it its of on or that the this to was what "
+    "when where which who why with".split())
+
+
+def question_tokens(question: Dict, prefix_length: int = 5) -> set:
+    """Normalised token set of a question: content words of the stem and the correct answer
+
+    Tokens are lower-cased, stop words dropped and each word cut to a short
+    prefix, a crude stemmer so "produce"/"producing" match.
+    """
+    options = question.get("options") or {}
+    answer = options.get(question.get("correct_answer"), "") if isinstance(options, dict) else ""
+    words = re.findall(r"[a-z0-9]+", f"{question.get('question', '')} {answer}".lower())
+    tokens = {word[:prefix_length] for word in words if word not in _STOPWORDS}
+    return tokens or set(words)
+
+
+class MinHasher:
+    """MinHash signatures over a question's normalised token set
+
+    The estimated Jaccard similarity of two questions is the fraction of
+    signature positions that agree.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        self.num_perm = num_perm
+        rng = random.Random(seed)
+        self._permutations = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                              for _ in range(num_perm)]
+
+    def signature(self, question: Dict) -> Tuple[int, ...]:
+        """MinHash signature of the question's token set"""
+        shingles = {zlib.crc32(token.encode("utf-8")) for token in question_tokens(question)} or {0}
+        return tuple(min(((a * x + b) % _MERSENNE_PRIME) & _MAX_HASH for x in shingles)
+                     for a, b in self._permutations)
+
+    @staticmethod
+    def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+    @staticmethod
+    def pack(signature: Tuple[int, ...]) -> bytes:
+        return struct.pack(f"<{len(signature)}I", *signature)
+
+    @staticmethod
+    def unpack(data: bytes) -> Tuple[int, ...]:
+        return struct.unpack(f"<{len(data) // 4}I", data)
+
+
+class NearDuplicateIndex:
+    """LSH index of MinHash signatures for near-duplicate question detection
+
+    Signatures are split into bands; questions sharing any band bucket are
+    candidates, confirmed when their estimated similarity reaches threshold.
+    Lookups and inserts cost a fixed number of bucket probes, independent of
+    how many questions are indexed.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 32,
+                 hasher: Optional[MinHasher] = None):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.hasher = hasher or MinHasher(num_perm)
+        self._rows = self.hasher.num_perm // bands
+        self._buckets: Dict[int, List[Hashable]] = {}
+        self._signatures: Dict[Hashable, Tuple[int, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def bucket_keys(self, signature: Tuple[int, ...]) -> List[int]:
+        """One signed 63-bit bucket key per band (fits an SQLite INTEGER)"""
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self._rows:(band + 1) * self._rows]
+            digest = zlib.crc32(struct.pack(f"<{len(rows)}I", *rows))
+            keys.append((band << 32 | digest) - (1 << 62))
+        return keys
+
+    def find(self, question: Dict, signature: Optional[Tuple[int, ...]] = None) -> Optional[Hashable]:
+        """Key of an indexed near-duplicate of question, or None"""
+        signature = signature or self.hasher.signature(question)
+        checked = set()
+        for bucket in self.bucket_keys(signature):
+            for key in self._buckets.get(bucket, ()):
+                if key in checked:
+                    continue
+                checked.add(key)
+                if self.hasher.similarity(signature, self._signatures[key]) >= self.threshold:
+                    return key
+        return None
+
+    def add(self, key: Hashable, question: Dict, signature: Optional[Tuple[int, ...]] = None):
+        """Index a question under key"""
+        signature = signature or self.hasher.signature(question)
+        self._signatures[key] = signature
+        for bucket in self.bucket_keys(signature):
+            self._buckets.setdefault(bucket, []).append(key)
+
+    def add_if_new(self, key: Hashable, question: Dict) -> bool:
+        """Index question unless it near-duplicates one already indexed; returns whether it was added"""
+        signature = self.hasher.signature(question)
+        if self.find(question, signature) is not None:
+            return False
+        self.add(key, question, signature)
+        return True
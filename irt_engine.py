@@ -0,0 +1,183 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend import AdaptiveTestEngine
+
+
+def difficulty_to_theta(difficulty):
+    """Map a 0-1 question difficulty onto the IRT logit scale"""
+    clipped = np.clip(difficulty, 0.01, 0.99)
+    return np.log(clipped / (1 - clipped))
+
+
+def theta_to_difficulty(theta: float) -> float:
+    """Map an IRT ability back onto the 0-1 difficulty scale used by the app"""
+    return 1 / (1 + math.exp(-theta))
+
+
+class IRTTestEngine(AdaptiveTestEngine):
+    """Adaptive test engine based on item response theory (Rasch / 2PL)
+
+    Ability is estimated over a fixed quadrature grid (EAP with a standard
+    normal prior, or grid MLE), and the next question is the unused item with
+    maximum Fisher information at the current estimate, computed across the
+    whole pool in one array operation. Question difficulties map to item
+    difficulty b via the logit; an optional "discrimination" field gives the
+    2PL slope a (default 1.0, i.e. Rasch).
+
+    Exposes the same interface as AdaptiveTestEngine, so user_ability and
+    current_difficulty are reported on the 0-1 scale.
+    """
+
+    def __init__(self, main_questions: List[Dict], buffer_questions: List[Dict] = None,
+                 estimator: str = "eap", grid_points: int = 81, theta_range: tuple = (-4.0, 4.0)):
+        if estimator not in ("eap", "mle"):
+            raise ValueError(f"Unknown estimator: {estimator}")
+        self.estimator = estimator
+
+        # Item parameters for every question in all_questions, grown as questions are added
+        self._a = np.empty(0)
+        self._b = np.empty(0)
+        self._used = np.empty(0, dtype=bool)
+        self._count = 0
+        self._last_selected = None
+
+        # Quadrature grid and log prior
+        self._grid = np.linspace(theta_range[0], theta_range[1], grid_points)
+        self._log_prior = -0.5 * self._grid ** 2
+        self._log_likelihood = np.zeros(grid_points)
+
+        super().__init__(main_questions, buffer_questions)
+        self._update_estimate()
+
+    def add_questions(self, questions: List[Dict], buffer: bool = False):
+        """Append questions to the main or buffer set (thread-safe)"""
+        with self._condition:
+            needed = self._count + len(questions)
+            if needed > len(self._b):
+                capacity = max(needed, 2 * len(self._b), 16)
+                self._a = np.resize(self._a, capacity)
+                self._b = np.resize(self._b, capacity)
+                used = np.zeros(capacity, dtype=bool)
+                used[:self._count] = self._used[:self._count]
+                self._used = used
+
+            for q in questions:
+                self._a[self._count] = float(q.get("discrimination", 1.0))
+                self._b[self._count] = difficulty_to_theta(float(q["difficulty"]))
+                self._used[self._count] = False
+                self._count += 1
+
+            super().add_questions(questions, buffer)
+
+    @staticmethod
+    def probability(theta, a, b):
+        """Probability of a correct response under the 2PL model"""
+        return 1 / (1 + np.exp(-a * (theta - b)))
+
+    def _estimate(self, log_likelihood: np.ndarray, answered: int) -> Tuple[float, float]:
+        """(theta, standard error) from a grid log-likelihood after answered responses"""
+        use_mle = self.estimator == "mle" and answered > 0
+        log_weights = log_likelihood if use_mle else log_likelihood + self._log_prior
+        weights = np.exp(log_weights - log_weights.max())
+        weights /= weights.sum()
+
+        if use_mle:
+            theta = float(self._grid[np.argmax(log_weights)])
+        else:
+            theta = float(np.dot(weights, self._grid))
+        return theta, float(math.sqrt(max(0.0, np.dot(weights, (self._grid - theta) ** 2))))
+
+    def _update_estimate(self):
+        """Recompute ability (theta) and its standard error from the grid posterior"""
+        self.theta, self.theta_se = self._estimate(self._log_likelihood, self.questions_attempted)
+        self.user_ability = theta_to_difficulty(self.theta)
+        self.current_difficulty = self.user_ability
+
+    def _select_question(self, fallback: bool = True) -> Optional[Dict]:
+        """Pick the unused question with maximum Fisher information at the current ability
+
+        Every arrived question is a candidate, so fallback has no effect here.
+        """
+        idx = self._most_informative(self.theta)
+        return None if idx is None else self._take_question(idx)
+
+    def _most_informative(self, theta: float) -> Optional[int]:
+        """Position of the unused question with maximum Fisher information at theta"""
+        if len(self.used_questions) >= len(self.all_questions):
+            return None  # All questions used
+
+        a = self._a[:self._count]
+        p = self.probability(theta, a, self._b[:self._count])
+        information = a * a * p * (1 - p)
+        information[self._used[:self._count]] = -np.inf
+
+        best_idx = int(np.argmax(information))
+        if not np.isfinite(information[best_idx]):
+            return None
+        return best_idx
+
+    def _has_question_near(self, target_difficulty: float, tolerance: float) -> bool:
+        """Whether an unused question lies within tolerance of target_difficulty"""
+        difficulty = 1 / (1 + np.exp(-self._b[:self._count]))
+        return bool(np.any(~self._used[:self._count] & (np.abs(difficulty - target_difficulty) <= tolerance)))
+
+    def _take_question(self, idx: int) -> Dict:
+        """Mark the question at idx as used and awaiting an answer"""
+        self._used[idx] = True
+        self.used_questions.add(idx)
+        self._last_selected = idx
+        return self.all_questions[idx]
+
+    def _response_log_likelihood(self, is_correct: bool, question_difficulty: float) -> np.ndarray:
+        """Grid log-likelihood of one response to the last selected question"""
+        if self._last_selected is not None:
+            a, b = self._a[self._last_selected], self._b[self._last_selected]
+        else:
+            a, b = 1.0, float(difficulty_to_theta(question_difficulty))
+
+        p = self.probability(self._grid, a, b)
+        return np.log(p if is_correct else 1 - p)
+
+    def _peek_question(self, is_correct: bool, fallback: bool = True) -> Optional[int]:
+        """Position of the most informative question at the ability this answer would produce"""
+        difficulty = self.all_questions.difficulty(self._last_selected)
+        theta, _ = self._estimate(self._log_likelihood + self._response_log_likelihood(is_correct, difficulty),
+                                  self.questions_attempted + 1)
+        return self._most_informative(theta)
+
+    def process_answer(self, is_correct: bool, time_taken: float, question_difficulty: float) -> Dict:
+        """Process answer and update the ability estimate for the last selected question"""
+        points_earned, multiplier = self._score_answer(is_correct, question_difficulty)
+
+        self._log_likelihood += self._response_log_likelihood(is_correct, question_difficulty)
+        self._update_estimate()
+
+        return self._record_answer(is_correct, time_taken, question_difficulty, points_earned, multiplier)
+
+    def restore_bytes(self, data: bytes):
+        """Restore a snapshot, replaying answer history into the ability posterior"""
+        super().restore_bytes(data)
+        with self._condition:
+            self._used[:] = False
+            self._used[list(self.used_questions)] = True
+
+        self._log_likelihood = np.zeros_like(self._grid)
+        for entry in self.question_history:
+            if entry["question_id"] is not None:
+                a, b = self._a[entry["question_id"]], self._b[entry["question_id"]]
+            else:
+                a, b = 1.0, float(difficulty_to_theta(entry["difficulty"]))
+            p = self.probability(self._grid, a, b)
+            self._log_likelihood += np.log(p if entry["is_correct"] else 1 - p)
+        self._update_estimate()
+
+    def reset(self):
+        """Reset engine for new test"""
+        super().reset()
+        with self._condition:
+            self._used[:] = False
+        self._log_likelihood = np.zeros_like(self._grid)
+        self._update_estimate()
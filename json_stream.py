@@ -0,0 +1,145 @@
+import json
+import re
+from typing import Dict, List, Tuple
+
+# Characters that change the scanner state outside strings; everything else is skipped in bulk
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+# Remainder of a string literal up to and including its closing quote
+_STRING_END = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+
+
+class QuestionStreamParser:
+    """Incrementally extract question objects from a streamed JSON document
+
+    Text is fed in arbitrary pieces as it arrives. The parser locates the
+    "questions" array and emits each element object as soon as its closing
+    brace is seen, without waiting for the rest of the document. Anything
+    outside the array (markdown fences, commentary) is ignored, and an element
+    that does not parse is dropped without affecting its neighbours.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self.found_array = False
+        self.array_closed = False
+        self.parsed = 0
+        self.dropped = 0
+        self.truncated = False
+
+        # Scanner state inside the array
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = -1
+
+    def feed(self, text: str) -> List[Dict]:
+        """Consume more text and return the question objects completed by it"""
+        if self.array_closed or not text:
+            return []
+
+        self._text += text
+        if not self.found_array and not self._find_array():
+            return []
+
+        completed = []
+        text = self._text
+        pos = self._pos
+        if self._escape and pos < len(text):
+            self._escape = False
+            pos += 1  # Character escaped by a backslash at the end of the previous piece
+        while True:
+            if self._in_string:
+                # Skip the rest of the string in one step, honouring escapes
+                end = _STRING_END.match(text, pos)
+                if end is None:
+                    tail = text[pos:]
+                    self._escape = (len(tail) - len(tail.rstrip('\\'))) % 2 == 1
+                    pos = len(text)
+                    break
+                pos = end.end()
+                self._in_string = False
+
+            # Jump straight to the next quote, brace or bracket
+            match = _STRUCTURAL.search(text, pos)
+            if match is None:
+                pos = len(text)
+                break
+            pos = match.start()
+            char = text[pos]
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                if self._depth == 0 and char == '{':
+                    self._object_start = pos
+                self._depth += 1
+            elif self._depth == 0:
+                if char == ']':
+                    self.array_closed = True
+                    break
+            else:
+                self._depth -= 1
+                if self._depth == 0 and self._object_start >= 0:
+                    question = self._parse_object(text[self._object_start:pos + 1])
+                    if question is not None:
+                        completed.append(question)
+                    self._object_start = -1
+            pos += 1
+
+        # Drop consumed text so long streams do not accumulate
+        keep_from = self._object_start if self._object_start >= 0 else pos
+        self._text = text[keep_from:]
+        self._pos = pos - keep_from
+        if self._object_start >= 0:
+            self._object_start = 0
+        return completed
+
+    def close(self):
+        """Mark the end of input; an element cut off part-way counts as dropped"""
+        if self.found_array and not self.array_closed:
+            self.truncated = True
+            if self._object_start >= 0:
+                self.dropped += 1
+                self._object_start = -1
+
+    def _find_array(self) -> bool:
+        """Position the scanner just after the opening bracket of the questions array"""
+        match = re.search(r'"questions"\s*:\s*\[', self._text)
+        if not match:
+            return False
+        self.found_array = True
+        self._text = self._text[match.end():]
+        self._pos = 0
+        return True
+
+    def _parse_object(self, raw: str):
+        """Parse one complete array element, tolerating trailing commas"""
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            repaired = re.sub(r',\s*([}\]])', r'\1', raw)
+            try:
+                value = json.loads(repaired)
+            except json.JSONDecodeError:
+                self.dropped += 1
+                return None
+
+        if not isinstance(value, dict):
+            self.dropped += 1
+            return None
+        self.parsed += 1
+        return value
+
+
+def salvage_questions(content: str) -> Tuple[List[Dict], Dict]:
+    """Every well-formed question object in a model response, in one pass
+
+    Tolerates fences and commentary, truncation and corrupt elements. The
+    report gives salvaged and dropped element counts, whether the document was
+    cut off, and whether a questions array was found at all.
+    """
+    parser = QuestionStreamParser()
+    questions = parser.feed(content)
+    parser.close()
+    return questions, {"salvaged": parser.parsed, "dropped": parser.dropped,
+                       "truncated": parser.truncated, "found_array": parser.found_array}
@@ -0,0 +1,224 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+from tracing import tracer
+
+# Priority classes, most urgent first
+PRIORITY_INTERACTIVE = 0  # Someone is waiting on it: the main set needed to start a test
+PRIORITY_BACKGROUND = 1  # Buffer fills that only keep the pool stocked
+PRIORITY_PREFETCH = 2  # Speculative work nobody is waiting on yet
+PRIORITY_NAMES = ("interactive", "background", "prefetch")
+
+
+class TokenBucket:
+    """Refills at rate per second up to capacity
+
+    The level may go negative: a call that used more than it was charged
+    leaves a debt that later calls wait out. Not thread-safe on its own;
+    RequestScheduler guards it with its lock.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount (capped at capacity) is available"""
+        self._refill(now)
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def consume(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= amount
+
+
+class _Waiter:
+    __slots__ = ("priority", "session", "tokens", "enqueued")
+
+    def __init__(self, priority: int, session: str, tokens: int):
+        self.priority = priority
+        self.session = session
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+
+
+class Slot:
+    """An admitted call; set used to the tokens it actually consumed before it is released"""
+
+    __slots__ = ("scheduler", "priority", "session", "tokens", "used", "waited")
+
+    def __init__(self, scheduler: "RequestScheduler", priority: int, session: str, tokens: int):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.session = session
+        self.tokens = tokens
+        self.used = None
+        self.waited = 0.0
+
+    def __enter__(self) -> "Slot":
+        self.waited = self.scheduler.acquire(self.priority, self.session, self.tokens)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.scheduler.release(self.tokens, self.used)
+        return False
+
+
+class RequestScheduler:
+    """Process-wide admission control for LLM calls sharing one API key
+
+    Calls are admitted while fewer than max_concurrency are in flight and the
+    request and token buckets (requests_per_minute, tokens_per_minute; None
+    for no limit) allow. Waiting calls are served strictly by priority class,
+    and round-robin across sessions within a class, so one session's bulk
+    upload cannot starve another session's test. A 429 from the API pauses
+    every admission and retry until its back-off has elapsed.
+
+    Queue depth and in-flight calls are exported as tracer gauges, queue waits
+    as the "llm.queue" stage and per-class counters; stats() returns the same
+    figures without tracing.
+    """
+
+    def __init__(self, max_concurrency: int = 8, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None):
+        self.max_concurrency = max(1, max_concurrency)
+        self._requests = TokenBucket(requests_per_minute / 60, requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute else None
+        self._cond = threading.Condition()
+        self._queues = [OrderedDict() for _ in PRIORITY_NAMES]  # Per class: session -> deque of waiters
+        self._depth = [0] * len(PRIORITY_NAMES)
+        self._active = 0
+        self._paused_until = 0.0
+        self._admitted = [0] * len(PRIORITY_NAMES)
+        self._wait_total = [0.0] * len(PRIORITY_NAMES)
+        self._wait_max = [0.0] * len(PRIORITY_NAMES)
+
+    def slot(self, priority: int = PRIORITY_INTERACTIVE, session: str = "", tokens: int = 0) -> Slot:
+        """Context manager holding a call's admission: with scheduler.slot(PRIORITY_BACKGROUND, sid, 2000): ..."""
+        return Slot(self, priority, session, tokens)
+
+    def _head(self) -> Optional[_Waiter]:
+        """Next waiter to admit: the oldest call of the next session in the most urgent non-empty class"""
+        for queue in self._queues:
+            for waiters in queue.values():
+                return waiters[0]
+        return None
+
+    def _admission_delay(self, tokens: int, now: float) -> Optional[float]:
+        """Seconds until a call of tokens could be admitted, or None while at the concurrency cap"""
+        if self._active >= self.max_concurrency:
+            return None
+        delay = self._paused_until - now
+        if self._requests:
+            delay = max(delay, self._requests.wait_time(1, now))
+        if self._tokens:
+            delay = max(delay, self._tokens.wait_time(tokens, now))
+        return delay
+
+    def acquire(self, priority: int = PRIORITY_INTERACTIVE, session: str = "", tokens: int = 0) -> float:
+        """Block until the call is admitted; returns the seconds it waited
+
+        Every admitted call must be paired with release(); slot() does both.
+        """
+        waiter = _Waiter(priority, session, tokens)
+        with tracer.span("llm.queue", priority=PRIORITY_NAMES[priority]) as span, self._cond:
+            queue = self._queues[priority]
+            queue.setdefault(session, deque()).append(waiter)
+            self._depth[priority] += 1
+            self._publish_depth(priority)
+            try:
+                while True:
+                    if self._head() is waiter:
+                        now = time.monotonic()
+                        delay = self._admission_delay(tokens, now)
+                        if delay is not None and delay <= 0:
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+            finally:
+                waiters = queue[session]
+                waiters.remove(waiter)
+                if waiters:
+                    queue.move_to_end(session)  # Round-robin: the session's next call goes behind other sessions
+                else:
+                    del queue[session]
+                self._depth[priority] -= 1
+                self._publish_depth(priority)
+                self._cond.notify_all()
+
+            # Admitted
+            now = time.monotonic()
+            if self._requests:
+                self._requests.consume(1, now)
+            if self._tokens:
+                self._tokens.consume(tokens, now)
+            self._active += 1
+            waited = now - waiter.enqueued
+            self._admitted[priority] += 1
+            self._wait_total[priority] += waited
+            self._wait_max[priority] = max(self._wait_max[priority], waited)
+            if tracer.enabled:
+                tracer.gauge("llm_requests_in_flight", self._active)
+            span.set(session=session, tokens=tokens, depth=self._depth[priority])
+        tracer.count("llm_requests_admitted_total", priority=PRIORITY_NAMES[priority])
+        tracer.count("llm_queue_wait_seconds_total", waited, priority=PRIORITY_NAMES[priority])
+        return waited
+
+    def release(self, tokens: int = 0, used: Optional[int] = None):
+        """Free an admitted call's slot, charging the difference if it used more or fewer tokens than estimated"""
+        with self._cond:
+            self._active -= 1
+            if self._tokens and used is not None:
+                self._tokens.consume(used - tokens, time.monotonic())
+            if tracer.enabled:
+                tracer.gauge("llm_requests_in_flight", self._active)
+            self._cond.notify_all()
+
+    def throttle(self):
+        """Wait for the request bucket and any 429 back-off before a retry of an admitted call"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                delay = self._paused_until - now
+                if self._requests:
+                    delay = max(delay, self._requests.wait_time(1, now))
+                if delay <= 0:
+                    break
+                self._cond.wait(delay)
+            if self._requests:
+                self._requests.consume(1, now)
+
+    def pause(self, delay: float):
+        """Hold back every admission and retry for delay seconds, as requested by a 429"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def _publish_depth(self, priority: int):
+        if tracer.enabled:
+            tracer.gauge("llm_queue_depth", self._depth[priority], priority=PRIORITY_NAMES[priority])
+
+    def stats(self) -> Dict:
+        """In-flight calls, and queued, admitted and wait seconds (total and max) per priority class"""
+        with self._cond:
+            return {"in_flight": self._active, "max_concurrency": self.max_concurrency,
+                    "queued": dict(zip(PRIORITY_NAMES, self._depth)),
+                    "admitted": dict(zip(PRIORITY_NAMES, self._admitted)),
+                    "wait_total_s": dict(zip(PRIORITY_NAMES, self._wait_total)),
+                    "wait_max_s": dict(zip(PRIORITY_NAMES, self._wait_max))}
+
+
+def scheduler_from_env() -> RequestScheduler:
+    """Scheduler configured by LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE and LLM_TOKENS_PER_MINUTE (0 for no limit)"""
+    return RequestScheduler(max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+                            requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60")),
+                            tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", "200000")))
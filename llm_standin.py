@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Record/replay stand-in for the OpenRouter API
+A requests transport adapter that answers OpenRouterAPI calls locally, for
+offline runs, CI and reproducible benchmarks. It can synthesise valid question
+JSON from the prompt, replay recorded responses, or record live ones, and can
+inject latency, truncated or malformed output, 429s and server errors.
+
+Enable it for the app with LLM_STANDIN=synthetic, LLM_STANDIN=replay:<file>
+or LLM_STANDIN=record:<file>, or mount it on a session in code:
+
+    session.mount("https://openrouter.ai/", OpenRouterStandin(latency=0.5, rate_limit_rate=0.1))
+"""
+
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+OPENROUTER_PREFIX = "https://openrouter.ai/"
+
+_VOCABULARY = ("cell membrane nucleus protein enzyme energy gene mutation osmosis diffusion glucose oxygen "
+               "carbon nitrogen photosynthesis respiration ribosome chromosome tissue organ hormone neuron").split()
+
+_STEMS = (
+    "Which term best connects {0} with {1}?",
+    "According to the text, what determines how {0} affects {1}?",
+    "What role does {0} play alongside {1} and {2}?",
+    "Which factor explains the change in {0} described for {1}?",
+    "What is the main difference between {0} and {2}?",
+    "Why does the text mention {0} when discussing {1}?",
+)
+
+
+class _ChunkedStream(io.RawIOBase):
+    """Readable body that yields pre-split chunks, sleeping before each to mimic token streaming"""
+
+    def __init__(self, chunks: List[bytes], delay: float):
+        self._chunks = list(chunks)
+        self._delay = delay
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self._pending:
+            if not self._chunks:
+                return 0
+            if self._delay:
+                time.sleep(self._delay)
+            self._pending = self._chunks.pop(0)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+class OpenRouterStandin(BaseAdapter):
+    """Transport adapter answering OpenRouter requests without the network
+
+    mode is "synthetic" (build valid questions from the prompt), "replay"
+    (serve responses recorded in path, falling back to synthetic on a miss
+    when replay_fallback is set) or "record" (forward to the live API and
+    append every response to path).
+
+    Faults are drawn per request from a generator seeded by seed, the request
+    body and how often that body was seen, so runs are reproducible however
+    concurrent requests are scheduled:
+    - latency + up to latency_jitter seconds before responding, and
+      stream_chunk_delay between streamed chunks
+    - rate_limit_rate: 429 with a Retry-After of retry_after seconds
+    - server_error_rate: 503
+    - truncate_rate: the model output is cut off part-way
+    - malformed_rate: the model output has a broken JSON token
+    """
+
+    def __init__(self, mode: str = "synthetic", path: Optional[str] = None, seed: int = 0,
+                 latency: float = 0.0, latency_jitter: float = 0.0, stream_chunk_delay: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: float = 1.0, server_error_rate: float = 0.0,
+                 truncate_rate: float = 0.0, malformed_rate: float = 0.0, replay_fallback: bool = True):
+        super().__init__()
+        if mode not in ("synthetic", "replay", "record"):
+            raise ValueError(f"Unknown stand-in mode: {mode}")
+        if mode != "synthetic" and not path:
+            raise ValueError(f"The {mode} mode needs a recording path")
+
+        self.mode = mode
+        self.path = path
+        self.seed = seed
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.stream_chunk_delay = stream_chunk_delay
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.server_error_rate = server_error_rate
+        self.truncate_rate = truncate_rate
+        self.malformed_rate = malformed_rate
+        self.replay_fallback = replay_fallback
+
+        self._lock = threading.Lock()
+        self._seen: Dict[str, int] = {}
+        self._recordings: Dict[str, List[Dict]] = {}
+        self._replayed: Dict[str, int] = {}
+        self._live = HTTPAdapter() if mode == "record" else None
+        self.counts = {"requests": 0, "rate_limited": 0, "server_errors": 0, "truncated": 0,
+                       "malformed": 0, "replayed": 0, "synthetic": 0, "recorded": 0}
+
+        if mode == "replay":
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._recordings.setdefault(entry["key"], []).append(entry)
+
+    @staticmethod
+    def request_key(request) -> str:
+        """Key identifying a request by method, path and (canonicalised) JSON body"""
+        body = request.body or b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        try:
+            body = json.dumps(json.loads(body), sort_keys=True).encode("utf-8")
+        except ValueError:
+            pass
+        path = urlparse(request.url).path
+        return hashlib.sha256(request.method.encode() + b" " + path.encode() + b"\n" + body).hexdigest()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        key = self.request_key(request)
+        with self._lock:
+            occurrence = self._seen.get(key, 0)
+            self._seen[key] = occurrence + 1
+            self.counts["requests"] += 1
+        rng = random.Random(f"{self.seed}:{key}:{occurrence}")
+
+        if self.mode == "record":
+            return self._record(request, key, stream, timeout, verify, cert, proxies)
+
+        delay = self.latency + rng.uniform(0, self.latency_jitter)
+        if delay:
+            time.sleep(delay)
+
+        if rng.random() < self.rate_limit_rate:
+            self._count("rate_limited")
+            return self._response(request, 429, json.dumps({"error": {"message": "Rate limit exceeded"}}),
+                                  {"Retry-After": f"{self.retry_after:g}"})
+        if rng.random() < self.server_error_rate:
+            self._count("server_errors")
+            return self._response(request, 503, json.dumps({"error": {"message": "Service unavailable"}}))
+
+        if request.method == "GET":
+            return self._response(request, 200, json.dumps({"data": {"label": "stand-in", "usage": 0}}))
+
+        if self.mode == "replay":
+            entry = self._replay(key)
+            if entry is not None:
+                self._count("replayed")
+                return self._response(request, entry["status"], entry["body"], entry.get("headers"),
+                                      stream=stream)
+            if not self.replay_fallback:
+                return self._response(request, 404, json.dumps({"error": {"message": "No recording for request"}}))
+
+        self._count("synthetic")
+        payload = json.loads(request.body)
+        content = self._synthesize(payload, rng)
+        if rng.random() < self.truncate_rate:
+            self._count("truncated")
+            content = content[:rng.randint(len(content) // 4, len(content) * 3 // 4)]
+        elif rng.random() < self.malformed_rate:
+            self._count("malformed")
+            commas = [m.start() for m in re.finditer(r'",', content)]
+            if commas:
+                position = rng.choice(commas) + 1
+                content = content[:position] + content[position + 1:]  # Drop a separating comma
+
+        usage = {"prompt_tokens": len(payload["messages"][0]["content"]) // 4, "completion_tokens": len(content) // 4}
+        if payload.get("stream"):
+            include_usage = (payload.get("usage") or {}).get("include")
+            return self._response(request, 200, self._sse_body(content, usage if include_usage else None),
+                                  {"Content-Type": "text/event-stream"}, stream=True)
+        return self._response(request, 200, json.dumps({
+            "choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage
+        }))
+
+    def _replay(self, key: str) -> Optional[Dict]:
+        """Next recording for key, cycling through repeats of the same request"""
+        with self._lock:
+            entries = self._recordings.get(key)
+            if not entries:
+                return None
+            index = self._replayed.get(key, 0)
+            self._replayed[key] = index + 1
+            return entries[index % len(entries)]
+
+    def _record(self, request, key: str, stream, timeout, verify, cert, proxies):
+        """Forward to the live API and append the response to the recording file"""
+        response = self._live.send(request, stream=False, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        entry = {"key": key, "status": response.status_code,
+                 "headers": {name: value for name, value in response.headers.items()
+                             if name.lower() in ("content-type", "retry-after")},
+                 "body": response.content.decode("utf-8", errors="replace")}
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.counts["recorded"] += 1
+        return self._response(request, entry["status"], entry["body"], entry["headers"], stream=stream)
+
+    def _synthesize(self, payload: Dict, rng: random.Random) -> str:
+        """Valid question JSON matching the count and difficulty range asked for in the prompt"""
+        prompt = payload["messages"][0]["content"]
+        count_match = re.search(r"exactly (\d+)", prompt)
+        range_match = re.search(r"between ([\d.]+) and ([\d.]+)", prompt)
+        text_match = re.search(r"Text: (.*?)\n\nRequirements:", prompt, flags=re.DOTALL)
+        count = int(count_match.group(1)) if count_match else 5
+        low, high = (float(range_match.group(1)), float(range_match.group(2))) if range_match else (0.1, 0.9)
+
+        words = re.findall(r"[A-Za-z]{4,}", text_match.group(1) if text_match else "")
+        words = list(dict.fromkeys(word.lower() for word in words)) or list(_VOCABULARY)
+        if len(words) < 8:
+            words += [word for word in _VOCABULARY if word not in words]
+
+        questions = []
+        for i in range(count):
+            focus = rng.sample(words, 3)
+            terms = rng.sample(words, 4)
+            letters = ["A", "B", "C", "D"]
+            correct = rng.choice(letters)
+            questions.append({
+                "question": rng.choice(_STEMS).format(*focus),
+                "options": {letter: term.capitalize() for letter, term in zip(letters, terms)},
+                "correct_answer": correct,
+                "difficulty": round(low + (high - low) * (i + rng.random()) / count, 2),
+                "explanation": f"The text links {focus[0]} and {focus[1]} through {terms[letters.index(correct)]}.",
+                "topic": focus[0].capitalize()
+            })
+        return json.dumps({"questions": questions}, indent=2)
+
+    @staticmethod
+    def _sse_body(content: str, usage: Optional[Dict] = None, chunk_size: int = 24) -> str:
+        """Server-sent events carrying content in small deltas, as OpenRouter streams it"""
+        events = [": OPENROUTER PROCESSING\n\n"]
+        for start in range(0, len(content), chunk_size):
+            delta = {"choices": [{"delta": {"content": content[start:start + chunk_size]}}]}
+            events.append(f"data: {json.dumps(delta)}\n\n")
+        if usage:
+            events.append(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n")
+        events.append("data: [DONE]\n\n")
+        return "".join(events)
+
+    def _response(self, request, status: int, body: str, headers: Optional[Dict] = None,
+                  stream: bool = False) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response.reason = {200: "OK", 404: "Not Found", 429: "Too Many Requests", 503: "Service Unavailable"}.get(status, "")
+        response.headers = CaseInsensitiveDict({"Content-Type": "application/json", **(headers or {})})
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+
+        data = body.encode("utf-8")
+        if stream:
+            # Split on event boundaries so each read returns whole SSE events after a delay
+            chunks = [event.encode("utf-8") + b"\n\n" for event in body.split("\n\n") if event]
+            response.raw = io.BufferedReader(_ChunkedStream(chunks, self.stream_chunk_delay))
+        else:
+            response.raw = io.BytesIO(data)
+            response._content = data
+        return response
+
+    def close(self):
+        if self._live is not None:
+            self._live.close()
+
+
+def standin_from_env() -> Optional[OpenRouterStandin]:
+    """Stand-in configured by LLM_STANDIN ("synthetic", "replay:<file>" or "record:<file>"), if set"""
+    setting = os.getenv("LLM_STANDIN", "").strip()
+    if not setting:
+        return None
+    mode, _, path = setting.partition(":")
+    return OpenRouterStandin(mode=mode, path=path or None, seed=int(os.getenv("LLM_STANDIN_SEED", "0")),
+                             latency=float(os.getenv("LLM_STANDIN_LATENCY", "0")))
+
+
+def install_standin(session: requests.Session, standin: Optional[OpenRouterStandin] = None,
+                    **kwargs) -> OpenRouterStandin:
+    """Mount a stand-in on session for every OpenRouter URL and return it"""
+    standin = standin or OpenRouterStandin(**kwargs)
+    session.mount(OPENROUTER_PREFIX, standin)
+    return standin
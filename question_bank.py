@@ -0,0 +1,163 @@
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterable, Iterator, List, Union
+
+# Separates a question's text fields inside its record; text containing it is kept as a plain dict
+_SEPARATOR = "\x1f"
+_ENCODED_SEPARATOR = _SEPARATOR.encode("utf-8")
+
+_CORE_FIELDS = ("question", "options", "correct_answer", "difficulty", "explanation", "topic")
+
+
+class QuestionBank(Sequence):
+    """Append-only question pool stored column-wise instead of as one dict per question
+
+    Difficulties live in a float array, topics and option-key layouts as
+    interned integer codes, and the text fields of every question in one
+    UTF-8 buffer: question i's record spans _starts[i]:_starts[i + 1], its
+    fields separated by _SEPARATOR. Indexing returns a QuestionView, which
+    reads like the original dict. Questions that do not fit this layout
+    (missing fields, non-string text) are kept as given.
+    """
+
+    def __init__(self, questions: Iterable[Dict] = ()):
+        self._difficulties = array("d")
+        self._topic_codes = array("H")
+        self._layout_codes = array("B")
+        self._answers = array("B")  # Position of the correct answer in the question's option keys
+        self._starts = array("I", [0])
+        self._text = bytearray()
+        self._topics: List[str] = []
+        self._topic_index: Dict[str, int] = {}
+        self._layouts: List[tuple] = []
+        self._layout_index: Dict[tuple, int] = {}
+        self._extras: Dict[int, Dict] = {}  # Position -> fields beyond _CORE_FIELDS
+        self._loose: Dict[int, Dict] = {}   # Position -> questions kept as given
+        self.extend(questions)
+
+    def __len__(self) -> int:
+        return len(self._starts) - 1
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("question bank index out of range")
+        loose = self._loose.get(index)
+        return loose if loose is not None else QuestionView(self, index)
+
+    @property
+    def difficulties(self) -> array:
+        """Difficulty of every question, by position"""
+        return self._difficulties
+
+    def difficulty(self, index: int) -> float:
+        return self._difficulties[index]
+
+    def topic(self, index: int) -> str:
+        loose = self._loose.get(index)
+        return loose.get("topic", "Unknown") if loose is not None else self._topics[self._topic_codes[index]]
+
+    def append(self, question: Dict) -> int:
+        """Add a question and return its position"""
+        index = len(self)
+        packed = self._pack(question)
+        self._difficulties.append(float(question["difficulty"]))
+        if packed is None:
+            self._loose[index] = question
+            self._topic_codes.append(0)
+            self._layout_codes.append(0)
+            self._answers.append(0)
+        else:
+            record, topic, layout, answer, extras = packed
+            self._text += record
+            self._topic_codes.append(topic)
+            self._layout_codes.append(layout)
+            self._answers.append(answer)
+            if extras:
+                self._extras[index] = extras
+        self._starts.append(len(self._text))  # Last, so a concurrent reader never sees a partial question
+        return index
+
+    def extend(self, questions: Iterable[Dict]):
+        for question in questions:
+            self.append(question)
+
+    def to_dicts(self) -> List[Dict]:
+        return [dict(question) for question in self]
+
+    def _pack(self, question: Dict):
+        """(record, topic code, layout code, answer position, extras), or None if the question is kept as given"""
+        if not all(field in question for field in _CORE_FIELDS):
+            return None
+        options, topic = question["options"], question["topic"]
+        if not isinstance(options, Mapping) or not isinstance(topic, str):
+            return None
+        layout = tuple(options)
+        if question["correct_answer"] not in layout or not all(isinstance(key, str) for key in layout):
+            return None
+        texts = [question["question"], *options.values(), question["explanation"]]
+        if not all(isinstance(text, str) and _SEPARATOR not in text for text in texts):
+            return None
+
+        topic_code = self._intern(self._topic_index, self._topics, topic, 0xFFFF)
+        layout_code = self._intern(self._layout_index, self._layouts, layout, 0xFF)
+        if topic_code is None or layout_code is None:
+            return None
+        extras = {key: value for key, value in question.items() if key not in _CORE_FIELDS}
+        record = _ENCODED_SEPARATOR.join(text.encode("utf-8") for text in texts)
+        return record, topic_code, layout_code, layout.index(question["correct_answer"]), extras
+
+    @staticmethod
+    def _intern(index: Dict, values: List, value, limit: int):
+        code = index.get(value)
+        if code is None:
+            if len(values) > limit:
+                return None
+            code = index[value] = len(values)
+            values.append(value)
+        return code
+
+    def _fields(self, index: int) -> List[str]:
+        return self._text[self._starts[index]:self._starts[index + 1]].decode("utf-8").split(_SEPARATOR)
+
+
+class QuestionView(Mapping):
+    """Read-only dict-like view of one question in a QuestionBank"""
+
+    __slots__ = ("_bank", "_index")
+
+    def __init__(self, bank: QuestionBank, index: int):
+        self._bank = bank
+        self._index = index
+
+    def __getitem__(self, key: str):
+        bank, index = self._bank, self._index
+        if key == "difficulty":
+            return bank._difficulties[index]
+        if key == "topic":
+            return bank._topics[bank._topic_codes[index]]
+        if key == "correct_answer":
+            return bank._layouts[bank._layout_codes[index]][bank._answers[index]]
+        if key == "question":
+            return bank._fields(index)[0]
+        if key == "explanation":
+            return bank._fields(index)[-1]
+        if key == "options":
+            return dict(zip(bank._layouts[bank._layout_codes[index]], bank._fields(index)[1:-1]))
+        extras = bank._extras.get(index)
+        if extras is None:
+            raise KeyError(key)
+        return extras[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from _CORE_FIELDS
+        yield from self._bank._extras.get(self._index, ())
+
+    def __len__(self) -> int:
+        return len(_CORE_FIELDS) + len(self._bank._extras.get(self._index, ()))
+
+    def __repr__(self) -> str:
+        return f"QuestionView({dict(self)!r})"
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+class QuestionCache:
+    """Persistent on-disk cache of extracted PDF text and generated questions
+
+    Entries are content-addressed: extracted text is keyed by a hash of the
+    uploaded bytes, generated questions by that hash plus the generation
+    parameters. The directory is bounded to max_bytes with least-recently-used
+    eviction based on file modification times, which are refreshed on every hit.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024):
+        self.cache_dir = cache_dir or os.getenv('QUESTION_CACHE_DIR', os.path.join('.cache', 'questions'))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """Content hash of an uploaded file"""
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def questions_key(pdf_hash: str, params: Dict) -> str:
+        """Cache key for a question set generated from a document with given parameters"""
+        canonical = json.dumps(params, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(f"{pdf_hash}:{canonical}".encode('utf-8')).hexdigest()
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{kind}-{key}.json")
+
+    def _read(self, kind: str, key: str):
+        path = self._path(kind, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def _write(self, kind: str, key: str, value) -> None:
+        path = self._path(kind, key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)  # Atomic: readers never see a partial entry
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove least-recently-used entries until the cache fits in max_bytes"""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.is_file() or entry.name.startswith('.tmp-'):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    def get_text(self, pdf_hash: str) -> Optional[str]:
+        """Return cached extracted text for a document, or None"""
+        value = self._read('text', pdf_hash)
+        return value.get('text') if value else None
+
+    def put_text(self, pdf_hash: str, text: str) -> None:
+        """Store extracted text for a document"""
+        self._write('text', pdf_hash, {'text': text})
+
+    def get_questions(self, pdf_hash: str, params: Dict) -> Optional[Tuple[List[Dict], List[Dict]]]:
+        """Return the cached (main, buffer) question sets, or None
+
+        Entries written before the sets were stored separately count as misses,
+        since their split point is unknown.
+        """
+        value = self._read('questions', self.questions_key(pdf_hash, params))
+        if not value or 'main' not in value:
+            return None
+        return value['main'], value.get('buffer', [])
+
+    def put_questions(self, pdf_hash: str, params: Dict, main_questions: List[Dict],
+                      buffer_questions: List[Dict]) -> None:
+        """Store validated main and buffer sets, kept apart so short sets are restored as generated"""
+        self._write('questions', self.questions_key(pdf_hash, params),
+                    {'main': main_questions, 'buffer': buffer_questions})
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0
+            }
@@ -0,0 +1,154 @@
+import bisect
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class DifficultyIndex:
+    """Sorted index of unused questions by difficulty
+
+    Entries are (difficulty, question index) pairs. Most live in a sorted base
+    array whose removed entries are skipped with two union-find "next alive"
+    arrays (one per direction, path-compressed); entries added since the base
+    was built go to a small sorted overflow list. A nearest-difficulty lookup
+    is a bisect in each plus near-constant skipping: O(log n).
+
+    Added entries are buffered and placed on the next lookup: a few are
+    inserted into the overflow with bisect.insort, and the base is rebuilt
+    (one sort of the alive entries) only once the overflow would outgrow
+    1/MERGE_FRACTION of it. Adds interleaved with lookups, as when questions
+    stream in, therefore cost amortised O(log n) plus a short list shift,
+    not a re-sort each.
+    """
+
+    MERGE_FRACTION = 8
+    MIN_OVERFLOW = 32
+
+    def __init__(self, items: Iterable[Tuple[float, int]] = ()):
+        self._keys: List[float] = []
+        self._ids: List[int] = []
+        self._position = {}
+        self._right = [0]  # _right[p]: candidate alive position >= p (n is the sentinel)
+        self._left = [0]   # _left[p + 1]: candidate alive position + 1 <= p + 1 (0 is the sentinel)
+        self._alive = 0
+        self._overflow: List[Tuple[float, int]] = []
+        self._overflow_difficulty: Dict[int, float] = {}
+        self._pending = [(float(difficulty), idx) for difficulty, idx in items]
+
+    def __len__(self) -> int:
+        return self._alive + len(self._overflow) + len(self._pending)
+
+    def add(self, difficulty: float, idx: int):
+        """Add an unused question to the index"""
+        self._pending.append((float(difficulty), idx))
+
+    def _flush(self):
+        """Place pending entries in the overflow, or rebuild the base once the overflow would grow too large"""
+        if not self._pending:
+            return
+
+        if len(self._overflow) + len(self._pending) <= max(self.MIN_OVERFLOW, self._alive // self.MERGE_FRACTION):
+            for entry in self._pending:
+                bisect.insort(self._overflow, entry)
+                self._overflow_difficulty[entry[1]] = entry[0]
+            self._pending = []
+            return
+
+        entries = [(self._keys[p], self._ids[p]) for p in range(len(self._keys)) if self._right[p] == p]
+        entries.extend(self._overflow)
+        entries.extend(self._pending)
+        entries.sort()
+        self._pending = []
+        self._overflow = []
+        self._overflow_difficulty = {}
+
+        self._keys = [difficulty for difficulty, _ in entries]
+        self._ids = [idx for _, idx in entries]
+        self._position = {idx: p for p, idx in enumerate(self._ids)}
+        self._right = list(range(len(entries) + 1))
+        self._left = list(range(len(entries) + 1))
+        self._alive = len(entries)
+
+    @staticmethod
+    def _find(parent: List[int], p: int) -> int:
+        """Union-find root lookup with path compression"""
+        root = p
+        while parent[root] != root:
+            root = parent[root]
+        while parent[p] != root:
+            parent[p], p = root, parent[p]
+        return root
+
+    def _alive_at_or_after(self, p: int) -> int:
+        """Smallest alive position >= p, or len(keys) if none"""
+        return self._find(self._right, p)
+
+    def _alive_at_or_before(self, p: int) -> int:
+        """Largest alive position <= p, or -1 if none"""
+        return self._find(self._left, p + 1) - 1
+
+    def _nearest_in_base(self, target: float) -> Optional[Tuple[float, int]]:
+        n = len(self._keys)
+        best = None
+
+        pos = bisect.bisect_left(self._keys, target)
+        right = self._alive_at_or_after(pos)
+        if right < n:
+            best = (abs(self._keys[right] - target), self._ids[right])
+
+        left = self._alive_at_or_before(pos - 1)
+        if left >= 0:
+            difficulty = self._keys[left]
+            # Lowest index among alive entries sharing this difficulty
+            first = self._alive_at_or_after(bisect.bisect_left(self._keys, difficulty))
+            candidate = (abs(difficulty - target), self._ids[first])
+            if best is None or candidate < best:
+                best = candidate
+        return best
+
+    def _nearest_in_overflow(self, target: float) -> Optional[Tuple[float, int]]:
+        overflow = self._overflow
+        best = None
+
+        pos = bisect.bisect_left(overflow, (target,))
+        if pos < len(overflow):
+            difficulty, idx = overflow[pos]  # Entries sort by index within a difficulty
+            best = (abs(difficulty - target), idx)
+
+        if pos > 0:
+            difficulty = overflow[pos - 1][0]
+            candidate = (abs(difficulty - target), overflow[bisect.bisect_left(overflow, (difficulty,))][1])
+            if best is None or candidate < best:
+                best = candidate
+        return best
+
+    def nearest(self, target: float, tolerance: Optional[float] = None) -> Optional[Tuple[float, int]]:
+        """(distance, index) of the unused question closest to target, or None
+
+        Ties on distance go to the lowest question index. Returns None when the
+        closest question is farther than tolerance.
+        """
+        self._flush()
+        best = self._nearest_in_base(target)
+        if self._overflow:
+            candidate = self._nearest_in_overflow(target)
+            if best is None or (candidate is not None and candidate < best):
+                best = candidate
+
+        if best is None or (tolerance is not None and best[0] > tolerance):
+            return None
+        return best
+
+    def remove(self, idx: int) -> bool:
+        """Mark a question as used; returns False if it was not in the index"""
+        self._flush()
+        difficulty = self._overflow_difficulty.pop(idx, None)
+        if difficulty is not None:
+            del self._overflow[bisect.bisect_left(self._overflow, (difficulty, idx))]
+            return True
+
+        p = self._position.get(idx)
+        if p is None or self._right[p] != p:
+            return False
+        self._right[p] = p + 1
+        self._left[p + 1] = p
+        self._alive -= 1
+        return True
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from dedup import NearDuplicateIndex
+from sqlite_connection import ThreadLocalConnection
+
+
+def question_fingerprint(question: Dict) -> str:
+    """Stable key for a question: its normalised text and options"""
+    def normalise(text) -> str:
+        return re.sub(r"\s+", " ", str(text)).strip().lower()
+
+    options = question.get("options") or {}
+    parts = [normalise(question.get("question", ""))]
+    parts += [f"{normalise(key)}:{normalise(options[key])}" for key in sorted(options)]
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class SQLiteQuestionStore:
+    """Persistent cross-document bank of validated questions in SQLite (WAL mode)
+
+    Every question is stored once (keyed by its fingerprint) with the hash of
+    its source document, topic, difficulty and usage counts. Indexes on
+    (topic, difficulty) and (document, difficulty) make difficulty range
+    queries per document or per topic cheap, so tests can be assembled from
+    earlier generations and the LLM is only asked to fill gaps.
+
+    MinHash signatures and their LSH band buckets are stored alongside, so
+    near-duplicates are found with a fixed number of indexed bucket lookups.
+    A document never stores a near-duplicate of its own questions; a question
+    resembling another document's is still kept for this one.
+    """
+
+    def __init__(self, path: Optional[str] = None, dedup_threshold: float = 0.8):
+        self.path = path or os.getenv('QUESTION_STORE_PATH', os.path.join('.cache', 'questions.db'))
+        self._connection = ThreadLocalConnection(self.path)
+        self._dedup = NearDuplicateIndex(threshold=dedup_threshold)
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY,
+            fingerprint TEXT NOT NULL UNIQUE,
+            document TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            difficulty REAL NOT NULL,
+            payload TEXT NOT NULL,
+            times_served INTEGER NOT NULL DEFAULT 0,
+            times_correct INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_questions_topic_difficulty ON questions (topic, difficulty)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_questions_document_difficulty ON questions (document, difficulty)")
+        conn.execute("""CREATE TABLE IF NOT EXISTS question_signatures (
+            question_id INTEGER PRIMARY KEY,
+            signature BLOB NOT NULL)""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS question_lsh (
+            bucket INTEGER NOT NULL,
+            question_id INTEGER NOT NULL,
+            PRIMARY KEY (bucket, question_id)) WITHOUT ROWID""")
+        self._index_missing_signatures()
+
+    @staticmethod
+    def document_key(text: str) -> str:
+        """Hash identifying a source document by its extracted text"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _index_signature(self, conn: sqlite3.Connection, question_id: int, signature):
+        conn.execute("INSERT OR REPLACE INTO question_signatures (question_id, signature) VALUES (?, ?)",
+                     (question_id, self._dedup.hasher.pack(signature)))
+        conn.executemany("INSERT OR IGNORE INTO question_lsh (bucket, question_id) VALUES (?, ?)",
+                         [(bucket, question_id) for bucket in self._dedup.bucket_keys(signature)])
+
+    def _index_missing_signatures(self):
+        """Add LSH entries for questions stored before signatures were kept"""
+        conn = self._connection()
+        rows = conn.execute("SELECT q.id, q.payload FROM questions q LEFT JOIN question_signatures s "
+                            "ON s.question_id = q.id WHERE s.question_id IS NULL").fetchall()
+        if not rows:
+            return
+        conn.execute("BEGIN")
+        try:
+            for question_id, payload in rows:
+                self._index_signature(conn, question_id, self._dedup.hasher.signature(json.loads(payload)))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _find_near_duplicate(self, conn: sqlite3.Connection, signature, document: Optional[str] = None) -> Optional[int]:
+        buckets = self._dedup.bucket_keys(signature)
+        query = ("SELECT DISTINCT s.question_id, s.signature FROM question_lsh l "
+                 "JOIN question_signatures s ON s.question_id = l.question_id ")
+        if document is not None:
+            query += "JOIN questions q ON q.id = l.question_id AND q.document = ? "
+        query += f"WHERE l.bucket IN ({', '.join('?' * len(buckets))})"
+        rows = conn.execute(query, ([document] if document is not None else []) + buckets).fetchall()
+        for question_id, packed in rows:
+            if self._dedup.hasher.similarity(signature, self._dedup.hasher.unpack(packed)) >= self._dedup.threshold:
+                return question_id
+        return None
+
+    def has_near_duplicate(self, question: Dict, document: Optional[str] = None) -> bool:
+        """Whether a stored question (from document, if given) is a near-duplicate of question"""
+        return self._find_near_duplicate(self._connection(), self._dedup.hasher.signature(question),
+                                         document) is not None
+
+    def add_questions(self, questions: Iterable[Dict], document: str) -> int:
+        """Store validated questions from a document, skipping near-duplicates of its own; returns how many were new"""
+        now = time.time()
+        conn = self._connection()
+        added = 0
+        conn.execute("BEGIN")
+        try:
+            for q in questions:
+                signature = self._dedup.hasher.signature(q)
+                if self._find_near_duplicate(conn, signature, document) is not None:
+                    continue
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO questions (fingerprint, document, topic, difficulty, payload, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (question_fingerprint(q), document, str(q.get("topic", "Unknown")), float(q["difficulty"]),
+                     json.dumps(dict(q), separators=(",", ":")), now))
+                if cursor.rowcount:
+                    self._index_signature(conn, cursor.lastrowid, signature)
+                    added += 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def range_query(self, min_difficulty: float, max_difficulty: float, document: Optional[str] = None,
+                    topics: Optional[Sequence[str]] = None, exclude: Iterable[str] = (),
+                    limit: int = 10) -> List[Dict]:
+        """Questions with difficulty in [min_difficulty, max_difficulty], least served first
+
+        Filters by source document or by topics (either uses its index), and
+        skips questions whose fingerprint is in exclude.
+        """
+        exclude = set(exclude)
+        if limit <= 0:
+            return []
+
+        where = ["difficulty BETWEEN ? AND ?"]
+        params: List = [min_difficulty, max_difficulty]
+        if document is not None:
+            where.insert(0, "document = ?")
+            params.insert(0, document)
+        if topics:
+            where.insert(0, f"topic IN ({', '.join('?' * len(topics))})")
+            params[:0] = list(topics)
+
+        rows = self._connection().execute(
+            f"SELECT fingerprint, payload FROM questions WHERE {' AND '.join(where)} "
+            f"ORDER BY times_served, difficulty LIMIT ?", params + [limit + len(exclude)]).fetchall()
+        return [json.loads(payload) for fingerprint, payload in rows if fingerprint not in exclude][:limit]
+
+    def record_usage(self, question: Dict, is_correct: bool):
+        """Count one answered use of a stored question (no-op if it is not stored)"""
+        self._connection().execute(
+            "UPDATE questions SET times_served = times_served + 1, times_correct = times_correct + ? "
+            "WHERE fingerprint = ?", (int(is_correct), question_fingerprint(question)))
+
+    def stats(self) -> Dict:
+        """Question, document and usage totals"""
+        questions, documents, served = self._connection().execute(
+            "SELECT COUNT(*), COUNT(DISTINCT document), COALESCE(SUM(times_served), 0) FROM questions").fetchone()
+        return {"questions": questions, "documents": documents, "times_served": served}
@@ -0,0 +1,213 @@
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlite_connection import ThreadLocalConnection
+
+
+class StaleSessionError(Exception):
+    """Raised when a session was updated elsewhere since it was loaded"""
+
+
+class SessionRecord(NamedTuple):
+    version: int
+    state: Dict
+    engine_snapshot: Optional[bytes]
+
+
+class SessionStore(ABC):
+    """Interface for shared session backends
+
+    Sessions are versioned: save() succeeds only if the stored version still
+    equals expected_version (0 for a new session) and returns the new
+    version, so concurrent writers from different processes cannot silently
+    overwrite each other. Question pools are stored once per pool hash and
+    referenced from session state.
+    """
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[SessionRecord]:
+        """Return the current session record, or None if it does not exist"""
+
+    @abstractmethod
+    def save(self, session_id: str, state: Dict, engine_snapshot: Optional[bytes], expected_version: int) -> int:
+        """Write the session if nobody else has since expected_version; returns the new version"""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Remove a session"""
+
+    @abstractmethod
+    def put_pool(self, pool_hash: str, main_questions: List[Dict], buffer_questions: List[Dict]):
+        """Store a question pool under its content hash, keeping it alive for another TTL"""
+
+    @abstractmethod
+    def get_pool(self, pool_hash: str) -> Optional[Tuple[List[Dict], List[Dict]]]:
+        """Fetch a question pool by hash, or None if it is unknown or expired"""
+
+    @abstractmethod
+    def cleanup_expired(self) -> int:
+        """Delete expired sessions and unreferenced pools; returns the number of sessions removed"""
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite (WAL mode) session store shared by every process on one host
+
+    Reads go through an in-process cache validated against the stored
+    version, so an unchanged session costs one indexed lookup. Sessions and
+    unreferenced question pools idle for longer than ttl_seconds are removed
+    by cleanup_expired(), which save() also runs every cleanup_interval.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: float = 24 * 3600,
+                 cleanup_interval: float = 300, max_cached_pools: int = 64):
+        self.path = path or os.getenv('SESSION_DB_PATH', os.path.join('.cache', 'sessions.db'))
+        self.ttl_seconds = ttl_seconds
+        self.cleanup_interval = cleanup_interval
+        self.max_cached_pools = max_cached_pools
+
+        self._connection = ThreadLocalConnection(self.path)
+        self._lock = threading.Lock()
+        self._cache: Dict[str, SessionRecord] = {}
+        self._pool_cache: "OrderedDict[str, Tuple[List[Dict], List[Dict]]]" = OrderedDict()
+        self._last_cleanup = 0.0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                engine BLOB,
+                updated_at REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated_at)")
+            conn.execute("""CREATE TABLE IF NOT EXISTS question_pools (
+                pool_hash TEXT PRIMARY KEY,
+                main TEXT NOT NULL,
+                buffer TEXT NOT NULL,
+                created_at REAL NOT NULL)""")
+
+    def load(self, session_id: str) -> Optional[SessionRecord]:
+        """Return the current session record, or None if it does not exist"""
+        conn = self._connection()
+        row = conn.execute("SELECT version FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            with self._lock:
+                self._cache.pop(session_id, None)
+            return None
+
+        with self._lock:
+            cached = self._cache.get(session_id)
+        if cached is not None and cached.version == row[0]:
+            return cached
+
+        row = conn.execute("SELECT version, state, engine FROM sessions WHERE session_id = ?",
+                           (session_id,)).fetchone()
+        if row is None:
+            return None
+        record = SessionRecord(row[0], json.loads(row[1]), bytes(row[2]) if row[2] is not None else None)
+        with self._lock:
+            self._cache[session_id] = record
+        return record
+
+    def save(self, session_id: str, state: Dict, engine_snapshot: Optional[bytes], expected_version: int) -> int:
+        """Write the session if nobody else has since expected_version; returns the new version"""
+        conn = self._connection()
+        now = time.time()
+        new_version = expected_version + 1
+        state_json = json.dumps(state, separators=(",", ":"))
+
+        if expected_version == 0:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, version, state, engine, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (session_id, new_version, state_json, engine_snapshot, now))
+        else:
+            cursor = conn.execute(
+                "UPDATE sessions SET version = ?, state = ?, engine = ?, updated_at = ? "
+                "WHERE session_id = ? AND version = ?",
+                (new_version, state_json, engine_snapshot, now, session_id, expected_version))
+
+        if cursor.rowcount == 0:
+            with self._lock:
+                self._cache.pop(session_id, None)
+            raise StaleSessionError(f"Session {session_id} was modified by another worker")
+
+        with self._lock:
+            self._cache[session_id] = SessionRecord(new_version, state, engine_snapshot)
+
+        if now - self._last_cleanup > self.cleanup_interval:
+            self.cleanup_expired()
+        return new_version
+
+    def delete(self, session_id: str):
+        """Remove a session"""
+        self._connection().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        with self._lock:
+            self._cache.pop(session_id, None)
+
+    def put_pool(self, pool_hash: str, main_questions: List[Dict], buffer_questions: List[Dict]):
+        """Store a question pool once under its content hash
+
+        The row is written (or its created_at refreshed) even when this process
+        has the pool cached: another worker's cleanup may have deleted it since.
+        """
+        conn = self._connection()
+        with self._lock:
+            cached = pool_hash in self._pool_cache
+        if cached and conn.execute("UPDATE question_pools SET created_at = ? WHERE pool_hash = ?",
+                                   (time.time(), pool_hash)).rowcount:
+            return
+        main = [dict(q) for q in main_questions]
+        buffer = [dict(q) for q in buffer_questions]
+        conn.execute(
+            "INSERT INTO question_pools (pool_hash, main, buffer, created_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (pool_hash) DO UPDATE SET created_at = excluded.created_at",
+            (pool_hash, json.dumps(main), json.dumps(buffer), time.time()))
+        self._cache_pool(pool_hash, (main, buffer))
+
+    def get_pool(self, pool_hash: str) -> Optional[Tuple[List[Dict], List[Dict]]]:
+        """Fetch a question pool by hash; pools are immutable so they are cached in-process"""
+        with self._lock:
+            pool = self._pool_cache.get(pool_hash)
+            if pool is not None:
+                self._pool_cache.move_to_end(pool_hash)
+                return pool
+
+        row = self._connection().execute(
+            "SELECT main, buffer FROM question_pools WHERE pool_hash = ?", (pool_hash,)).fetchone()
+        if row is None:
+            return None
+        pool = (json.loads(row[0]), json.loads(row[1]))
+        self._cache_pool(pool_hash, pool)
+        return pool
+
+    def _cache_pool(self, pool_hash: str, pool: Tuple[List[Dict], List[Dict]]):
+        with self._lock:
+            self._pool_cache[pool_hash] = pool
+            self._pool_cache.move_to_end(pool_hash)
+            while len(self._pool_cache) > self.max_cached_pools:
+                self._pool_cache.popitem(last=False)
+
+    def cleanup_expired(self) -> int:
+        """Delete sessions idle past the TTL and pools no live session references"""
+        conn = self._connection()
+        cutoff = time.time() - self.ttl_seconds
+        self._last_cleanup = time.time()
+
+        expired = conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+        conn.execute(
+            "DELETE FROM question_pools WHERE created_at < ? AND pool_hash NOT IN "
+            "(SELECT json_extract(state, '$.pool_hash') FROM sessions WHERE json_extract(state, '$.pool_hash') IS NOT NULL)",
+            (cutoff,))
+
+        with self._lock:
+            self._cache.clear()
+        return expired
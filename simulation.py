@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Batch simulation harness for adaptive test engines
+Runs synthetic examinees with known true ability through an engine and reports
+throughput, ability recovery, item exposure and test length.
+
+Examinees are not vectorized: each one takes its test through the engine's own
+get_next_question/process_answer in a Python loop, so any engine with that
+interface can be simulated unchanged. NumPy is used for the random draws and
+the metrics, and throughput comes from spreading chunks over a process pool.
+
+Example: python simulation.py --engine irt --examinees 100000 --bank-size 200
+"""
+
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend import AdaptiveTestEngine
+
+
+def make_question_bank(size: int, seed: int = 0) -> Tuple[List[Dict], List[Dict]]:
+    """Synthetic bank split like generated sets: main questions in 0.3-0.7, buffer in 0.1-0.9"""
+    rng = np.random.default_rng(seed)
+    main_size = size // 2
+    difficulties = np.concatenate([rng.uniform(0.3, 0.7, main_size), rng.uniform(0.1, 0.9, size - main_size)])
+    questions = [{
+        "question": f"Synthetic question {i + 1}",
+        "options": {"A": "Option A", "B": "Option B", "C": "Option C", "D": "Option D"},
+        "correct_answer": "A",
+        "difficulty": round(float(d), 3),
+        "explanation": "Synthetic question.",
+        "topic": f"Topic {i % 10}"
+    } for i, d in enumerate(difficulties)]
+    return questions[:main_size], questions[main_size:]
+
+
+def _logit(p):
+    p = np.clip(p, 0.01, 0.99)
+    return np.log(p / (1 - p))
+
+
+def _simulate_chunk(engine_class, engine_kwargs: Dict, bank_size: int, bank_seed: int,
+                    max_questions: int, true_theta: np.ndarray, seed: int) -> Dict:
+    """Run one chunk of examinees through a single engine instance, reset between examinees"""
+    main_questions, buffer_questions = make_question_bank(bank_size, bank_seed)
+    engine = engine_class(main_questions, buffer_questions, **engine_kwargs)
+    engine.max_questions = max_questions
+    item_b = _logit(np.array(engine.all_questions.difficulties))
+
+    # Draw every examinee's response noise and timing up front; the tests themselves run one at a time
+    rng = np.random.default_rng(seed)
+    n = len(true_theta)
+    uniforms = rng.random((n, max_questions))
+    times = rng.lognormal(mean=2.2, sigma=0.5, size=(n, max_questions))
+
+    final_ability = np.empty(n)
+    test_length = np.empty(n, dtype=np.int64)
+    exposure = np.zeros(len(engine.all_questions), dtype=np.int64)
+
+    for e in range(n):
+        engine.reset()
+        theta = true_theta[e]
+        for step in range(max_questions):
+            question = engine.get_next_question()
+            if question is None:
+                break
+            idx = engine.pending_question_id
+            p_correct = 1 / (1 + math.exp(-(theta - item_b[idx])))
+            engine.process_answer(bool(uniforms[e, step] < p_correct), float(times[e, step]), question["difficulty"])
+            exposure[idx] += 1
+
+        final_ability[e] = engine.user_ability
+        test_length[e] = engine.questions_attempted
+
+    return {"final_ability": final_ability, "test_length": test_length, "exposure": exposure}
+
+
+def simulate(engine_class=AdaptiveTestEngine, engine_kwargs: Optional[Dict] = None, examinees: int = 10000,
+             bank_size: int = 20, max_questions: int = 10, workers: Optional[int] = None, seed: int = 0) -> Dict:
+    """Simulate examinees through an engine and summarise the run
+
+    True abilities are drawn from a standard normal on the logit scale and
+    compared with the engine's final user_ability on the 0-1 scale. Work is
+    split into chunks across a process pool (serially when workers is 1);
+    within a chunk examinees are simulated one after another.
+    """
+    engine_kwargs = engine_kwargs or {}
+    workers = workers or os.cpu_count() or 1
+    rng = np.random.default_rng(seed)
+    true_theta = rng.standard_normal(examinees)
+
+    chunks = np.array_split(true_theta, min(examinees, workers * 4)) if examinees else []
+    jobs = [(engine_class, engine_kwargs, bank_size, seed, max_questions, chunk, seed + 1 + i)
+            for i, chunk in enumerate(chunks)]
+
+    start = time.perf_counter()
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_simulate_chunk, *zip(*jobs)))
+    else:
+        results = [_simulate_chunk(*job) for job in jobs]
+    elapsed = time.perf_counter() - start
+
+    final_ability = np.concatenate([r["final_ability"] for r in results]) if results else np.empty(0)
+    test_length = np.concatenate([r["test_length"] for r in results]) if results else np.empty(0)
+    exposure = np.sum([r["exposure"] for r in results], axis=0) if results else np.zeros(bank_size)
+
+    true_ability = 1 / (1 + np.exp(-true_theta))
+    error = final_ability - true_ability
+    exposure_rate = exposure / max(1, examinees)
+
+    return {
+        "engine": engine_class.__name__,
+        "examinees": examinees,
+        "bank_size": bank_size,
+        "elapsed_seconds": elapsed,
+        "tests_per_second": examinees / elapsed if elapsed > 0 else 0.0,
+        "ability_rmse": float(np.sqrt(np.mean(error ** 2))) if examinees else 0.0,
+        "ability_bias": float(np.mean(error)) if examinees else 0.0,
+        "ability_correlation": float(np.corrcoef(true_ability, final_ability)[0, 1]) if examinees > 1 else 0.0,
+        "mean_test_length": float(np.mean(test_length)) if examinees else 0.0,
+        "min_test_length": int(np.min(test_length)) if examinees else 0,
+        "max_test_length": int(np.max(test_length)) if examinees else 0,
+        "max_exposure_rate": float(np.max(exposure_rate)) if len(exposure_rate) else 0.0,
+        "unused_item_fraction": float(np.mean(exposure == 0)) if len(exposure) else 0.0,
+        "exposure_rates": exposure_rate.tolist()
+    }
+
+
+def print_report(report: Dict):
+    """Print a simulation summary"""
+    print(f"🧪 {report['engine']}: {report['examinees']} examinees, bank of {report['bank_size']}")
+    print("=" * 60)
+    print(f"   Throughput:          {report['tests_per_second']:.0f} tests/s ({report['elapsed_seconds']:.2f}s)")
+    print(f"   Ability RMSE:        {report['ability_rmse']:.3f}")
+    print(f"   Ability bias:        {report['ability_bias']:+.3f}")
+    print(f"   Ability correlation: {report['ability_correlation']:.3f}")
+    print(f"   Test length:         {report['mean_test_length']:.2f} "
+          f"(min {report['min_test_length']}, max {report['max_test_length']})")
+    print(f"   Max exposure rate:   {report['max_exposure_rate']:.3f}")
+    print(f"   Never-used items:    {report['unused_item_fraction']:.1%}")
+
+
+def main():
+    """Run a simulation from the command line"""
+    parser = argparse.ArgumentParser(description="Simulate examinees through an adaptive test engine")
+    parser.add_argument("--engine", choices=["heuristic", "irt"], default="heuristic")
+    parser.add_argument("--examinees", type=int, default=10000)
+    parser.add_argument("--bank-size", type=int, default=20)
+    parser.add_argument("--max-questions", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engine_class = AdaptiveTestEngine
+    if args.engine == "irt":
+        from irt_engine import IRTTestEngine
+        engine_class = IRTTestEngine
+
+    report = simulate(engine_class, examinees=args.examinees, bank_size=args.bank_size,
+                      max_questions=args.max_questions, workers=args.workers, seed=args.seed)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import sqlite3
+import threading
+
+
+class ThreadLocalConnection:
+    """Opens one autocommit connection per thread to a SQLite file; call it to get this thread's connection
+
+    SQLite connections must not be shared across threads, so each store keeps
+    one of these instead of a single connection.
+    """
+
+    def __init__(self, path: str, timeout: float = 10):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def __call__(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,114 @@
+import threading
+import time
+import uuid
+
+import pytest
+
+from backend import OpenRouterAPI
+from llm_scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RequestScheduler
+
+TEXT = "Cells convert nutrients into energy. " * 40
+
+
+def make_question(tag: str) -> dict:
+    words = [uuid.uuid4().hex[:8] for _ in range(6)]
+    return {"question": f"{tag} {' '.join(words)}?",
+            "options": {key: uuid.uuid4().hex[:8] for key in "ABCD"},
+            "correct_answer": "A", "difficulty": 0.5, "explanation": "Because.", "topic": "Biology"}
+
+
+class ScriptedAPI(OpenRouterAPI):
+    """Serves each batch's calls from a script of (delay, questions, tokens[, error]) in call order"""
+
+    def __init__(self, script, buffer_script=((0.0, 5, 10),)):
+        super().__init__(scheduler=RequestScheduler())
+        self.main_count, self.buffer_count, self.batch_size = 5, 5, 5
+        self.script = {self.main_range: list(script), self.buffer_range: list(buffer_script)}
+        self.calls = {}
+        self.priorities = []
+        self.lock = threading.Lock()
+
+    def stream_questions_batch(self, text_content, count, difficulty_range, on_question=None,
+                               report=None, priority=0, session_key=""):
+        with self.lock:
+            n = self.calls.get(difficulty_range, 0)
+            self.calls[difficulty_range] = n + 1
+            self.priorities.append((difficulty_range == self.main_range, priority))
+        delay, produced, tokens, *error = self.script[difficulty_range][n]
+        if n == 1:
+            self.hedge_min_delay = 60.0  # Hedge only the first call
+        report.update(admitted=time.monotonic(), queue_wait=0.0)
+        time.sleep(delay)
+        tag = f"call{n}" if difficulty_range == self.main_range else "buffer"
+        questions = [make_question(tag) for _ in range(produced)]
+        for q in questions:
+            on_question(q)
+        report["tokens"] = tokens
+        return questions, error[0] if error else ""
+
+
+@pytest.fixture(autouse=True)
+def standin(monkeypatch):
+    monkeypatch.setenv("LLM_STANDIN", "synthetic")
+
+
+def test_abandoned_call_is_charged_and_its_late_results_dropped():
+    # The first call stalls past the hedge delay; its hedge wins with a short batch and the
+    # top-up for the shortfall is still running when the abandoned call finally streams
+    api = ScriptedAPI([(0.3, 5, 100), (0.0, 3, 50), (0.5, 2, 20)])
+    api._latencies.extend([0.05] * api.hedge_min_samples)
+    api.hedge_min_delay = 0.05
+
+    streamed, report = [], {}
+    main, _, error = api.generate_questions_concurrent(TEXT, lambda pool, q: streamed.append(q), report=report)
+
+    assert not error
+    assert sorted(q["question"].split()[0] for q in main) == ["call1"] * 3 + ["call2"] * 2
+    assert all(not q["question"].startswith("call0") for q in streamed)
+    assert report["hedged_requests"] == 1 and report["hedge_wins"] == 1
+    assert report["tokens_used"] == 100 + 50 + 20 + 10
+    # Hedges and top-ups of the main batch are as urgent as the batch itself
+    assert sorted(api.priorities) == [(False, PRIORITY_BACKGROUND)] + [(True, PRIORITY_INTERACTIVE)] * 3
+
+
+
+def test_api_down_fails_the_run_without_retries():
+    down = [(0.0, 0, 0, "API request failed: 503 Service Unavailable")]
+    api = ScriptedAPI(down, buffer_script=down)
+
+    report = {}
+    main, buffer, error = api.generate_questions_concurrent(TEXT, lambda pool, q: None, report=report)
+
+    assert (main, buffer) == ([], [])
+    assert error == "Error generating main questions: API request failed: 503 Service Unavailable"
+    assert report["api_calls"] == 2 and report["top_up_requests"] == 0
+
+
+def test_failed_hedge_leaves_the_original_call_to_finish():
+    api = ScriptedAPI([(0.3, 5, 100), (0.0, 0, 0, "API request failed: 502 Bad Gateway")])
+    api._latencies.extend([0.05] * api.hedge_min_samples)
+    api.hedge_min_delay = 0.05
+
+    report = {}
+    main, _, error = api.generate_questions_concurrent(TEXT, lambda pool, q: None, report=report)
+
+    assert not error
+    assert [q["question"].split()[0] for q in main] == ["call0"] * 5
+    assert report["hedged_requests"] == 1 and report["hedge_wins"] == 0
+    assert report["top_up_requests"] == 0 and report["api_calls"] == 3
+
+
+def test_time_budget_returns_what_arrived_and_drops_late_results():
+    api = ScriptedAPI([(1.0, 5, 100)])
+    api.max_generation_seconds = 0.2
+
+    streamed, completed, report = [], [], {}
+    start = time.monotonic()
+    main, buffer, error = api.generate_questions_concurrent(TEXT, lambda pool, q: streamed.append(pool),
+                                                            completed.append, report=report)
+
+    assert time.monotonic() - start < 0.8
+    assert not error and main == [] and len(buffer) == 5
+    assert report["budget_exhausted"] == "time" and sorted(completed) == ["buffer", "main"]
+    time.sleep(1.0)  # The stalled call finishes; its questions are not taken
+    assert streamed == ["buffer"] * 5
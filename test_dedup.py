@@ -0,0 +1,61 @@
+import pytest
+
+from dedup import MinHasher, NearDuplicateIndex, question_tokens
+
+
+def make_question(text: str, answer: str = "Mitochondria") -> dict:
+    return {"question": text, "options": {"A": answer, "B": "Ribosome", "C": "Nucleus", "D": "Vacuole"},
+            "correct_answer": "A"}
+
+
+def jaccard(first: dict, second: dict) -> float:
+    a, b = question_tokens(first), question_tokens(second)
+    return len(a & b) / len(a | b)
+
+
+def test_tokens_drop_stop_words_and_stem_prefixes():
+    tokens = question_tokens(make_question("Which organelle is producing the energy?"))
+    assert "which" not in tokens and "the" not in tokens
+    assert {"organ", "produ", "energ", "mitoc"} <= tokens
+    assert question_tokens(make_question("Which organelle produces energy?")) == tokens
+
+
+def test_signature_similarity_estimates_jaccard():
+    hasher = MinHasher(num_perm=256)
+    first = make_question("Which organelle produces most of the energy used by animal cells?")
+    second = make_question("Which organelle produces most of the energy used by plant tissue?")
+    estimate = hasher.similarity(hasher.signature(first), hasher.signature(second))
+    assert abs(estimate - jaccard(first, second)) < 0.15
+    assert hasher.unpack(hasher.pack(hasher.signature(first))) == hasher.signature(first)
+
+
+def test_rewordings_are_duplicates_and_different_questions_are_not():
+    index = NearDuplicateIndex()
+    assert index.add_if_new(0, make_question("Which organelle produces most of the cell's energy?"))
+    assert not index.add_if_new(1, make_question("Which organelle produces most of a cell's energy supply?"))
+    assert index.add_if_new(2, make_question("How does osmosis move water across a membrane?", "Diffusion"))
+    assert len(index) == 2
+    assert index.find(make_question("Which organelle produces most of the cell's energy?")) == 0
+
+
+def test_questions_differing_in_one_word_and_the_answer_are_kept():
+    first = make_question("In which year did World War I end?", "1918")
+    second = make_question("In which year did World War II end?", "1945")
+    index = NearDuplicateIndex()
+    assert index.add_if_new("first", first)
+    assert index.add_if_new("second", second)
+
+
+@pytest.mark.parametrize("threshold, duplicate", [(0.3, True), (0.9, False)])
+def test_threshold_decides_partial_overlap(threshold, duplicate):
+    first = make_question("Which organelle produces energy for muscle cells during exercise?")
+    second = make_question("Which organelle produces energy for neurons during sleep?")
+    assert 0.3 < jaccard(first, second) < 0.9
+    index = NearDuplicateIndex(threshold=threshold)
+    index.add("first", first)
+    assert (index.find(second) == "first") is duplicate
+
+
+def test_bands_must_divide_permutations():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_perm=64, bands=10)
@@ -0,0 +1,45 @@
+import pytest
+
+from backend import AdaptiveTestEngine
+from irt_engine import IRTTestEngine
+
+
+def make_question(text: str, difficulty: float, topic: str) -> dict:
+    return {"question": text, "options": {"A": "Yes", "B": "No", "C": "Maybe", "D": "Never"},
+            "correct_answer": "A", "difficulty": difficulty, "explanation": "Because.", "topic": topic}
+
+
+@pytest.mark.parametrize("engine_class", [AdaptiveTestEngine, IRTTestEngine])
+def test_topics_come_from_the_answered_question_not_its_difficulty(engine_class):
+    """Two questions share a difficulty; each answer is credited to the topic actually shown"""
+    engine = engine_class([make_question("How do enzymes work?", 0.5, "Biology"),
+                           make_question("What is a covalent bond?", 0.5, "Chemistry")])
+    outcomes = {}
+    for _ in range(2):
+        question = engine.get_next_question()
+        is_correct = question["topic"] == "Biology"
+        outcomes[question["topic"]] = is_correct
+        engine.process_answer(is_correct, 4.0, question["difficulty"])
+
+    results = engine.get_final_results()
+    assert outcomes == {"Biology": True, "Chemistry": False}
+    assert results["incorrect_topics"] == ["Chemistry"]
+    assert {topic: (stats["count"], stats["correct"]) for topic, stats in results["topic_stats"].items()} == \
+        {"Biology": (1, 1), "Chemistry": (1, 0)}
+    assert all(entry["topic"] == engine.all_questions[entry["question_id"]]["topic"]
+               for entry in results["question_history"])
+
+
+@pytest.mark.parametrize("answer_first", ["Biology", "Chemistry"])
+def test_aggregates_match_history(answer_first):
+    engine = AdaptiveTestEngine([make_question("How do enzymes work?", 0.5, "Biology"),
+                                 make_question("What is a covalent bond?", 0.5, "Chemistry")])
+    times = {"Biology": 3.0, "Chemistry": 12.0}
+    for _ in range(2):
+        question = engine.get_next_question()
+        engine.process_answer(question["topic"] == answer_first, times[question["topic"]], question["difficulty"])
+
+    results = engine.get_final_results()
+    assert results["incorrect_topics"] == [topic for topic in results["topic_stats"] if topic != answer_first]
+    assert (results["fastest_time"], results["slowest_time"]) == (3.0, 12.0)
+    assert results["accuracy"] == 50.0 and results["avg_difficulty"] == 0.5
@@ -0,0 +1,40 @@
+import uuid
+
+import pytest
+
+from backend import OpenRouterAPI
+from llm_scheduler import RequestScheduler
+
+
+class RecordingAPI(OpenRouterAPI):
+    """Answers every batch with valid questions and records the text each call was sent"""
+
+    def __init__(self):
+        super().__init__(scheduler=RequestScheduler(), chunk_tokens=100, max_input_tokens=1000)
+        self.sent = []
+
+    def generate_questions_batch(self, text_content, count, difficulty_range, report=None, priority=0,
+                                 session_key=""):
+        self.sent.append(text_content)
+        low, high = difficulty_range
+        return [{"question": f"{text_content.split()[0]} {' '.join(uuid.uuid4().hex[:8] for _ in range(6))}?",
+                 "options": {key: uuid.uuid4().hex[:8] for key in "ABCD"},
+                 "correct_answer": "A", "difficulty": round((low + high) / 2, 2), "explanation": "Because.",
+                 "topic": text_content.split()[0]}
+                for n in range(count)], ""
+
+
+@pytest.fixture(autouse=True)
+def standin(monkeypatch):
+    monkeypatch.setenv("LLM_STANDIN", "synthetic")
+
+
+def test_serial_generation_covers_the_whole_document():
+    sections = [f"Section{n} " + "words " * 60 for n in range(8)]
+    api = RecordingAPI()
+    questions, error = api.generate_questions("\n\n".join(sections), concurrent=False)
+
+    assert not error and len(questions) == api.main_count + api.buffer_count
+    assert {text.split()[0] for text in api.sent} == {f"Section{n}" for n in range(8)}
+    assert all(len(text) <= api.chunk_tokens * 4 for text in api.sent)
+    assert len({q["topic"] for q in questions[:api.main_count]}) > 1  # The main set spans several chunks
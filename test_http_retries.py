@@ -0,0 +1,130 @@
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from backend import OpenRouterAPI
+from llm_scheduler import RequestScheduler
+from llm_standin import OpenRouterStandin, install_standin
+
+DATA = {"model": "test", "messages": [{"role": "user", "content": "Generate exactly 2 questions"}]}
+
+
+class RecordingScheduler(RequestScheduler):
+    def __init__(self):
+        super().__init__()
+        self.pauses = []
+        self.throttles = 0
+
+    def pause(self, delay: float):
+        self.pauses.append(delay)
+        super().pause(delay)
+
+    def throttle(self):
+        self.throttles += 1
+        super().throttle()
+
+
+class FlakyStandin(OpenRouterStandin):
+    """Fails the first requests as scripted: an HTTP status (with headers) or "connect" for a refused connection"""
+
+    def __init__(self, failures, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = list(failures)
+
+    def send(self, request, **kwargs):
+        if self.failures:
+            failure, headers = self.failures.pop(0)
+            self._count("requests")
+            if failure == "connect":
+                raise requests.ConnectionError("Connection refused")
+            return self._response(request, failure, '{"error": {"message": "failed"}}', headers)
+        return super().send(request, **kwargs)
+
+
+def make_api(standin, max_retries: int = 2) -> OpenRouterAPI:
+    api = OpenRouterAPI(max_retries=max_retries, backoff_base=0.001, backoff_max=0.01,
+                        scheduler=RecordingScheduler())
+    api.session = requests.Session()
+    install_standin(api.session, standin)
+    return api
+
+
+@pytest.fixture(autouse=True)
+def standin_key(monkeypatch):
+    monkeypatch.setenv("LLM_STANDIN", "synthetic")
+
+
+def response_with(retry_after):
+    response = requests.Response()
+    if retry_after is not None:
+        response.headers["Retry-After"] = retry_after
+    return response
+
+
+def test_retry_after_in_seconds_or_as_http_date():
+    assert OpenRouterAPI._retry_after(response_with("2.5")) == 2.5
+    assert OpenRouterAPI._retry_after(response_with("-3")) == 0.0
+    assert 25 <= OpenRouterAPI._retry_after(response_with(formatdate(time.time() + 30, usegmt=True))) <= 30
+    assert OpenRouterAPI._retry_after(response_with(formatdate(time.time() - 30, usegmt=True))) == 0.0
+    assert OpenRouterAPI._retry_after(response_with("soon")) is None
+    assert OpenRouterAPI._retry_after(response_with(None)) is None
+
+
+def test_backoff_grows_and_is_capped(monkeypatch):
+    api = make_api(OpenRouterStandin())
+    api.backoff_base, api.backoff_max = 1.0, 5.0
+    monkeypatch.setattr("random.uniform", lambda low, high: high)
+    assert [api._backoff_delay(attempt) for attempt in range(5)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+
+def test_429_pauses_the_scheduler_for_retry_after_then_succeeds():
+    standin = FlakyStandin([(429, {"Retry-After": "0.2"})])
+    api = make_api(standin)
+    start = time.monotonic()
+    response = api._post_completion(api._headers(), DATA)
+    assert response.status_code == 200
+    assert standin.counts["requests"] == 2
+    assert api.scheduler.pauses == [0.2] and api.scheduler.throttles == 1
+    assert time.monotonic() - start >= 0.15  # The retry waited out the pause
+
+
+def test_server_errors_back_off_without_pausing_other_calls():
+    standin = FlakyStandin([(503, None), (502, None)])
+    api = make_api(standin)
+    assert api._post_completion(api._headers(), DATA).status_code == 200
+    assert standin.counts["requests"] == 3
+    assert api.scheduler.pauses == [] and api.scheduler.throttles == 2
+
+
+def test_failed_connect_is_retried():
+    standin = FlakyStandin([("connect", None)])
+    api = make_api(standin)
+    assert api._post_completion(api._headers(), DATA).status_code == 200
+    assert standin.counts["requests"] == 2
+
+
+def test_last_attempt_raises_for_status():
+    standin = OpenRouterStandin(rate_limit_rate=1.0, retry_after=0.01)
+    api = make_api(standin, max_retries=2)
+    with pytest.raises(requests.HTTPError) as raised:
+        api._post_completion(api._headers(), DATA)
+    assert raised.value.response.status_code == 429
+    assert standin.counts["requests"] == 3 and api.scheduler.pauses == [0.01, 0.01]
+
+
+def test_connect_errors_past_the_last_attempt_propagate():
+    standin = FlakyStandin([("connect", None)] * 3)
+    api = make_api(standin, max_retries=2)
+    with pytest.raises(requests.ConnectionError):
+        api._post_completion(api._headers(), DATA)
+    assert standin.counts["requests"] == 3
+
+
+def test_client_errors_are_not_retried():
+    standin = FlakyStandin([(401, None)])
+    api = make_api(standin)
+    with pytest.raises(requests.HTTPError):
+        api._post_completion(api._headers(), DATA)
+    assert standin.counts["requests"] == 1
@@ -0,0 +1,82 @@
+import json
+import random
+
+import pytest
+
+from json_stream import QuestionStreamParser, salvage_questions
+
+
+def make_questions(count: int):
+    return [{"question": f"Question {i} with \"quotes\", {{braces}} and [brackets] \\ slash?",
+             "options": {"A": "One", "B": "Two", "C": "Three", "D": "Four"},
+             "correct_answer": "A", "difficulty": 0.5, "explanation": "Because ] of } this.", "topic": "Topic"}
+            for i in range(count)]
+
+
+def test_clean_document_in_arbitrary_chunks():
+    questions = make_questions(5)
+    document = json.dumps({"questions": questions}, indent=2)
+    rng = random.Random(3)
+    for _ in range(50):
+        parser = QuestionStreamParser()
+        received = []
+        pos = 0
+        while pos < len(document):
+            size = rng.randint(1, 40)
+            received.extend(parser.feed(document[pos:pos + size]))
+            pos += size
+        parser.close()
+        assert received == questions
+        assert parser.array_closed and not parser.truncated and parser.dropped == 0
+
+
+def test_questions_are_emitted_as_soon_as_they_close():
+    first, second = (json.dumps(q) for q in make_questions(2))
+    parser = QuestionStreamParser()
+    assert parser.feed('{"questions": [' + first[:-1]) == []
+    assert len(parser.feed("}, " + second[:10])) == 1
+    assert len(parser.feed(second[10:] + "]}")) == 1
+
+
+def test_fences_commentary_and_trailing_commas():
+    questions = make_questions(3)
+    body = json.dumps({"questions": questions}, indent=2).replace('"\n    }', '",\n    }')
+    salvaged, report = salvage_questions(f"Sure! Here you go:\n```json\n{body}\n```\nAnything else?")
+    assert salvaged == questions
+    assert report == {"salvaged": 3, "dropped": 0, "truncated": False, "found_array": True}
+
+
+def test_truncated_response_keeps_complete_questions():
+    document = json.dumps({"questions": make_questions(4)})
+    cut = document.index('"question": "Question 3')  # Inside the fourth element
+    salvaged, report = salvage_questions(document[:cut + 20])
+    assert [q["question"] for q in salvaged] == [q["question"] for q in make_questions(3)]
+    assert report == {"salvaged": 3, "dropped": 1, "truncated": True, "found_array": True}
+
+
+@pytest.mark.parametrize("cut", [1, 2, 3])
+def test_truncated_between_elements_drops_nothing(cut):
+    elements = [json.dumps(q) for q in make_questions(3)]
+    salvaged, report = salvage_questions('{"questions": [' + ", ".join(elements[:cut]) + ", ")
+    assert len(salvaged) == cut
+    assert report["truncated"] and report["dropped"] == 0
+
+
+def test_corrupt_element_does_not_affect_neighbours():
+    elements = [json.dumps(q) for q in make_questions(3)]
+    elements[1] = elements[1].replace('"explanation":', '"explanation"::')
+    salvaged, report = salvage_questions('{"questions": [' + ", ".join(elements) + "]}")
+    assert [q["question"] for q in salvaged] == [make_questions(3)[i]["question"] for i in (0, 2)]
+    assert report == {"salvaged": 2, "dropped": 1, "truncated": False, "found_array": True}
+
+
+def test_non_object_elements_are_skipped():
+    salvaged, report = salvage_questions('{"questions": [[1, {"x": 2}], "text", 3, {"question": "Kept"}]}')
+    assert salvaged == [{"question": "Kept"}]
+    assert report["salvaged"] == 1
+
+
+def test_missing_array_is_reported():
+    salvaged, report = salvage_questions("I could not generate questions for this text.")
+    assert salvaged == []
+    assert report == {"salvaged": 0, "dropped": 0, "truncated": False, "found_array": False}
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from llm_scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_PREFETCH, RequestScheduler
+
+
+def queue_call(scheduler: RequestScheduler, priority: int, session: str, name: str, order: list) -> threading.Thread:
+    """Start a call and wait until it is queued; it records name when admitted"""
+    queued = sum(scheduler.stats()["queued"].values())
+
+    def call():
+        with scheduler.slot(priority, session):
+            order.append(name)
+
+    thread = threading.Thread(target=call)
+    thread.start()
+    while sum(scheduler.stats()["queued"].values()) == queued:
+        time.sleep(0.001)
+    return thread
+
+
+def elapsed(action) -> float:
+    start = time.monotonic()
+    action()
+    return time.monotonic() - start
+
+
+def test_priority_classes_then_round_robin_across_sessions():
+    scheduler = RequestScheduler(max_concurrency=1)
+    order = []
+    scheduler.acquire(PRIORITY_INTERACTIVE, "holder")
+    calls = [(PRIORITY_PREFETCH, "c", "c-pre"), (PRIORITY_BACKGROUND, "a", "a-bg1"),
+             (PRIORITY_BACKGROUND, "a", "a-bg2"), (PRIORITY_BACKGROUND, "a", "a-bg3"),
+             (PRIORITY_BACKGROUND, "b", "b-bg1"), (PRIORITY_INTERACTIVE, "b", "b-int")]
+    threads = [queue_call(scheduler, *call, order) for call in calls]
+    assert scheduler.stats()["queued"] == {"interactive": 1, "background": 4, "prefetch": 1}
+
+    scheduler.release()
+    for thread in threads:
+        thread.join(5)
+    assert order == ["b-int", "a-bg1", "b-bg1", "a-bg2", "a-bg3", "c-pre"]
+
+
+def test_concurrency_cap_and_stats():
+    scheduler = RequestScheduler(max_concurrency=2)
+    scheduler.acquire(PRIORITY_INTERACTIVE, "s")
+    scheduler.acquire(PRIORITY_BACKGROUND, "s")
+    order = []
+    thread = queue_call(scheduler, PRIORITY_INTERACTIVE, "t", "third", order)
+    stats = scheduler.stats()
+    assert stats["in_flight"] == 2 and stats["queued"]["interactive"] == 1 and order == []
+
+    scheduler.release()
+    thread.join(5)
+    scheduler.release()
+    stats = scheduler.stats()
+    assert order == ["third"] and stats["in_flight"] == 0
+    assert stats["admitted"] == {"interactive": 2, "background": 1, "prefetch": 0}
+    assert stats["wait_max_s"]["interactive"] > 0
+
+
+def test_request_bucket_spaces_calls():
+    scheduler = RequestScheduler(requests_per_minute=120)
+    scheduler._requests.level = 0  # Empty bucket refilling at two requests per second
+    assert elapsed(scheduler.acquire) >= 0.4
+
+
+def test_tokens_used_over_the_estimate_delay_later_calls():
+    scheduler = RequestScheduler(tokens_per_minute=600)  # Ten tokens per second
+    with scheduler.slot(PRIORITY_INTERACTIVE, "s", tokens=600) as slot:
+        slot.used = 602  # Leaves a debt of two tokens
+    assert elapsed(lambda: scheduler.acquire(PRIORITY_INTERACTIVE, "s", tokens=1)) >= 0.25
+
+
+def test_429_pause_holds_admissions_and_retries():
+    scheduler = RequestScheduler()
+    scheduler.pause(0.3)
+    assert elapsed(scheduler.acquire) >= 0.25
+    scheduler.pause(0.3)
+    assert elapsed(scheduler.throttle) >= 0.25
+    scheduler.release()
+    assert elapsed(scheduler.acquire) < 0.1
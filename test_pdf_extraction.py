@@ -0,0 +1,60 @@
+import io
+import time
+
+import fitz  # PyMuPDF
+import pytest
+
+import backend
+from backend import PDFProcessor
+
+
+def make_pdf(page_count: int) -> bytes:
+    document = fitz.open()
+    for page_num in range(page_count):
+        document.new_page().insert_text((50, 60), f"Page {page_num + 1}: adaptive testing study material.")
+    pdf_bytes = document.tobytes()
+    document.close()
+    return pdf_bytes
+
+
+@pytest.fixture
+def fresh_pool(monkeypatch):
+    monkeypatch.setattr(backend, "_extraction_pool", None)
+    monkeypatch.setattr(backend, "_extraction_pool_warmup", [])
+    monkeypatch.setattr(PDFProcessor, "PARALLEL_PAGE_THRESHOLD", 8)
+    monkeypatch.setattr(PDFProcessor, "MIN_PAGES_PER_TASK", 4)
+    yield
+    if backend._extraction_pool is not None:
+        backend._extraction_pool.shutdown(wait=True)
+
+
+def extract(pdf_bytes: bytes, **kwargs) -> str:
+    text, error = PDFProcessor.extract_text_from_pdf(io.BytesIO(pdf_bytes), **kwargs)
+    assert not error
+    return text
+
+
+def test_serial_extraction_keeps_page_order():
+    text = extract(make_pdf(5), parallel=False)
+    assert [line.split(":")[0] for line in text.splitlines() if line] == [f"Page {n}" for n in range(1, 6)]
+
+
+def test_shared_pool_is_used_once_started_and_matches_serial(fresh_pool):
+    pdf_bytes = make_pdf(20)
+    serial = extract(pdf_bytes, parallel=False)
+
+    # The first call only starts the pool and extracts serially
+    assert extract(pdf_bytes, max_workers=2) == serial
+    pool = backend._extraction_pool
+    assert pool is not None
+    deadline = time.monotonic() + 60
+    while backend.get_extraction_pool(2) is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    submitted = []
+    original_submit = pool.submit
+    pool.submit = lambda *args: submitted.append(args) or original_submit(*args)
+    assert extract(pdf_bytes, max_workers=2) == serial
+    assert [args[2:] for args in submitted] == [(0, 4), (4, 8), (8, 12), (12, 16), (16, 20)]
+    assert backend._extraction_pool is pool  # Reused, not restarted
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from backend import AdaptiveTestEngine, OpenRouterAPI
+from question_bank import QuestionBank, QuestionView
+
+
+def make_question(text: str, difficulty: float = 0.5, topic: str = "Biology", **extra) -> dict:
+    return {"question": text, "options": {"A": "Mitochondria", "B": "Ribosome", "C": "Nucleus", "D": "Vacuole"},
+            "correct_answer": "C", "difficulty": difficulty, "explanation": "The nucleus holds the DNA.",
+            "topic": topic, **extra}
+
+
+def test_views_read_back_the_original_questions():
+    questions = [make_question("Where is DNA stored? ✓ ünïcode", 0.3),
+                 make_question("Which organelle makes ATP?", 0.7, "Cells", source="page 4")]
+    bank = QuestionBank(questions)
+
+    assert len(bank) == 2 and list(bank.difficulties) == [0.3, 0.7]
+    assert all(isinstance(q, QuestionView) for q in bank)
+    assert bank[0] == questions[0] and dict(bank[1]) == questions[1] and bank[-1]["source"] == "page 4"
+    assert bank[1].get("missing", "default") == "default" and "topic" in bank[1]
+    assert json.loads(json.dumps(dict(bank[0]))) == questions[0]
+    assert bank.topic(1) == "Cells" and bank[0:2] == questions
+    assert OpenRouterAPI.validate_question(bank[0])
+    with pytest.raises(IndexError):
+        bank[2]
+
+
+def test_questions_outside_the_compact_layout_are_kept_as_given():
+    odd = [{"question": "Short?", "difficulty": 0.4},
+           make_question("Separator \x1f inside?"),
+           {**make_question("Numeric option?"), "options": {"A": 1, "B": 2, "C": 3}}]
+    bank = QuestionBank(odd)
+    assert all(bank[i] is odd[i] for i in range(3))
+    assert bank.topic(0) == "Unknown" and list(bank.difficulties) == [0.4, 0.5, 0.5]
+
+
+def test_engine_keeps_questions_in_a_bank():
+    main = [make_question(f"Main question {i}?", 0.3 + i / 10) for i in range(3)]
+    buffer = [make_question("Buffer question?", 0.9, "Cells")]
+    engine = AdaptiveTestEngine(main, buffer)
+
+    assert isinstance(engine.all_questions, QuestionBank)
+    assert engine.main_questions == main and engine.buffer_questions == buffer
+    question = engine.get_next_question()
+    assert question == main[2] and OpenRouterAPI.validate_question(question)
+
+    _, stored_main, stored_buffer, _ = engine.snapshot_with_pool()
+    assert json.loads(json.dumps([stored_main, stored_buffer])) == [main, buffer]
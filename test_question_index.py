@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from question_index import DifficultyIndex
+
+
+def brute_nearest(unused, target, tolerance=None):
+    """Reference: (distance, index) of the closest unused question, ties to the lowest index"""
+    if not unused:
+        return None
+    best = min((abs(difficulty - target), idx) for idx, difficulty in unused.items())
+    if tolerance is not None and best[0] > tolerance:
+        return None
+    return best
+
+
+def test_nearest_prefers_closest_then_lowest_index():
+    index = DifficultyIndex([(0.5, 3), (0.5, 1), (0.75, 0), (0.25, 2)])
+    assert index.nearest(0.5) == (0.0, 1)
+    assert index.nearest(0.625) == (0.125, 0)  # 0.5 and 0.75 are equally far; index 0 < 1
+    assert index.nearest(1.0) == (0.25, 0)
+    assert index.nearest(0.0)[1] == 2
+
+
+def test_remove_skips_used_questions():
+    index = DifficultyIndex([(0.5, 0), (0.5, 1), (0.6, 2)])
+    assert index.remove(0)
+    assert not index.remove(0)
+    assert not index.remove(99)
+    assert index.nearest(0.5) == (0.0, 1)
+    assert index.remove(1)
+    assert index.nearest(0.5)[1] == 2
+    assert index.remove(2)
+    assert index.nearest(0.5) is None
+    assert len(index) == 0
+
+
+def test_tolerance_falls_back_to_none():
+    index = DifficultyIndex([(0.9, 0)])
+    assert index.nearest(0.5, tolerance=0.2) is None
+    assert index.nearest(0.5) is not None  # Without a tolerance the far question is still found
+
+
+@pytest.mark.parametrize("initial", [0, 500])
+def test_adds_interleaved_with_lookups_match_brute_force(initial):
+    rng = random.Random(initial)
+    unused = {idx: round(rng.uniform(0.1, 0.9), 2) for idx in range(initial)}
+    index = DifficultyIndex((difficulty, idx) for idx, difficulty in unused.items())
+    next_idx = initial
+    for _ in range(3000):
+        action = rng.random()
+        if action < 0.4:
+            difficulty = round(rng.uniform(0.1, 0.9), 2)
+            index.add(difficulty, next_idx)
+            unused[next_idx] = difficulty
+            next_idx += 1
+        elif action < 0.6 and unused:
+            idx = rng.choice(list(unused))
+            assert index.remove(idx)
+            del unused[idx]
+        else:
+            target = rng.uniform(0, 1)
+            tolerance = rng.choice([None, 0.05, 0.2])
+            assert index.nearest(target, tolerance) == brute_nearest(unused, target, tolerance)
+        assert len(index) == len(unused)
@@ -0,0 +1,127 @@
+import threading
+
+import pytest
+
+from backend import AdaptiveTestEngine, BackgroundGeneration
+from question_store import SQLiteQuestionStore, question_fingerprint
+
+
+def make_question(text: str, difficulty: float, topic: str = "Biology") -> dict:
+    return {"question": text, "options": {"A": "Yes", "B": "No", "C": "Maybe", "D": "Never"},
+            "correct_answer": "A", "difficulty": difficulty, "explanation": "Because.", "topic": topic}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteQuestionStore(str(tmp_path / "questions.db"))
+
+
+def test_fingerprint_ignores_case_and_whitespace():
+    assert question_fingerprint(make_question("What  is a cell?", 0.5)) == \
+        question_fingerprint(make_question("what is a CELL?", 0.7))
+
+
+def test_near_duplicates_are_stored_once(store):
+    questions = [make_question("Which organelle produces most of the cell's energy supply?", 0.5),
+                 make_question("Which organelle produces most of the cell's energy supplies?", 0.6),
+                 make_question("How does osmosis move water across a membrane?", 0.4)]
+    assert store.add_questions(questions, "doc") == 2
+    assert store.add_questions(questions, "doc") == 0
+    assert store.has_near_duplicate(questions[1])
+    assert store.stats()["questions"] == 2
+
+
+def test_lookalikes_from_another_document_are_kept_for_this_one(store):
+    question = make_question("Which organelle produces most of the cell's energy supply?", 0.5)
+    lookalike = make_question("Which organelle produces most of the cell's energy supplies?", 0.6)
+    store.add_questions([question], "doc-a")
+    assert store.has_near_duplicate(lookalike)
+    assert not store.has_near_duplicate(lookalike, "doc-b")
+    assert store.add_questions([lookalike], "doc-b") == 1
+    assert store.add_questions([lookalike], "doc-a") == 0
+
+
+def test_range_query_filters_by_document_topic_and_exclusions(store):
+    store.add_questions([make_question("How do enzymes lower activation energy?", 0.3),
+                         make_question("Why do plant cells need chloroplasts?", 0.5, topic="Plants")], "doc-a")
+    store.add_questions([make_question("Where does glycolysis take place in the cell?", 0.45)], "doc-b")
+
+    assert [q["difficulty"] for q in store.range_query(0.2, 0.6, document="doc-a")] == [0.3, 0.5]
+    assert [q["difficulty"] for q in store.range_query(0.4, 0.6)] == [0.45, 0.5]
+    assert [q["topic"] for q in store.range_query(0.0, 1.0, topics=["Plants"])] == ["Plants"]
+
+    enzyme = store.range_query(0.2, 0.35, document="doc-a")[0]
+    assert store.range_query(0.2, 0.35, document="doc-a", exclude=[question_fingerprint(enzyme)]) == []
+
+
+def test_least_served_questions_come_first(store):
+    first = make_question("How do enzymes lower activation energy?", 0.4)
+    second = make_question("Why do plant cells need chloroplasts?", 0.5)
+    store.add_questions([first, second], "doc")
+    store.record_usage(first, is_correct=True)
+    assert store.range_query(0.0, 1.0, limit=1)[0]["question"] == second["question"]
+
+
+def test_lookahead_does_not_skip_a_store_draw(store):
+    """A precomputed lookahead must not return a far question when the store can fill the gap"""
+    store.add_questions([make_question("Where does glycolysis take place in the cell?", 0.45)], "doc")
+    main = [make_question("How do enzymes lower activation energy?", 0.5),
+            make_question("Why do plant cells need chloroplasts?", 0.9),
+            make_question("What limits the rate of photosynthesis at noon?", 0.95)]
+
+    picked = []
+    for lookahead in (False, True):
+        engine = AdaptiveTestEngine([dict(q) for q in main])
+        engine.attach_question_store(store, "doc")
+        assert engine.get_next_question()["difficulty"] == 0.5
+        if lookahead:
+            engine.precompute_lookahead()
+        engine.process_answer(False, 5.0, 0.5)  # Target drops to 0.4, where the pool has nothing
+        picked.append(engine.get_next_question()["difficulty"])
+
+    assert picked == [0.45, 0.45]
+
+
+class SteppedClient:
+    """Streams one scripted buffer question each time release is set"""
+
+    main_count, buffer_count = 1, 2
+
+    def __init__(self, main, buffer):
+        self.main, self.buffer = main, buffer
+        self.release = threading.Semaphore(0)
+
+    def generate_questions_concurrent(self, text_content, on_question, on_set_complete, report, session_key):
+        on_question("main", self.main)
+        on_set_complete("main")
+        for q in self.buffer:
+            self.release.acquire()
+            on_question("buffer", q)
+        return [self.main], self.buffer, ""
+
+
+def test_store_draws_do_not_crowd_out_or_get_cached_as_generated(store):
+    drawn = [make_question("Where does glycolysis take place in the cell?", 0.3, topic="Metabolism"),
+             make_question("Which gas do plants release during photosynthesis?", 0.35, topic="Metabolism")]
+    store.add_questions(drawn, "other-doc")
+    main = make_question("How do enzymes lower activation energy?", 0.5, topic="Metabolism")
+    buffer = [make_question("Why do plant cells need chloroplasts?", 0.85),
+              make_question("What limits the rate of photosynthesis at noon?", 0.8)]
+
+    client = SteppedClient(main, buffer)
+    completed = []
+    engine = AdaptiveTestEngine([])
+    engine.attach_question_store(store, "doc")
+    generation = BackgroundGeneration(client, "text", engine, on_complete=lambda *args: completed.append(args))
+    generation.start()
+    assert generation.wait_until_ready(timeout=5)
+
+    engine.get_next_question()
+    engine.process_answer(False, 5.0, 0.5)  # Target drops to 0.4, where nothing was generated
+    engine.get_next_question()  # Draws both stored questions (same topic, other document) into the buffer
+    assert len(engine.buffer_questions) == 2
+
+    client.release.release(2)
+    generation._thread.join(5)
+    assert [q["question"] for q in buffer] == [q["question"] for q in engine.buffer_questions[2:]]
+    assert completed == [([main], buffer, "")]
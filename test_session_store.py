@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from session_store import SessionStore, SQLiteSessionStore, StaleSessionError
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteSessionStore(str(tmp_path / "sessions.db"))
+
+
+def test_save_and_load_round_trip(store):
+    version = store.save("s1", {"page": "test", "pool_hash": "abc"}, b"\x01\x02", 0)
+    assert version == 1
+    record = store.load("s1")
+    assert record.version == 1
+    assert record.state == {"page": "test", "pool_hash": "abc"}
+    assert record.engine_snapshot == b"\x01\x02"
+    assert store.load("missing") is None
+
+
+def test_stale_version_is_rejected(store):
+    store.save("s1", {"page": "upload"}, None, 0)
+    with pytest.raises(StaleSessionError):
+        store.save("s1", {"page": "test"}, None, 0)  # Created twice
+
+    assert store.save("s1", {"page": "test"}, None, 1) == 2
+    with pytest.raises(StaleSessionError):
+        store.save("s1", {"page": "results"}, None, 1)  # Another worker already wrote version 2
+    assert store.load("s1").state == {"page": "test"}
+
+
+def test_workers_see_each_others_writes(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    first, second = SQLiteSessionStore(path), SQLiteSessionStore(path)
+    first.save("s1", {"page": "upload"}, None, 0)
+    assert second.load("s1").version == 1  # Cached by the second worker
+
+    first.save("s1", {"page": "test"}, None, 1)
+    record = second.load("s1")
+    assert (record.version, record.state) == (2, {"page": "test"})
+    with pytest.raises(StaleSessionError):
+        second.save("s1", {"page": "results"}, None, 1)
+
+
+def test_pools_round_trip(store):
+    main, buffer = [{"question": "a", "difficulty": 0.5}], [{"question": "b", "difficulty": 0.2}]
+    store.put_pool("p1", main, buffer)
+    assert store.get_pool("p1") == (main, buffer)
+    assert store.get_pool("p2") is None
+
+
+def test_cleanup_expires_idle_sessions_and_unreferenced_pools(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl_seconds=0.05, cleanup_interval=3600)
+    store.put_pool("kept", [{"question": "a"}], [])
+    store.put_pool("orphan", [{"question": "b"}], [])
+    store.save("old", {"pool_hash": "kept"}, None, 0)
+    time.sleep(0.1)
+    store.save("live", {"pool_hash": "kept"}, None, 0)
+
+    assert store.cleanup_expired() == 1
+    assert store.load("old") is None
+    assert store.load("live") is not None
+
+    store._pool_cache.clear()  # Read pools back from the database
+    assert store.get_pool("kept") is not None
+    assert store.get_pool("orphan") is None
+
+
+def test_put_pool_restores_a_pool_another_worker_expired(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    worker = SQLiteSessionStore(path, ttl_seconds=0.05, cleanup_interval=3600)
+    cleaner = SQLiteSessionStore(path, ttl_seconds=0.05, cleanup_interval=3600)
+    pool = ([{"question": "a"}], [{"question": "b"}])
+    worker.put_pool("p1", *pool)
+    time.sleep(0.1)
+    cleaner.cleanup_expired()
+    assert cleaner.get_pool("p1") is None
+
+    worker.put_pool("p1", *pool)  # Same PDF uploaded again: still cached in this worker
+    assert cleaner.get_pool("p1") == pool
+
+
+def test_put_pool_refreshes_its_expiry(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl_seconds=0.2, cleanup_interval=3600)
+    store.put_pool("p1", [{"question": "a"}], [])
+    time.sleep(0.15)
+    store.put_pool("p1", [{"question": "a"}], [])
+    time.sleep(0.1)
+    store.cleanup_expired()
+    store._pool_cache.clear()
+    assert store.get_pool("p1") is not None
+
+
+def test_session_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
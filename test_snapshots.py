@@ -0,0 +1,97 @@
+import random
+import threading
+
+import pytest
+
+from backend import AdaptiveTestEngine
+from irt_engine import IRTTestEngine
+from simulation import make_question_bank
+
+ENGINES = [AdaptiveTestEngine, IRTTestEngine]
+
+
+def take_answers(engine, answers: int, seed: int = 1):
+    rng = random.Random(seed)
+    for _ in range(answers):
+        question = engine.get_next_question()
+        engine.process_answer(rng.random() < 0.6, rng.uniform(2, 20), question["difficulty"])
+
+
+def state(engine):
+    return (engine.user_ability, engine.current_difficulty, engine.questions_attempted, engine.correct_answers,
+            engine.total_points, engine.max_questions, set(engine.used_questions),
+            [dict(entry) for entry in engine.question_history])
+
+
+@pytest.mark.parametrize("engine_class", ENGINES)
+def test_round_trip_restores_progress(engine_class):
+    main, buffer = make_question_bank(40)
+    engine = engine_class(main, buffer)
+    take_answers(engine, 4)
+    snapshot = engine.to_bytes()
+
+    restored = engine_class.from_bytes(snapshot, main, buffer)
+    assert state(restored) == state(engine)
+    assert restored.get_final_results() == engine.get_final_results()
+    assert restored.to_bytes() == snapshot
+
+    # Both continue identically from the restored point
+    take_answers(engine, 3, seed=2)
+    take_answers(restored, 3, seed=2)
+    assert state(restored) == state(engine)
+
+
+@pytest.mark.parametrize("engine_class", ENGINES)
+def test_restore_after_diverging_rewinds(engine_class):
+    main, buffer = make_question_bank(40)
+    engine = engine_class(main, buffer)
+    take_answers(engine, 2)
+    snapshot = engine.to_bytes()
+    expected = state(engine)
+
+    take_answers(engine, 3, seed=3)
+    engine.restore_bytes(snapshot)
+    assert state(engine) == expected
+    assert engine.get_next_question() is not None
+
+
+@pytest.mark.parametrize("engine_class", ENGINES)
+def test_restore_rejects_a_different_pool(engine_class):
+    main, buffer = make_question_bank(40)
+    engine = engine_class(main, buffer)
+    take_answers(engine, 2)
+    snapshot = engine.to_bytes()
+
+    other_main, other_buffer = make_question_bank(40, seed=5)
+    with pytest.raises(ValueError):
+        engine_class.from_bytes(snapshot, other_main, other_buffer)
+    with pytest.raises(ValueError):
+        engine_class.from_bytes(snapshot, buffer, main)  # Same questions, swapped sets
+
+
+def test_restore_rejects_foreign_bytes():
+    main, buffer = make_question_bank(20)
+    snapshot = AdaptiveTestEngine(main, buffer).to_bytes()
+    with pytest.raises(ValueError):
+        AdaptiveTestEngine.from_bytes(b"XXXX" + snapshot[4:], main, buffer)
+
+
+def test_snapshot_with_pool_matches_while_questions_stream_in():
+    main, buffer = make_question_bank(400)
+    engine = AdaptiveTestEngine([], [])
+    engine.begin_generation()
+
+    def feed():
+        for q in main:
+            engine.add_questions([q])
+        for q in buffer:
+            engine.add_questions([q], buffer=True)
+        engine.finish_generation()
+
+    feeder = threading.Thread(target=feed)
+    feeder.start()
+    while feeder.is_alive():
+        pool_hash, main_copy, buffer_copy, snapshot = engine.snapshot_with_pool()
+        restored = AdaptiveTestEngine.from_bytes(snapshot, main_copy, buffer_copy)  # Raises on a mismatched pool
+        assert restored.bank_hash() == pool_hash
+    feeder.join()
@@ -0,0 +1,78 @@
+import pytest
+
+import backend
+from tracing import Tracer, tracer
+
+
+def test_disabled_tracer_records_nothing():
+    disabled = Tracer(enabled=False)
+    with disabled.span("pdf.open") as span:
+        span.set(pages=3)
+    disabled.count("llm_retries_total", status=429)
+    disabled.gauge("llm_queue_depth", 2, priority="background")
+    disabled.record_usage({"prompt_tokens": 10})
+    assert disabled.stage_summary() == {} and disabled.counters() == {} and disabled.gauges() == {}
+
+
+def test_spans_nest_and_record_errors():
+    traced = Tracer(enabled=True)
+    with traced.span("generation.run"):
+        with traced.span("llm.request", attempt=1) as span:
+            span.set(status=200)
+    with pytest.raises(ValueError):
+        with traced.span("json.salvage"):
+            raise ValueError("bad")
+
+    inner, outer, failed = traced.recent
+    assert (inner.name, inner.parent, inner.attributes) == ("llm.request", "generation.run", {"attempt": 1, "status": 200})
+    assert outer.parent is None and outer.duration >= inner.duration
+    assert failed.attributes == {"error": "ValueError"}
+    summary = traced.stage_summary()
+    assert summary["json.salvage"]["errors"] == 1 and summary["generation.run"]["count"] == 1
+
+
+def test_counters_gauges_and_usage():
+    traced = Tracer(enabled=True)
+    traced.count("llm_retries_total", status=429)
+    traced.count("llm_retries_total", status=429)
+    traced.record_usage({"prompt_tokens": 120, "completion_tokens": 30.5, "total_tokens": "n/a"})
+    traced.record_usage(None)
+    traced.gauge("llm_queue_depth", 4, priority="background")
+    traced.gauge("llm_queue_depth", 1, priority="background")
+    assert traced.counters() == {'llm_retries_total{status="429"}': 2,
+                                 'llm_tokens_total{kind="prompt"}': 120,
+                                 'llm_tokens_total{kind="completion"}': 30.5}
+    assert traced.gauges() == {'llm_queue_depth{priority="background"}': 1}
+
+
+def test_prometheus_text():
+    traced = Tracer(enabled=True)
+    for duration in (0.0005, 0.02):
+        span = traced.span("pdf.extract")
+        span.__enter__()
+        span.start -= duration  # Pretend the stage took this long
+        span.__exit__(None, None, None)
+    traced.count("questions_total", 7, outcome="valid")
+    traced.gauge("llm_requests_in_flight", 2)
+    lines = traced.prometheus_text().splitlines()
+
+    histogram = "adaptive_exam_stage_duration_seconds"
+    assert "# TYPE adaptive_exam_stage_duration_seconds histogram" in lines
+    assert f'{histogram}_bucket{{stage="pdf.extract",le="0.001"}} 1' in lines
+    assert f'{histogram}_bucket{{stage="pdf.extract",le="0.01"}} 1' in lines
+    assert f'{histogram}_bucket{{stage="pdf.extract",le="0.05"}} 2' in lines
+    assert f'{histogram}_bucket{{stage="pdf.extract",le="+Inf"}} 2' in lines
+    assert f'{histogram}_count{{stage="pdf.extract"}} 2' in lines
+    assert 'adaptive_exam_stage_errors_total{stage="pdf.extract"} 0' in lines
+    assert "# TYPE adaptive_exam_questions_total counter" in lines
+    assert 'adaptive_exam_questions_total{outcome="valid"} 7' in lines
+    assert "# TYPE adaptive_exam_llm_requests_in_flight gauge" in lines
+    assert "adaptive_exam_llm_requests_in_flight 2" in lines
+
+
+def test_tracing_set_after_import_is_picked_up_by_load_environment(monkeypatch):
+    monkeypatch.setattr(backend, "_environment_loaded", False)
+    monkeypatch.setenv("TRACING", "1")  # As load_dotenv() would from .env
+    monkeypatch.setattr(tracer, "enabled", False)
+    backend.load_environment()
+    assert tracer.enabled
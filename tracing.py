@@ -0,0 +1,245 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+METRIC_PREFIX = "adaptive_exam"
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+COUNTER_HELP = {
+    "llm_tokens_total": "Tokens reported by the API, by kind (prompt or completion)",
+    "llm_payload_bytes_total": "Bytes sent to and received from the API, by direction",
+    "llm_retries_total": "Requests retried, by HTTP status (or connection_error)",
+    "questions_total": "Generated questions after validation, by outcome",
+    "llm_requests_admitted_total": "LLM calls admitted by the request scheduler, by priority class",
+    "llm_queue_wait_seconds_total": "Seconds LLM calls waited in the scheduler queue, by priority class",
+}
+
+GAUGE_HELP = {
+    "llm_queue_depth": "LLM calls waiting in the scheduler queue, by priority class",
+    "llm_requests_in_flight": "LLM calls admitted and not yet finished",
+}
+
+
+def tracing_requested() -> bool:
+    """Whether the TRACING setting asks for tracing"""
+    return os.getenv("TRACING", "").lower() in ("1", "true", "yes")
+
+
+class Span:
+    """One timed stage; attributes added with set() go to the structured log"""
+
+    __slots__ = ("tracer", "name", "attributes", "parent", "start", "duration")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.parent = None
+        self.start = 0.0
+        self.duration = 0.0
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        stack = self.tracer._stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.duration = time.perf_counter() - self.start
+        self.tracer._stack().pop()
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.tracer._finish(self)
+        return False
+
+
+class _NoopSpan:
+    """Shared stand-in returned while tracing is disabled"""
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Lightweight span timing and counters for the generation pipeline
+
+    Each finished span is logged as one JSON line on the "adaptive_exam.trace"
+    logger (at INFO) and added to a per-stage duration histogram; counters
+    track tokens, payload sizes and retries, and gauges the scheduler queue.
+    prometheus_text() renders them all in the Prometheus text exposition
+    format.
+
+    Disabled unless TRACING=1 (or enable() is called); while disabled span()
+    returns a shared no-op and count() returns at once, so instrumented code
+    pays only an attribute check. The process-wide tracer is created before
+    .env is read, so backend.load_environment() enables it once TRACING is
+    known.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, recent_spans: int = 200):
+        if enabled is None:
+            enabled = tracing_requested()
+        self.enabled = enabled
+        self.logger = logging.getLogger("adaptive_exam.trace")
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stages: Dict[str, List] = {}  # name -> [count, errors, sum, bucket counts]
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._gauges: Dict[Tuple[str, Tuple], float] = {}
+        self.recent = deque(maxlen=recent_spans)
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """Drop every recorded span and counter"""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._gauges.clear()
+            self.recent.clear()
+
+    def span(self, name: str, **attributes):
+        """Context manager timing a stage: with tracer.span("json.salvage", bytes=n) as span: ..."""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def count(self, metric: str, value: float = 1, **labels):
+        """Add value to a counter, labelled e.g. count("llm_tokens_total", 120, kind="prompt")"""
+        if not self.enabled:
+            return
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, metric: str, value: float, **labels):
+        """Set a gauge to its current value, e.g. gauge("llm_queue_depth", 3, priority="background")"""
+        if not self.enabled:
+            return
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def record_usage(self, usage: Optional[Dict]):
+        """Count the token usage block of an API response"""
+        if not self.enabled or not isinstance(usage, dict):
+            return
+        for kind in ("prompt", "completion"):
+            tokens = usage.get(f"{kind}_tokens")
+            if isinstance(tokens, (int, float)):
+                self.count("llm_tokens_total", tokens, kind=kind)
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _finish(self, span: Span):
+        with self._lock:
+            stage = self._stages.get(span.name)
+            if stage is None:
+                stage = self._stages[span.name] = [0, 0, 0.0, [0] * len(DURATION_BUCKETS)]
+            stage[0] += 1
+            stage[1] += "error" in span.attributes
+            stage[2] += span.duration
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if span.duration <= bound:
+                    stage[3][i] += 1
+                    break
+            self.recent.append(span)
+
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(json.dumps({"span": span.name, "duration_ms": round(span.duration * 1000, 3),
+                                         "parent": span.parent, "thread": threading.current_thread().name,
+                                         **span.attributes}, default=str))
+
+    def stage_summary(self) -> Dict[str, Dict]:
+        """Count, errors, total and mean seconds per stage"""
+        with self._lock:
+            return {name: {"count": count, "errors": errors, "total_s": total, "mean_s": total / count}
+                    for name, (count, errors, total, _) in self._stages.items()}
+
+    def counters(self) -> Dict[str, float]:
+        """Counter values keyed by metric{labels}"""
+        with self._lock:
+            return {_series(metric, labels): value for (metric, labels), value in self._counters.items()}
+
+    def gauges(self) -> Dict[str, float]:
+        """Gauge values keyed by metric{labels}"""
+        with self._lock:
+            return {_series(metric, labels): value for (metric, labels), value in self._gauges.items()}
+
+    def prometheus_text(self) -> str:
+        """Every stage histogram, counter and gauge in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            stages = {name: (count, errors, total, list(buckets))
+                      for name, (count, errors, total, buckets) in self._stages.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        histogram = f"{METRIC_PREFIX}_stage_duration_seconds"
+        lines.append(f"# HELP {histogram} Time spent in each pipeline stage")
+        lines.append(f"# TYPE {histogram} histogram")
+        for name in sorted(stages):
+            count, _, total, buckets = stages[name]
+            cumulative = 0
+            for bound, bucket in zip(DURATION_BUCKETS, buckets):
+                cumulative += bucket
+                lines.append(f'{histogram}_bucket{{stage="{name}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{histogram}_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'{histogram}_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'{histogram}_count{{stage="{name}"}} {count}')
+
+        errors = f"{METRIC_PREFIX}_stage_errors_total"
+        lines.append(f"# HELP {errors} Stages that ended with an exception")
+        lines.append(f"# TYPE {errors} counter")
+        for name in sorted(stages):
+            lines.append(f'{errors}{{stage="{name}"}} {stages[name][1]}')
+
+        for kind, series, help_text in (("counter", counters, COUNTER_HELP), ("gauge", gauges, GAUGE_HELP)):
+            for metric in sorted({metric for metric, _ in series}):
+                name = f"{METRIC_PREFIX}_{metric}"
+                lines.append(f"# HELP {name} {help_text.get(metric, metric)}")
+                lines.append(f"# TYPE {name} {kind}")
+                for (series_metric, labels), value in sorted(series.items()):
+                    if series_metric == metric:
+                        lines.append(f"{_series(name, labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _series(name: str, labels: Tuple) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f'{key}="{str(value)}"' for key, value in labels)
+    return f"{name}{{{rendered}}}"
+
+
+# Process-wide tracer used by the instrumented pipeline
+tracer = Tracer()